@@ -0,0 +1,125 @@
+"""
+Load test of admission control: goodput at twice the capacity of a worker.
+
+Usage:
+    python -m benchmarks.bench_admission [--pool 5] [--load 2.0] [--duration 10] [--slo 1.0]
+
+Runs one in-process worker whose database pool is simulated by a semaphore of ``--pool``
+connections, held for a fixed time per route (``/users/me`` 5 ms, ``/contacts/`` 50 ms,
+``/contacts/stats`` 200 ms, in a 20/70/10 mix), with ``DB_POOL_TIMEOUT`` applied while waiting
+for a connection. Clients arrive open-loop (Poisson) at ``--load`` times the capacity of the pool
+and give up after ``--slo`` seconds, while the server keeps working on their request, as a real
+server would.
+
+Goodput counts the ``200`` responses clients received within the SLO. Without admission control
+requests queue on the pool until nearly every one misses the SLO; with it, the queue is bounded by
+the queue-time budgets, excess requests get an immediate ``503`` and the admitted ones stay fast.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.conf.config import config
+from src.services.admission import AdmissionController, AdmissionMiddleware, pool_timeout_handler
+
+# path -> (share of requests, seconds holding a connection)
+ROUTES = {
+    "/api/users/me": (0.2, 0.005),
+    "/api/contacts/": (0.7, 0.05),
+    "/api/contacts/stats": (0.1, 0.2),
+}
+
+
+def build_app(pool_size: int, admission: bool) -> FastAPI:
+    pool = asyncio.Semaphore(pool_size)
+
+    def endpoint(hold: float):
+        async def handler():
+            try:
+                await asyncio.wait_for(pool.acquire(), config.DB_POOL_TIMEOUT)
+            except TimeoutError:
+                raise PoolTimeoutError("QueuePool limit reached, connection timed out")
+            try:
+                await asyncio.sleep(hold)
+            finally:
+                pool.release()
+            return {"ok": True}
+        return handler
+
+    app = FastAPI()
+    for path, (_, hold) in ROUTES.items():
+        app.add_api_route(path, endpoint(hold))
+    app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+    if admission:
+        app.add_middleware(AdmissionMiddleware, router=app.router, controller=AdmissionController(limit=pool_size))
+    return app
+
+
+async def run(app: FastAPI, rate: float, duration: float, slo: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    paths, weights = list(ROUTES), [share for share, _ in ROUTES.values()]
+    results = {path: [] for path in ROUTES}
+    server_tasks = []
+    loop = asyncio.get_running_loop()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        async def one(path: str):
+            started = loop.time()
+            server = asyncio.create_task(client.get(path))
+            server_tasks.append(server)
+            try:
+                response = await asyncio.wait_for(asyncio.shield(server), slo)
+            except TimeoutError:
+                results[path].append(("timeout", slo))
+                return
+            results[path].append((response.status_code, loop.time() - started))
+
+        clients = []
+        start = loop.time()
+        at = 0.0
+        while at < duration:
+            await asyncio.sleep(max(0.0, start + at - loop.time()))
+            clients.append(asyncio.create_task(one(rng.choices(paths, weights)[0])))
+            at += rng.expovariate(rate)
+        await asyncio.gather(*clients)
+        for task in server_tasks:
+            task.cancel()
+        await asyncio.gather(*server_tasks, return_exceptions=True)
+    return results
+
+
+def report(name: str, results: dict, duration: float) -> None:
+    total = sum(len(r) for r in results.values())
+    good = [latency for r in results.values() for status, latency in r if status == 200]
+    print(f"{name}: offered {total / duration:6.1f} req/s, goodput {len(good) / duration:6.1f} req/s, "
+          f"p50 {statistics.median(good) * 1000 if good else 0:6.0f} ms")
+    for path, r in results.items():
+        counts = {}
+        for status, _ in r:
+            counts[status] = counts.get(status, 0) + 1
+        print(f"    {path:<22} " + "  ".join(f"{status}: {count}" for status, count in sorted(counts.items(), key=str)))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool", type=int, default=5)
+    parser.add_argument("--load", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--slo", type=float, default=1.0)
+    args = parser.parse_args()
+
+    mean_hold = sum(share * hold for share, hold in ROUTES.values())
+    capacity = args.pool / mean_hold
+    print(f"capacity {capacity:.0f} req/s, offered load {args.load:.1f}x")
+    for admission in (False, True):
+        results = await run(build_app(args.pool, admission), capacity * args.load, args.duration, args.slo, seed=1)
+        report("admission" if admission else "no admission", results, args.duration)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""
+Per-request cost of the IP and User-Agent blocklist.
+
+Usage:
+    python -m benchmarks.bench_blocklist [--networks 1000000] [--agents 200] [-n 100000]
+
+Builds a ``Blocklist`` of random IPv4 networks (prefix lengths 16 to 32) and User-Agent patterns
+and reports:
+
+- the time to build it, which ``python -m src.jobs.blocklist`` spends once per change;
+- the time a worker takes to load the resulting snapshot, and the longest the event loop is
+  blocked meanwhile;
+- the cost of an IP lookup and of a User-Agent match, for clients that are not blocked (the
+  common case, and the worst one, since every prefix length is probed);
+- the overhead ``BlocklistMiddleware`` adds to a request, compared with calling the app directly;
+- for reference, the previous approach (a list of ``ip_address`` objects and one ``re.search`` per
+  pattern) with the same lists, capped at 10,000 networks since it is linear in their number.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import time
+from ipaddress import ip_address
+
+from src.services.blocklist import Blocklist, BlocklistManager, BlocklistMiddleware
+
+LEGACY_LIMIT = 10_000
+
+
+def random_networks(count: int, rng: random.Random) -> list[str]:
+    networks = []
+    for _ in range(count):
+        prefix = rng.randint(16, 32)
+        address = rng.getrandbits(32) >> (32 - prefix) << (32 - prefix)
+        networks.append(f"{ip_address(address)}/{prefix}")
+    return networks
+
+
+def random_agents(count: int, rng: random.Random) -> list[str]:
+    return [rf"Bot{rng.getrandbits(32):08x}/\d+" for _ in range(count)]
+
+
+def per_call(func, args: list, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for arg in args:
+            func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best / len(args) * 1e9
+
+
+async def snapshot_load(blocklist: Blocklist) -> tuple[float, float, int]:
+    header, data = blocklist.dump()
+    header, data = json.dumps(header), base64.b64encode(data).decode()
+    longest, running = 0.0, True
+
+    async def ticker():
+        nonlocal longest
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            longest, last = max(longest, now - last), now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await Blocklist.load(json.loads(header), base64.b64decode(data))
+    elapsed = time.perf_counter() - start
+    running = False
+    await task
+    return elapsed, longest, len(data)
+
+
+async def middleware_overhead(blocklist: Blocklist, clients: list[str], user_agent: bytes) -> tuple[float, float]:
+    async def app(scope, receive, send):
+        pass
+
+    manager = BlocklistManager()
+    manager.current = blocklist
+    middleware = BlocklistMiddleware(app, manager)
+    headers = [(b"host", b"example.com"), (b"accept", b"*/*"), (b"user-agent", user_agent)]
+    scopes = [{"type": "http", "client": (ip, 1234), "headers": headers} for ip in clients]
+    timings = []
+    for handler in (app, middleware):
+        start = time.perf_counter()
+        for scope in scopes:
+            await handler(scope, None, None)
+        timings.append((time.perf_counter() - start) / len(scopes) * 1e9)
+    return timings[0], timings[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--networks", type=int, default=1_000_000)
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("-n", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    networks = random_networks(args.networks, rng)
+    agents = random_agents(args.agents, rng)
+    start = time.perf_counter()
+    blocklist = Blocklist(networks, agents)
+    print(f"build: {time.perf_counter() - start:.2f} s for {args.networks} networks, {args.agents} patterns")
+    elapsed, longest, size = asyncio.run(snapshot_load(blocklist))
+    print(f"snapshot load: {elapsed:.2f} s for {size / 1e6:.1f} MB, event loop blocked at most {longest * 1000:.0f} ms")
+
+    clients = [str(ip_address(rng.getrandbits(32))) for _ in range(args.n)]
+    allowed = [ip for ip in clients if ip not in blocklist.networks] or clients
+    user_agent = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    print(f"ip lookup: {per_call(blocklist.networks.__contains__, allowed):8.0f} ns")
+    print(f"user agent: {per_call(lambda ua: blocklist.blocks(None, ua), [user_agent] * 10_000):8.0f} ns")
+
+    bare, wrapped = asyncio.run(middleware_overhead(blocklist, allowed, user_agent.encode()))
+    print(f"middleware: {wrapped - bare:8.0f} ns/request overhead")
+
+    legacy_ips = [ip_address(network.split("/")[0]) for network in networks[:LEGACY_LIMIT]]
+    legacy_agents = agents
+
+    def legacy(ip: str) -> bool:
+        if ip_address(ip) in legacy_ips:
+            return True
+        return any(re.search(pattern, user_agent) for pattern in legacy_agents)
+
+    print(f"previous approach ({len(legacy_ips)} addresses, {len(legacy_agents)} patterns): "
+          f"{per_call(legacy, allowed[:200], repeat=1):8.0f} ns/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Duplicate detection over a synthetic address book.
+
+Usage:
+    python -m benchmarks.bench_dedup [-n 100000] [--dup-rate 0.05]
+
+A fraction of the generated contacts are noisy copies of others (email case and ``+tag``,
+phone formatting, misspelled names), so the run also reports how many of them are found.
+"""
+import argparse
+import random
+import time
+
+from src.services.dedup import ContactIdentity, find_duplicates
+
+FIRST = ["John", "Anna", "Peter", "Maria", "Olena", "Taras", "Kate", "Robert", "Iryna", "Mykola"]
+LAST = ["Smith", "Kowalska", "Shevchenko", "Brown", "Bondarenko", "Melnyk", "Taylor", "Koval"]
+
+
+def misspell(name: str, rnd: random.Random) -> str:
+    i = rnd.randrange(1, len(name))
+    return name[:i] + name[i:].replace(name[i], name[i] * 2, 1)
+
+
+def generate(n: int, dup_rate: float, seed: int = 1) -> tuple[list[ContactIdentity], int]:
+    rnd = random.Random(seed)
+    records, planted = [], 0
+    for i in range(n):
+        if records and rnd.random() < dup_rate:
+            src = rnd.choice(records)
+            local, domain = src.email.split("@")
+            records.append(ContactIdentity(i, misspell(src.first_name, rnd), src.last_name,
+                                           f"{local.upper()}+x@{domain}",
+                                           src.phone.replace("+380", "0") if src.phone else None))
+            planted += 1
+            continue
+        first, last = rnd.choice(FIRST), f"{rnd.choice(LAST)}{i}"
+        phone = f"+380{rnd.randrange(10 ** 9):09d}" if rnd.random() < 0.7 else None
+        records.append(ContactIdentity(i, first, last, f"{first}.{last}{i}@example.com".lower(), phone))
+    return records, planted
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100_000)
+    parser.add_argument("--dup-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    records, planted = generate(args.n, args.dup_rate)
+    start = time.perf_counter()
+    groups = find_duplicates(records)
+    elapsed = time.perf_counter() - start
+    found = sum(len(group["ids"]) - 1 for group in groups)
+    print(f"{args.n} contacts: {elapsed:.2f} s, {len(groups)} groups, "
+          f"{found} duplicates found / {planted} planted")
+
+
+if __name__ == "__main__":
+    main()
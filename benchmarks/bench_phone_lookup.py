@@ -0,0 +1,99 @@
+"""
+Latency of phone number lookups on a large contacts table.
+
+Usage:
+    python -m benchmarks.bench_phone_lookup [--db-url URL] [--rows 1000000] [--users 1000] [-n 5000]
+
+Without ``--db-url`` a temporary SQLite file is used. The database must be empty; the ``users`` and
+``contacts`` tables are created and filled with synthetic rows, then random exact and suffix lookups
+are timed through the repository function used by ``/contacts/phone/{phone}``.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.entity.models import Base, Contact, User
+from src.repository.contacts import get_contacts_by_phone
+from src.services.phone import reversed_digits
+
+CHUNK = 20_000
+
+
+def phone_of(i: int) -> str:
+    return f"+38067{i * 7919 % 10 ** 7:07d}"
+
+
+async def fill(engine, rows: int, users: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[User.__table__, Contact.__table__])
+        await conn.execute(insert(User.__table__), [
+            {"id": u, "username": f"user{u}", "email": f"user{u}@example.com", "password": "x"}
+            for u in range(1, users + 1)])
+    for start in range(0, rows, CHUNK):
+        async with engine.begin() as conn:
+            await conn.execute(insert(Contact.__table__), [
+                {"first_name": "Bench", "last_name": f"Contact{i}", "email": f"c{i}@example.com",
+                 "phone": phone_of(i), "phone_normalized": phone_of(i),
+                 "phone_reversed": reversed_digits(phone_of(i)), "user_id": i % users + 1}
+                for i in range(start, min(start + CHUNK, rows))])
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE contacts"))
+
+
+async def measure(session_factory, rows: int, users: int, n: int, match: str) -> list[float]:
+    rnd = random.Random(1)
+    timings = []
+    async with session_factory() as db:
+        for _ in range(n):
+            i = rnd.randrange(rows)
+            user = SimpleNamespace(id=i % users + 1)
+            phone = phone_of(i) if match == "exact" else phone_of(i)[-7:]
+            start = time.perf_counter()
+            found = await get_contacts_by_phone(phone, match, db, user)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert found, phone
+            db.expunge_all()
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("-n", type=int, default=5000)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db_url is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.db_url = f"sqlite+aiosqlite:///{tmp.name}"
+    engine = create_async_engine(args.db_url)
+    try:
+        start = time.perf_counter()
+        await fill(engine, args.rows, args.users)
+        print(f"filled {args.rows} contacts for {args.users} users in {time.perf_counter() - start:.1f} s")
+
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        for match in ("exact", "suffix"):
+            timings = await measure(session_factory, args.rows, args.users, args.n, match)
+            q = statistics.quantiles(timings, n=100)
+            print(f"{match:>6}: p50 {q[49]:.3f} ms  p99 {q[98]:.3f} ms  "
+                  f"{len(timings) / sum(timings) * 1000:.0f} lookups/s on one connection")
+    finally:
+        await engine.dispose()
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+Per-request overhead of the rate limiter dependency.
+
+Usage:
+    python -m benchmarks.bench_rate_limit [--redis-url redis://localhost:6379/0] [-n 20000]
+
+Without ``--redis-url`` an in-process fakeredis is used, which measures the Python-side cost only;
+point it at a real Redis to include the network round trip.
+"""
+import argparse
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import redis.asyncio as redis
+from fastapi import Response
+
+from src.database.redis_client import redismanager
+from src.services.rate_limit import RateLimiter
+
+
+def make_request(i: int):
+    request = MagicMock()
+    request.method = "GET"
+    request.scope = {"route": MagicMock(path="/api/contacts/")}
+    request.client.host = f"10.0.{i // 256 % 256}.{i % 256}"
+    request.headers = {}
+    return request
+
+
+async def run(limiter: RateLimiter | None, n: int, clients: int) -> float:
+    requests = [make_request(i) for i in range(clients)]
+    start = time.perf_counter()
+    for i in range(n):
+        if limiter is not None:
+            await limiter.check(requests[i % clients], Response())
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url")
+    parser.add_argument("-n", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.redis_url:
+        client = redis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    redismanager.init(client)
+    await client.flushdb()
+
+    baseline = await run(None, args.n, args.clients)
+    print(f"no limiter            {baseline:8.2f} us/request")
+    for batch in (1, 8, 32):
+        limiter = RateLimiter(times=10 ** 6, seconds=60, local_batch=batch)
+        cost = await run(limiter, args.n, args.clients)
+        print(f"limiter local_batch={batch:<3} {cost - baseline:8.2f} us/request added")
+
+    await redismanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
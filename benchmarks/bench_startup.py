@@ -0,0 +1,63 @@
+"""
+Cold-start cost of the application.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5]
+
+Reports the heaviest imports of ``import main`` (from ``python -X importtime``) and the
+time-to-first-request: from interpreter start to the first ``GET /`` answered by the app built
+with ``create_app()``. Target: time-to-first-request under 1 second on a developer machine.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+TARGET_SECONDS = 1.0
+
+FIRST_REQUEST = (
+    "from fastapi.testclient import TestClient\n"
+    "import main\n"
+    "assert TestClient(main.create_app()).get('/').status_code == 200\n"
+)
+
+
+def importtime(code: str, top: int):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        rows.append((int(cumulative_us), name.rstrip()))
+    total = next(us for us, name in reversed(rows) if name.strip() == "main")
+    print(f"import main: {total / 1000:.1f} ms cumulative; heaviest imports:")
+    for us, name in sorted(rows, reverse=True)[1:top + 1]:
+        print(f"  {us / 1000:8.1f} ms  {name.strip()}")
+
+
+def wall_time(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    importtime("import main", args.top)
+
+    interpreter = statistics.median(wall_time("pass") for _ in range(args.runs))
+    first_request = statistics.median(wall_time(FIRST_REQUEST) for _ in range(args.runs))
+    print(f"interpreter start:      {interpreter * 1000:8.1f} ms")
+    print(f"time-to-first-request:  {first_request * 1000:8.1f} ms "
+          f"(target {TARGET_SECONDS * 1000:.0f} ms: {'ok' if first_request <= TARGET_SECONDS else 'MISSED'})")
+
+
+if __name__ == "__main__":
+    main()
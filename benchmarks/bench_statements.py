@@ -0,0 +1,100 @@
+"""
+Python-side cost of dispatching a query: ORM vs. Core, rebuilt vs. prebuilt statements.
+
+Usage:
+    python -m benchmarks.bench_statements [-n 5000] [--profile]
+
+Runs "contact by ID" against an in-memory SQLite database with a few rows, so the time is spent
+almost entirely in SQLAlchemy and the driver rather than in the database:
+
+- ``orm rebuilt``: ``select(Contact).filter_by(...)`` built on every call, as before;
+- ``orm prebuilt``: ``repository.contacts.CONTACT_BY_ID`` with bound parameters;
+- ``orm lambda``: the same query as a ``lambda_stmt``;
+- ``core prebuilt``: a prebuilt Core select on the table, returning rows instead of entities.
+
+``--profile`` also counts Python function calls per query with cProfile, a measure of the
+overhead that does not depend on the machine.
+"""
+import argparse
+import asyncio
+import cProfile
+import pstats
+import time
+
+from sqlalchemy import bindparam, insert, lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.entity.models import Base, Contact, User
+from src.repository.contacts import CONTACT_BY_ID
+
+CONTACTS = Contact.__table__
+CORE_BY_ID = select(CONTACTS).where(CONTACTS.c.user_id == bindparam("user_id"), CONTACTS.c.id == bindparam("contact_id"))
+
+
+async def orm_rebuilt(db: AsyncSession, conn, user: User, contact_id: int):
+    stmt = select(Contact).filter_by(id=contact_id, user=user)
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def orm_prebuilt(db: AsyncSession, conn, user: User, contact_id: int):
+    return (await db.execute(CONTACT_BY_ID, {"user_id": user.id, "contact_id": contact_id})).scalar_one_or_none()
+
+
+async def orm_lambda(db: AsyncSession, conn, user: User, contact_id: int):
+    user_id = user.id
+    stmt = lambda_stmt(lambda: select(Contact).where(Contact.user_id == user_id, Contact.id == contact_id))
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def core_prebuilt(db: AsyncSession, conn, user: User, contact_id: int):
+    return (await conn.execute(CORE_BY_ID, {"user_id": user.id, "contact_id": contact_id})).first()
+
+
+VARIANTS = {"orm rebuilt": orm_rebuilt, "orm prebuilt": orm_prebuilt,
+            "orm lambda": orm_lambda, "core prebuilt": core_prebuilt}
+
+
+async def run(variant, db, conn, user, n: int) -> None:
+    for i in range(n):
+        found = await variant(db, conn, user, i % 10 + 1)
+        assert found is not None
+        db.expunge_all()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=5000)
+    parser.add_argument("--profile", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User.__table__), [{"id": 1, "username": "u", "email": "u@example.com",
+                                                      "password": "x"}])
+        await conn.execute(insert(CONTACTS), [{"id": i, "first_name": "F", "last_name": f"L{i}",
+                                               "email": f"c{i}@example.com", "phone": "0501234567", "user_id": 1}
+                                              for i in range(1, 11)])
+    try:
+        async with engine.connect() as conn, AsyncSession(bind=conn) as db:
+            user = await db.get(User, 1)
+            for name, variant in VARIANTS.items():
+                await run(variant, db, conn, user, 100)
+                start = time.perf_counter()
+                await run(variant, db, conn, user, args.n)
+                elapsed = time.perf_counter() - start
+                line = f"{name:>14}: {elapsed / args.n * 1e6:7.1f} us/query"
+                if args.profile:
+                    profiler = cProfile.Profile()
+                    profiler.enable()
+                    await run(variant, db, conn, user, 200)
+                    profiler.disable()
+                    line += f"  {pstats.Stats(profiler).total_calls / 200:6.0f} calls/query"
+                print(line)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
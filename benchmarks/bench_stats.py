@@ -0,0 +1,73 @@
+"""
+Latency of ``/contacts/stats`` aggregates for a single large account.
+
+Usage:
+    python -m benchmarks.bench_stats [--db-url URL] [--rows 1000000] [-n 20]
+
+Without ``--db-url`` a temporary SQLite file is used; the database must be empty. Reports the time
+of the uncached aggregate queries and of a cache hit served from (fake) Redis.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+from types import SimpleNamespace
+
+import fakeredis
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.bench_phone_lookup import fill
+from src.database.redis_client import redismanager
+from src.entity.models import Contact
+from src.repository.contacts import get_contact_stats
+from src.services import cache
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("-n", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db_url is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.db_url = f"sqlite+aiosqlite:///{tmp.name}"
+    engine = create_async_engine(args.db_url)
+    try:
+        await fill(engine, args.rows, users=1)
+        async with engine.begin() as conn:
+            table = Contact.__table__
+            await conn.execute(update(table).where(table.c.id % 3 == 0).values(birthday=date(1990, 5, 17)))
+            await conn.execute(update(table).where(table.c.id % 4 == 0).values(phone=None))
+
+        user = SimpleNamespace(id=1)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        timings = []
+        async with session_factory() as db:
+            for _ in range(args.n):
+                start = time.perf_counter()
+                stats = await get_contact_stats(db, user)
+                timings.append((time.perf_counter() - start) * 1000)
+        print(f"{stats['total']} contacts, aggregates: median {statistics.median(timings):.1f} ms")
+
+        redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+        await cache.set_json(cache.stats_key(user.id), stats, 600)
+        hits = 1000
+        start = time.perf_counter()
+        for _ in range(hits):
+            await cache.get_json(cache.stats_key(user.id))
+        print(f"cache hit: {(time.perf_counter() - start) / hits * 1000:.3f} ms mean")
+    finally:
+        await engine.dispose()
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""
+Database queries per second during login storms and token-validation spikes, with and without
+batching of user lookups.
+
+Usage:
+    python -m benchmarks.bench_user_loader [--db-url URL] [--users 1000] [--requests 5000] [--concurrency 200]
+
+Without ``--db-url`` a temporary SQLite file is used; on Postgres every query is also a network
+round trip, so the saving is larger there. Two scenarios run ``--requests`` requests with
+``--concurrency`` in flight at once, each in a session of its own as in the API:
+
+- ``token spike``: ``get_current_user`` with the access tokens of 50 active users, as when many
+  clients refresh their pages at once;
+- ``login storm``: the user lookup of ``/auth/login`` for ``--users`` distinct users (without
+  the bcrypt check, which does not touch the database).
+
+Reported per scenario: statements sent to the database, statements per request, requests per
+second and statements per second.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from unittest.mock import patch
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.conf.config import config
+from src.entity.models import Base, User
+from src.services.auth import auth_service
+from src.services.user_loader import UserLoader
+
+
+async def scenario(sessions: async_sessionmaker, loader: UserLoader, emails: list[str], tokens: dict[str, str],
+                   requests: int, concurrency: int) -> float:
+    rng = random.Random(1)
+    picks = [rng.choice(emails) for _ in range(requests)]
+    queue = iter(picks)
+
+    async def worker():
+        for email in queue:
+            async with sessions() as db:
+                if tokens:
+                    user = await auth_service.get_current_user(tokens[email], db)
+                else:
+                    user = await loader.load(email, db)
+                assert user is not None
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db_url is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.db_url = f"sqlite+aiosqlite:///{tmp.name}"
+    engine = create_async_engine(args.db_url, pool_size=config.DB_POOL_SIZE, max_overflow=config.DB_MAX_OVERFLOW,
+                                 pool_timeout=30)
+    emails = [f"loader{i}@example.com" for i in range(args.users)]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(delete(User).where(User.email.like("loader%@example.com")))
+        await conn.execute(insert(User.__table__), [{"username": email.split("@")[0], "email": email,
+                                                      "password": "x", "confirmed": True} for email in emails])
+    active = emails[:50]
+    tokens = {email: await auth_service.create_access_token({"sub": email}, 3600) for email in active}
+
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    sessions = async_sessionmaker(engine, class_=AsyncSession)
+    loader = UserLoader()
+    try:
+        for name, scenario_emails, scenario_tokens in (("token spike", active, tokens), ("login storm", emails, {})):
+            for enabled in (False, True):
+                statements = 0
+                with patch.object(config, "USER_LOADER_ENABLED", enabled), \
+                        patch("src.services.auth.user_loader", loader):
+                    elapsed = await scenario(sessions, loader, scenario_emails, scenario_tokens,
+                                             args.requests, args.concurrency)
+                print(f"{name:<12} {'batched' if enabled else 'unbatched':<9}  {statements:6d} statements  "
+                      f"{statements / args.requests:5.2f}/request  {args.requests / elapsed:7.0f} req/s  "
+                      f"{statements / elapsed:7.0f} statements/s")
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(User).where(User.email.like("loader%@example.com")))
+        await engine.dispose()
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+First-request latency after a worker restart, with and without the connection warm-up.
+
+Usage:
+    python -m benchmarks.bench_warmup [--db-url URL] [--restarts 20] [--concurrency 4]
+
+Without ``--db-url`` a temporary SQLite file is used; opening connections and preparing statements
+costs far more on Postgres, especially over TLS, so measure against the real database. Each restart
+builds a fresh ``DataBaseSessionManager`` (new pools, empty statement caches), optionally runs
+``warm_up`` and then times ``--concurrency`` simultaneous "first requests", each running the
+queries of a typical authenticated request: user by email, contact page and contact by ID.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import delete
+
+from benchmarks.bench_phone_lookup import fill
+from src.database.db import DataBaseSessionManager
+from src.database.warmup import warm_up
+from src.entity.models import Contact, User
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+
+
+async def first_request(manager: DataBaseSessionManager, user_id: int) -> float:
+    start = time.perf_counter()
+    async with manager.session() as db:
+        user = await repository_users.get_user_by_email(f"user{user_id}@example.com", db)
+        contacts = await repository_contacts.get_contacts(20, 0, db, user)
+        await repository_contacts.get_contact_by_id(contacts[0].id, db, user)
+    return (time.perf_counter() - start) * 1000
+
+
+async def restart(url: str, warm: bool, concurrency: int) -> list[float]:
+    manager = DataBaseSessionManager(url, shard_urls={})
+    try:
+        if warm:
+            await warm_up(manager, connections=concurrency)
+        return list(await asyncio.gather(*(first_request(manager, i % 10 + 1) for i in range(concurrency))))
+    finally:
+        await manager.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url")
+    parser.add_argument("--restarts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db_url is None:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.db_url = f"sqlite+aiosqlite:///{tmp.name}"
+    manager = DataBaseSessionManager(args.db_url, shard_urls={})
+    try:
+        await fill(manager.engine, rows=10_000, users=10)
+        await manager.close()
+
+        for warm in (False, True):
+            timings = []
+            for _ in range(args.restarts):
+                timings += await restart(args.db_url, warm, args.concurrency)
+            print(f"{'warm' if warm else 'cold'}: first request p50 {statistics.median(timings):.2f} ms  "
+                  f"max {max(timings):.2f} ms  ({args.restarts} restarts x {args.concurrency} requests)")
+    finally:
+        async with manager.engine.begin() as conn:
+            await conn.execute(delete(Contact))
+            await conn.execute(delete(User))
+        await manager.close()
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
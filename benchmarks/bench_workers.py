@@ -0,0 +1,84 @@
+"""
+Throughput scaling of ``python -m src.server`` with the number of workers.
+
+Usage:
+    python -m benchmarks.bench_workers [--workers 1 2 4] [--path /] [--seconds 10]
+
+For each worker count the server is started on a free port and loaded with concurrent keep-alive
+clients for a fixed time. Requests to ``/`` exercise the HTTP stack only; point ``--path`` at an
+authenticated endpoint (with ``--token``) to include the database.
+"""
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def load(url: str, headers: dict, concurrency: int, seconds: float) -> float:
+    done = 0
+    stop = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, headers=headers) as client:
+        async def client_loop():
+            nonlocal done
+            while time.monotonic() < stop:
+                response = await client.get(url)
+                if response.status_code < 500:
+                    done += 1
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return done / seconds
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--token")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+
+    baseline = None
+    for workers in args.workers:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "src.server", "--workers", str(workers),
+                                   "--host", "127.0.0.1", "--port", str(port)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            url = f"http://127.0.0.1:{port}{args.path}"
+            await wait_ready(url)
+            rps = await load(url, headers, args.concurrency, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        baseline = baseline or rps / workers
+        print(f"{workers:3d} workers: {rps:9.0f} req/s  (scaling efficiency {rps / (baseline * workers):.0%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,20 +1,21 @@
-from ipaddress import ip_address
 from pathlib import Path
-import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession
-import redis.asyncio as redis
-from src.database.db import get_db
-from src.routes import contacts, auth, users
-from fastapi_limiter import FastAPILimiter
+from src.database.db import get_db, sessionmanager
+from src.database.redis_client import redismanager, create_redis
 from src.conf.config import config
-from typing import Callable
-from starlette.responses import JSONResponse
-import re
+from src.services.admission import AdmissionMiddleware, pool_timeout_handler
+from src.services.blocklist import BlocklistMiddleware, blocklist_manager
+from src.services.events import event_hub
+from src.services.profiling import ProfilingMiddleware
+from src.services.timing import ServerTimingMiddleware
+from src.services.health import health_checker
+from src.services.avatars import CachedStaticFiles
 
 
 @asynccontextmanager
@@ -22,98 +23,31 @@ async def lifespan(app: FastAPI):
     """
     Lifespan handler for FastAPI application.
     Handles startup and shutdown events.
+
+    Pools are created here, inside each server worker, and closed when the worker stops. The
+    database pools are warmed up before the worker accepts requests.
     """
-    r = redis.Redis(
-        host=config.REDIS_DOMAIN,
-        port=config.REDIS_PORT,
-        password=config.REDIS_PASSWORD,
-        encoding="utf-8",
-        decode_responses=True
-    )
-    await FastAPILimiter.init(r)
+    from src.database.warmup import warm_up
+
+    sessionmanager.init()
+    await warm_up(sessionmanager)
+    redismanager.init(create_redis())
+    event_hub.start()
+    health_checker.start()
+    if config.BLOCKLIST_ENABLED:
+        blocklist_manager.start()
     yield
 
-    await r.close()
+    await blocklist_manager.stop()
+    await health_checker.stop()
+    await event_hub.stop()
+    await redismanager.close()
+    await sessionmanager.close()
 
 
-app = FastAPI(title="Contacts API",
-              version="1.0",
-              description="A REST API for managing contacts with authentication and rate limiting",
-              lifespan=lifespan
-              )
-
-# banned_ips = [
-#     ip_address("127.0.0.1"),
-#     ip_address("::1"),
-#     ip_address("244.178.44.111"),
-#     ip_address("::1"),
-#     ip_address("192.168.1.1"),
-#     ip_address("192.168.1.2"),
-#
-# ]
 origins = ["*"]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=origins,
-    allow_headers=origins,
-)
-
-# @app.middleware("http")
-# async def ban_ips(request: Request, call_next: Callable):
-#     """
-#     Middleware to block requests from banned IP addresses.
-#
-#     Args:
-#         request: Incoming request
-#         call_next: Next middleware/handler in chain
-#
-#     Returns:
-#         JSONResponse: 403 Forbidden if IP is banned
-#         Response: Normal response if IP is allowed
-#     """
-#     ip = ip_address(request.client.host)
-#     if ip in banned_ips:
-#         return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
-#     response = await call_next(request)
-#     return response
-
-# user_agent_ban_list = [r"Gecko", r"Python-urllib"]
-#
-#
-# @app.middleware("http")
-# async def user_agent_ban_middleware(request: Request, call_next: Callable):
-#     """
-#     Middleware to block requests based on User-Agent header patterns.
-#
-#     Args:
-#         request: Incoming request
-#         call_next: Next middleware/handler in chain
-#
-#     Returns:
-#         JSONResponse: 403 Forbidden if User-Agent matches banned pattern
-#         Response: Normal response if User-Agent is allowed
-#     """
-#     user_agent = request.headers.get("user-agent")
-#     for ban_pattern in user_agent_ban_list:
-#         if re.search(ban_pattern, user_agent):
-#             return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
-#     response = await call_next(request)
-#     return response
-static_dir = Path("src/static")
-if not static_dir.exists():
-    static_dir.mkdir(parents=True)
-
-app.mount("/static", StaticFiles(directory="src/static"), name="static")
-
-app.include_router(auth.router, prefix="/api")
-app.include_router(users.router, prefix="/api")
-app.include_router(contacts.router, prefix="/api")
-
-
-@app.get("/")
+
 def root():
     """
     Root endpoint that returns a welcome message.
@@ -124,11 +58,13 @@ def root():
     return {"message": "Contacts Application"}
 
 
-@app.get("/api/healthchecker")
 async def healthchecker(db: AsyncSession = Depends(get_db)):
     """
     Check the health of the application and database connection.
 
+    Every call checks out a pooled connection; orchestrator probes should use ``/livez`` and
+    ``/readyz`` instead.
+
     Args:
         db (AsyncSession): Database session dependency
 
@@ -145,3 +81,90 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
         return {"message": "Welcome to FastAPI!"}
     except Exception as e:
         raise HTTPException(status_code=500, detail="DB connection error")
+
+
+def livez():
+    """
+    Liveness probe: answers as long as the worker's event loop runs. Does no I/O.
+
+    Returns:
+        dict: ``{"status": "ok"}``
+    """
+    return {"status": "ok"}
+
+
+def readyz():
+    """
+    Readiness probe answered from the background health checker's last report.
+
+    See ``src.services.health`` for the checks; the probe itself does no I/O.
+
+    Returns:
+        JSONResponse: The report, with status 200 if the worker is ready and 503 otherwise
+    """
+    report = health_checker.report()
+    code = status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(report, status_code=code)
+
+
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application.
+
+    Routers (and the services they pull in) are imported here rather than at module level,
+    so importing ``main`` stays cheap. Run with ``uvicorn main:create_app --factory``;
+    ``main.app`` is still available and is built on first access.
+
+    Returns:
+        FastAPI: Configured application
+    """
+    from src.routes import contacts, auth, users
+
+    app = FastAPI(title="Contacts API",
+                  version="1.0",
+                  description="A REST API for managing contacts with authentication and rate limiting",
+                  lifespan=lifespan
+                  )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=origins,
+        allow_headers=origins,
+        expose_headers=["X-Total-Count"],
+    )
+    if config.SERVER_TIMING or config.ACCESS_LOG:
+        app.add_middleware(ServerTimingMiddleware)
+    if config.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)
+    if config.ADMISSION_ENABLED:
+        app.add_middleware(AdmissionMiddleware, router=app.router)
+    app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+    if config.BLOCKLIST_ENABLED:
+        # Added last, so blocked clients are rejected before any other middleware runs.
+        app.add_middleware(BlocklistMiddleware)
+
+    static_dir = Path("src/static")
+    if not static_dir.exists():
+        static_dir.mkdir(parents=True)
+
+    app.mount("/static", CachedStaticFiles(directory="src/static"), name="static")
+
+    app.include_router(auth.router, prefix="/api")
+    app.include_router(users.router, prefix="/api")
+    app.include_router(contacts.router, prefix="/api")
+
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/api/healthchecker", healthchecker, methods=["GET"])
+    app.add_api_route("/livez", livez, methods=["GET"])
+    app.add_api_route("/readyz", readyz, methods=["GET"])
+    return app
+
+
+def __getattr__(name):
+    if name == "app":
+        app = create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,37 @@
+"""add normalized contact phone
+
+Revision ID: 3b1f0c9d7a42
+Revises: e8b99e5c40eb
+Create Date: 2026-10-19 11:02:17.331954
+
+Existing rows are filled by ``python -m src.jobs.backfill_phones`` after upgrading.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b1f0c9d7a42'
+down_revision: Union[str, Sequence[str], None] = 'e8b99e5c40eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('phone_normalized', sa.String(length=16), nullable=True))
+    op.add_column('contacts', sa.Column('phone_reversed', sa.String(length=15), nullable=True))
+    op.create_index('ix_contacts_user_id_phone_normalized', 'contacts', ['user_id', 'phone_normalized'], unique=False)
+    op.create_index('ix_contacts_user_id_phone_reversed', 'contacts', ['user_id', 'phone_reversed'], unique=False,
+                    postgresql_ops={'phone_reversed': 'text_pattern_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_phone_reversed', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_phone_normalized', table_name='contacts')
+    op.drop_column('contacts', 'phone_reversed')
+    op.drop_column('contacts', 'phone_normalized')
@@ -0,0 +1,38 @@
+"""add contact counts
+
+Revision ID: 7d3e5a1c9b24
+Revises: 5c8e2d9f1a63
+Create Date: 2026-10-19 18:41:12.307518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3e5a1c9b24'
+down_revision: Union[str, Sequence[str], None] = '5c8e2d9f1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'contact_counts',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(
+        "INSERT INTO contact_counts (user_id, count) "
+        "SELECT user_id, count(*) FROM contacts WHERE user_id IS NOT NULL GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('contact_counts')
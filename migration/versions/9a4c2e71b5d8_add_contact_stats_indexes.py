@@ -0,0 +1,30 @@
+"""add contact stats indexes
+
+Revision ID: 9a4c2e71b5d8
+Revises: 3b1f0c9d7a42
+Create Date: 2026-10-19 12:24:05.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c2e71b5d8'
+down_revision: Union[str, Sequence[str], None] = '3b1f0c9d7a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_contacts_user_id_birthday', 'contacts', ['user_id', 'birthday'], unique=False)
+    op.create_index('ix_contacts_user_id_created_at', 'contacts', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_created_at', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_birthday', table_name='contacts')
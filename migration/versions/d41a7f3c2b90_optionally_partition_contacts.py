@@ -0,0 +1,46 @@
+"""optionally partition contacts by user_id
+
+Revision ID: d41a7f3c2b90
+Revises: 9a4c2e71b5d8
+Create Date: 2026-10-19 13:40:52.604117
+
+Does nothing unless the number of partitions is passed on the command line (Postgres only)::
+
+    alembic -x contact_partitions=16 upgrade head
+
+To partition a database that is already past this revision, run
+``python -m src.jobs.partition_contacts --partitions 16`` instead; do not downgrade, which would
+drop the tables of later revisions. Downgrading converts a partitioned table back into a plain one.
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+
+from src.database.partitioning import is_partitioned, partition_statements, unpartition_statements
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7f3c2b90'
+down_revision: Union[str, Sequence[str], None] = '9a4c2e71b5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    partitions = int(context.get_x_argument(as_dictionary=True).get("contact_partitions", 0))
+    bind = op.get_bind()
+    if partitions < 2 or bind.dialect.name != "postgresql" or is_partitioned(bind):
+        return
+    for statement in partition_statements(partitions):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_partitioned(bind):
+        return
+    for statement in unpartition_statements():
+        op.execute(statement)
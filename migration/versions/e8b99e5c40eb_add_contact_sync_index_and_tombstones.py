@@ -0,0 +1,40 @@
+"""add contact sync index and tombstones
+
+Revision ID: e8b99e5c40eb
+Revises: f5676eb0a02e
+Create Date: 2026-10-19 09:12:41.507214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b99e5c40eb'
+down_revision: Union[str, Sequence[str], None] = 'f5676eb0a02e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'contact_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('contact_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_tombstones_user_id_id', 'contact_tombstones', ['user_id', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_updated_at_id', 'contacts', ['user_id', 'updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_id_updated_at_id', table_name='contacts')
+    op.drop_index('ix_contact_tombstones_user_id_id', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
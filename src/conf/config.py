@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from decouple import config as c
 from pydantic import ConfigDict, field_validator, EmailStr
 from pydantic_settings import BaseSettings
@@ -27,6 +29,67 @@ class Settings(BaseSettings):
     REDIS_PORT: int = c("REDIS_PORT")
     REDIS_PASSWORD: str | None = c("REDIS_PASSWORD")
 
+    DB_ECHO: bool = c("DB_ECHO", default=False, cast=bool)
+    DB_POOL_SIZE: int = c("DB_POOL_SIZE", default=5, cast=int)
+    DB_MAX_OVERFLOW: int = c("DB_MAX_OVERFLOW", default=10, cast=int)
+    DB_POOL_MIN: int = c("DB_POOL_MIN", default=2, cast=int)
+    DB_POOL_TIMEOUT: float = c("DB_POOL_TIMEOUT", default=2, cast=float)
+    DB_STATEMENT_CACHE_SIZE: int = c("DB_STATEMENT_CACHE_SIZE", default=100, cast=int)
+    DB_PGBOUNCER: bool = c("DB_PGBOUNCER", default=False, cast=bool)
+    DB_SHARDS: str = c("DB_SHARDS", default="")
+    SHARD_DIRECTORY_TTL: int = c("SHARD_DIRECTORY_TTL", default=5, cast=int)
+    USER_LOADER_ENABLED: bool = c("USER_LOADER_ENABLED", default=True, cast=bool)
+    USER_LOADER_WINDOW: float = c("USER_LOADER_WINDOW", default=0, cast=float)
+    USER_LOADER_MAX_BATCH: int = c("USER_LOADER_MAX_BATCH", default=100, cast=int)
+
+    WEB_HOST: str = c("WEB_HOST", default="0.0.0.0")
+    WEB_PORT: int = c("WEB_PORT", default=8000, cast=int)
+    WEB_WORKERS: int = c("WEB_WORKERS", default=0, cast=int)
+    WEB_GRACEFUL_TIMEOUT: int = c("WEB_GRACEFUL_TIMEOUT", default=30, cast=int)
+
+    RATE_LIMIT_LOCAL_BATCH: int = c("RATE_LIMIT_LOCAL_BATCH", default=0, cast=int)
+    SYNC_SAFETY_WINDOW: int = c("SYNC_SAFETY_WINDOW", default=2, cast=int)
+    EVENTS_BUFFER_SIZE: int = c("EVENTS_BUFFER_SIZE", default=100, cast=int)
+    EVENTS_HEARTBEAT: int = c("EVENTS_HEARTBEAT", default=15, cast=int)
+    DIGEST_BATCH_SIZE: int = c("DIGEST_BATCH_SIZE", default=500, cast=int)
+    DIGEST_CONCURRENCY: int = c("DIGEST_CONCURRENCY", default=20, cast=int)
+    PHONE_DEFAULT_COUNTRY_CODE: str = c("PHONE_DEFAULT_COUNTRY_CODE", default="380")
+    AVATAR_PIPELINE: bool = c("AVATAR_PIPELINE", default=False, cast=bool)
+    AVATAR_MIRROR_CLOUDINARY: bool = c("AVATAR_MIRROR_CLOUDINARY", default=False, cast=bool)
+    AVATAR_WORKERS: int = c("AVATAR_WORKERS", default=2, cast=int)
+    UPLOAD_MAX_SIZE: int = c("UPLOAD_MAX_SIZE", default=5 * 1024 * 1024, cast=int)
+    UPLOAD_SPOOL_THRESHOLD: int = c("UPLOAD_SPOOL_THRESHOLD", default=1024 * 1024, cast=int)
+    CLOUDINARY_WORKERS: int = c("CLOUDINARY_WORKERS", default=4, cast=int)
+    CLOUDINARY_TIMEOUT: float = c("CLOUDINARY_TIMEOUT", default=10, cast=float)
+    STATS_WEEKS: int = c("STATS_WEEKS", default=12, cast=int)
+    STATS_TTL: int = c("STATS_TTL", default=600, cast=int)
+    PHONE_BACKFILL_BATCH_SIZE: int = c("PHONE_BACKFILL_BATCH_SIZE", default=1000, cast=int)
+    CONTACT_COUNT_BATCH_SIZE: int = c("CONTACT_COUNT_BATCH_SIZE", default=1000, cast=int)
+    HEALTH_CHECK_INTERVAL: float = c("HEALTH_CHECK_INTERVAL", default=2, cast=float)
+    HEALTH_CHECK_TIMEOUT: float = c("HEALTH_CHECK_TIMEOUT", default=1, cast=float)
+    HEALTH_MAX_POOL_USAGE: float = c("HEALTH_MAX_POOL_USAGE", default=0.9, cast=float)
+    HEALTH_MAX_LOOP_LAG: float = c("HEALTH_MAX_LOOP_LAG", default=0.5, cast=float)
+    JOB_WORKER_CONCURRENCY: int = c("JOB_WORKER_CONCURRENCY", default=4, cast=int)
+    JOB_MAX_ATTEMPTS: int = c("JOB_MAX_ATTEMPTS", default=5, cast=int)
+    JOB_BACKOFF_BASE: float = c("JOB_BACKOFF_BASE", default=2, cast=float)
+    JOB_BACKOFF_MAX: float = c("JOB_BACKOFF_MAX", default=300, cast=float)
+    JOB_TIMEOUT: int = c("JOB_TIMEOUT", default=60, cast=int)
+    JOB_CLAIM_IDLE: int = c("JOB_CLAIM_IDLE", default=120, cast=int)
+    BLOCKLIST_ENABLED: bool = c("BLOCKLIST_ENABLED", default=True, cast=bool)
+    PROFILING_ENABLED: bool = c("PROFILING_ENABLED", default=False, cast=bool)
+    PROFILING_TOKEN: str = c("PROFILING_TOKEN", default="")
+    PROFILING_SAMPLE_RATE: float = c("PROFILING_SAMPLE_RATE", default=0, cast=float)
+    PROFILING_INTERVAL: float = c("PROFILING_INTERVAL", default=0.001, cast=float)
+    PROFILING_DIR: str = c("PROFILING_DIR", default="profiles")
+    SERVER_TIMING: bool = c("SERVER_TIMING", default=True, cast=bool)
+    ACCESS_LOG: bool = c("ACCESS_LOG", default=False, cast=bool)
+    ADMISSION_ENABLED: bool = c("ADMISSION_ENABLED", default=True, cast=bool)
+    ADMISSION_MAX_CONCURRENCY: int = c("ADMISSION_MAX_CONCURRENCY", default=0, cast=int)
+    ADMISSION_MAX_QUEUE: int = c("ADMISSION_MAX_QUEUE", default=100, cast=int)
+    ADMISSION_QUEUE_TIMEOUT: float = c("ADMISSION_QUEUE_TIMEOUT", default=0.5, cast=float)
+    ADMISSION_LOW_SHARE: float = c("ADMISSION_LOW_SHARE", default=0.5, cast=float)
+    ADMISSION_RETRY_AFTER: float = c("ADMISSION_RETRY_AFTER", default=1, cast=float)
+
     @property
     def DB_URL(self) -> str:
         """
@@ -41,6 +104,29 @@ class Settings(BaseSettings):
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
 
+    @property
+    def DB_SHARD_URLS(self) -> dict[int, str]:
+        """
+        Parses ``DB_SHARDS`` into shard IDs and database URLs.
+
+        ``DB_SHARDS`` is a comma-separated list of ``<id>=<url>`` entries, e.g.
+        ``1=postgresql+asyncpg://...,2=postgresql+asyncpg://...``. Shard 0 is always the primary
+        database (``DB_URL``) and must not be listed.
+
+        Returns:
+            dict[int, str]: Database URL of each additional shard
+
+        Raises:
+            ValueError: If an entry is malformed or uses shard ID 0
+        """
+        shards = {}
+        for entry in filter(None, (e.strip() for e in self.DB_SHARDS.split(","))):
+            shard_id, sep, url = entry.partition("=")
+            if not sep or not shard_id.strip().isdigit() or int(shard_id) == 0:
+                raise ValueError(f"Invalid DB_SHARDS entry: {entry!r}")
+            shards[int(shard_id)] = url.strip()
+        return shards
+
     @field_validator("ALGORITHM")
     @classmethod
     def validate_algorithm(cls, v):
@@ -63,4 +149,26 @@ class Settings(BaseSettings):
     model_config = ConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")  # noqa
 
 
-config = Settings()
+@lru_cache
+def get_config() -> Settings:
+    """
+    Build the settings on first use and return the cached instance.
+
+    Returns:
+        Settings: Validated application settings
+    """
+    return Settings()
+
+
+class LazySettings:
+    """
+    Proxy that defers loading and validating the settings until an attribute is read.
+
+    Importing a module that uses ``config`` therefore costs nothing until the value is needed.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_config(), name)
+
+
+config = LazySettings()
@@ -1,18 +1,127 @@
 import contextlib
+import uuid
+
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, AsyncEngine, async_sessionmaker
 from src.conf.config import config
 
 
+PRIMARY = 0
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4().hex}__"
+
+
+def connect_args(url: str) -> dict:
+    """
+    Driver options of an engine: the asyncpg prepared statement caches, sized by
+    ``DB_STATEMENT_CACHE_SIZE`` and disabled with ``DB_PGBOUNCER``.
+
+    Behind PgBouncer in transaction pooling mode consecutive statements may run on different
+    server connections, so statements cannot stay prepared; unique names keep a statement name
+    from colliding with one prepared earlier on the same server connection.
+
+    Args:
+        url: Database URL of the engine
+
+    Returns:
+        dict: ``connect_args`` for ``create_async_engine``
+    """
+    if not url.startswith("postgresql+asyncpg"):
+        return {}
+    if config.DB_PGBOUNCER:
+        return {"statement_cache_size": 0, "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_statement_name}
+    return {"statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE}
+
+
 class DataBaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine = create_async_engine(url, echo=True)
-        self._session_maker = async_sessionmaker(autoflush=False, autocommit=False, bind=self._engine)
+    """
+    Owns the engines (and their connection pools) of the current process.
+
+    Engines are created by ``init()`` in the application lifespan, i.e. inside each server worker
+    after the process manager started it, so pooled connections are never shared across workers.
+    Code running outside the lifespan (scripts, jobs) gets the engines created on first use.
+
+    Besides the primary database (shard ``0``), which holds users and everything that is not
+    per-user, contacts can be spread over additional shard databases; see ``src.database.shards``
+    for how a user is mapped to a shard.
+    """
+
+    def __init__(self, url: str | None = None, shard_urls: dict[int, str] | None = None):
+        self._url = url
+        self._shard_urls = shard_urls
+        self._engines: dict[int, AsyncEngine] = {}
+        self._session_makers: dict[int, async_sessionmaker] = {}
+
+    def init(self, url: str | None = None, shard_urls: dict[int, str] | None = None) -> None:
+        """
+        Create the engines and session factories for this process.
+
+        Args:
+            url: Primary database URL; defaults to the URL given to the constructor, then ``config.DB_URL``
+            shard_urls: URLs of the additional shards by shard ID; defaults to the constructor
+                argument, then ``config.DB_SHARD_URLS``
+        """
+        urls = {PRIMARY: url or self._url or config.DB_URL}
+        shard_urls = shard_urls if shard_urls is not None else self._shard_urls
+        urls.update(shard_urls if shard_urls is not None else config.DB_SHARD_URLS)
+        for shard, shard_url in urls.items():
+            options = {}
+            if not shard_url.startswith("sqlite"):
+                options = dict(pool_size=config.DB_POOL_SIZE, max_overflow=config.DB_MAX_OVERFLOW,
+                               pool_timeout=config.DB_POOL_TIMEOUT)
+            engine = create_async_engine(shard_url, echo=config.DB_ECHO, pool_pre_ping=True,
+                                         connect_args=connect_args(shard_url), **options)
+            self._engines[shard] = engine
+            self._session_makers[shard] = async_sessionmaker(autoflush=False, autocommit=False, bind=engine)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """
+        Return the engine of the primary database, creating the engines on first use.
+        """
+        return self.shard_engine(PRIMARY)
+
+    def shard_engine(self, shard: int) -> AsyncEngine:
+        """
+        Return the engine of a shard, creating the engines on first use.
+
+        Args:
+            shard: Shard ID; ``0`` is the primary database
+        """
+        if not self._engines:
+            self.init()
+        return self._engines[shard]
+
+    @property
+    def shards(self) -> list[int]:
+        """
+        IDs of all configured shards, including the primary database.
+        """
+        if not self._engines:
+            self.init()
+        return sorted(self._engines)
+
+    async def close(self) -> None:
+        """
+        Dispose of the engines and close all pooled connections.
+        """
+        engines, self._engines, self._session_makers = self._engines, {}, {}
+        for engine in engines.values():
+            await engine.dispose()
 
     @contextlib.asynccontextmanager
-    async def session(self):
-        if self._session_maker is None:
-            raise Exception("Session maker not initialized")
-        session = self._session_maker()
+    async def session(self, shard: int = PRIMARY):
+        """
+        Open a session on the primary database or on a shard.
+
+        Args:
+            shard: Shard ID; ``0`` is the primary database
+        """
+        self.shard_engine(shard)
+        session = self._session_makers[shard]()
         try:
             yield session
         except Exception as e:
@@ -23,7 +132,7 @@ class DataBaseSessionManager:
             await session.close()
 
 
-sessionmanager = DataBaseSessionManager(config.DB_URL)
+sessionmanager = DataBaseSessionManager()
 
 
 async def get_db() -> AsyncSession:
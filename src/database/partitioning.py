@@ -0,0 +1,90 @@
+"""
+DDL converting ``contacts`` between a plain table and a Postgres table hash-partitioned by ``user_id``.
+
+Used by the optional partitioning migration and by ``benchmarks.bench_partitioning``. Postgres can
+only enforce primary keys and unique constraints that include the partition key, so the partitioned
+table has the primary key ``(id, user_id)`` and emails are unique per user instead of globally.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# (name, definition) of the indexes on contacts; on a partitioned table each partition gets its own copy.
+CONTACT_INDEXES = [
+    ("ix_contacts_user_id_updated_at_id", "(user_id, updated_at, id)"),
+    ("ix_contacts_user_id_phone_normalized", "(user_id, phone_normalized)"),
+    ("ix_contacts_user_id_phone_reversed", "(user_id, phone_reversed text_pattern_ops)"),
+    ("ix_contacts_user_id_birthday", "(user_id, birthday)"),
+    ("ix_contacts_user_id_created_at", "(user_id, created_at)"),
+]
+
+
+def is_partitioned(conn: Connection, table: str = "contacts") -> bool:
+    """
+    Check whether ``table`` in the current schema is a partitioned table.
+    """
+    sql = text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)")
+    return bool(conn.execute(sql, {"table": table}).scalar())
+
+
+def _create_indexes(table: str) -> list[str]:
+    return [f"CREATE INDEX {name} ON {table} {columns}" for name, columns in CONTACT_INDEXES]
+
+
+def partition_statements(partitions: int) -> list[str]:
+    """
+    Statements replacing the plain ``contacts`` table with ``partitions`` hash partitions.
+
+    Rows are copied in a single ``INSERT ... SELECT``; run it in a maintenance window, the table is
+    locked for the duration of the copy. Contacts without a ``user_id`` make the copy fail and have to
+    be removed first.
+
+    Args:
+        partitions: Number of hash partitions
+
+    Returns:
+        list[str]: SQL statements to execute in one transaction
+    """
+    statements = [
+        "LOCK TABLE contacts IN ACCESS EXCLUSIVE MODE",
+        "CREATE TABLE contacts_partitioned (LIKE contacts INCLUDING DEFAULTS) PARTITION BY HASH (user_id)",
+        "ALTER TABLE contacts_partitioned ALTER COLUMN user_id SET NOT NULL",
+    ]
+    statements += [
+        f"CREATE TABLE contacts_p{i} PARTITION OF contacts_partitioned "
+        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+        for i in range(partitions)
+    ]
+    statements += [
+        "INSERT INTO contacts_partitioned SELECT * FROM contacts",
+        "ALTER SEQUENCE contacts_id_seq OWNED BY contacts_partitioned.id",
+        "DROP TABLE contacts",
+        "ALTER TABLE contacts_partitioned RENAME TO contacts",
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_pkey PRIMARY KEY (id, user_id)",
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_user_id_email_key UNIQUE (user_id, email)",
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)",
+    ]
+    statements += _create_indexes("contacts")
+    statements.append("ANALYZE contacts")
+    return statements
+
+
+def unpartition_statements() -> list[str]:
+    """
+    Statements turning a partitioned ``contacts`` table back into a plain table.
+
+    Returns:
+        list[str]: SQL statements to execute in one transaction
+    """
+    statements = [
+        "LOCK TABLE contacts IN ACCESS EXCLUSIVE MODE",
+        "CREATE TABLE contacts_plain (LIKE contacts INCLUDING DEFAULTS)",
+        "INSERT INTO contacts_plain SELECT * FROM contacts",
+        "ALTER SEQUENCE contacts_id_seq OWNED BY contacts_plain.id",
+        "DROP TABLE contacts",
+        "ALTER TABLE contacts_plain RENAME TO contacts",
+        "ALTER TABLE contacts ALTER COLUMN user_id DROP NOT NULL",
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_pkey PRIMARY KEY (id)",
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_email_key UNIQUE (email)",
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)",
+    ]
+    return statements + _create_indexes("contacts") + ["ANALYZE contacts"]
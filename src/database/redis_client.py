@@ -0,0 +1,71 @@
+import redis.asyncio as redis
+
+from src.conf.config import config
+
+
+class RedisManager:
+    """
+    Holds the process-wide Redis client.
+
+    The client is created in the application lifespan and registered here, so services
+    (rate limiting, caches, pub/sub) share one connection pool per worker.
+    """
+
+    def __init__(self):
+        self._client: redis.Redis | None = None
+
+    def init(self, client: redis.Redis) -> None:
+        """
+        Register the Redis client used by the application.
+
+        Args:
+            client: Connected asyncio Redis client
+        """
+        self._client = client
+
+    @property
+    def client(self) -> redis.Redis:
+        """
+        Return the registered Redis client.
+
+        Raises:
+            RuntimeError: If no client has been registered yet
+        """
+        if self._client is None:
+            raise RuntimeError("Redis client not initialized")
+        return self._client
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
+
+    async def close(self) -> None:
+        """
+        Close the registered client and forget it.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+redismanager = RedisManager()
+
+
+def create_redis() -> redis.Redis:
+    """
+    Create an asyncio Redis client from the application settings.
+
+    Returns:
+        redis.Redis: Client decoding responses as UTF-8 strings
+    """
+    return redis.Redis(
+        host=config.REDIS_DOMAIN,
+        port=config.REDIS_PORT,
+        password=config.REDIS_PASSWORD,
+        encoding="utf-8",
+        decode_responses=True
+    )
+
+
+async def get_redis() -> redis.Redis:
+    return redismanager.client
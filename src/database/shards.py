@@ -0,0 +1,227 @@
+"""
+Routing of per-user data to shard databases.
+
+Users, and everything that is not per-user, stay on the primary database (shard ``0``). A user's
+contacts live on one shard, chosen by a consistent hash ring over the configured shard IDs, so
+adding a shard moves only about ``1/N`` of the users. A ``user_shards`` directory entry on the
+primary overrides the ring for users that were moved elsewhere and marks users that are being
+moved; see ``src.jobs.rebalance_shards``.
+
+Contact and tombstone IDs must stay unique across shards, because users move between them with
+their IDs. On Postgres, ``align_sequences`` makes shard ``N`` allocate IDs ``≡ N (mod MAX_SHARDS)``.
+"""
+import bisect
+import contextlib
+import hashlib
+import time
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import ForeignKeyConstraint, MetaData, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from src.conf.config import config
+from src.database.db import PRIMARY, DataBaseSessionManager, get_db, sessionmanager
+from src.entity.models import Contact, ContactCount, ContactTombstone, User, UserShard
+from src.services.auth import auth_service
+
+VNODES = 128
+MAX_SHARDS = 64
+SHARDED_TABLES = (Contact.__table__, ContactTombstone.__table__, ContactCount.__table__)
+_DIRECTORY_CACHE_SIZE = 100_000
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping user IDs to shard IDs.
+
+    Each shard is placed on the ring ``vnodes`` times, which evens out the share of users per shard.
+    """
+
+    def __init__(self, shards: list[int], vnodes: int = VNODES):
+        points = sorted((_hash(f"shard-{shard}#{i}"), shard) for shard in shards for i in range(vnodes))
+        self._points = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, user_id: int) -> int:
+        """
+        Return the shard the ring assigns to ``user_id``.
+        """
+        i = bisect.bisect(self._points, _hash(f"user-{user_id}")) % len(self._points)
+        return self._shards[i]
+
+
+class ShardRouter:
+    """
+    Locates the shard of a user: the directory entry if there is one, otherwise the hash ring.
+
+    Directory lookups are cached for ``SHARD_DIRECTORY_TTL`` seconds per process; with a single
+    database configured no lookup is made at all.
+    """
+
+    def __init__(self, manager: DataBaseSessionManager = sessionmanager, ttl: float | None = None):
+        self.manager = manager
+        self._ttl = ttl
+        self._ring: HashRing | None = None
+        self._ring_shards: list[int] | None = None
+        self._directory: dict[int, tuple[int | None, bool, float]] = {}
+
+    @property
+    def ttl(self) -> float:
+        return config.SHARD_DIRECTORY_TTL if self._ttl is None else self._ttl
+
+    @property
+    def ring(self) -> HashRing:
+        shards = self.manager.shards
+        if self._ring is None or self._ring_shards != shards:
+            self._ring, self._ring_shards = HashRing(shards), shards
+        return self._ring
+
+    def forget(self, *user_ids: int) -> None:
+        """
+        Drop cached directory entries, e.g. after changing them.
+        """
+        for user_id in user_ids:
+            self._directory.pop(user_id, None)
+
+    async def locate_many(self, user_ids: list[int], db: AsyncSession, cached: bool = True) -> dict[int, tuple[int, bool]]:
+        """
+        Find the shards of several users with at most one directory query.
+
+        Args:
+            user_ids: IDs of the users
+            db: Session on the primary database
+            cached: Whether cached directory entries may be used
+
+        Returns:
+            dict[int, tuple[int, bool]]: Shard of each user and whether the user is being moved
+        """
+        if len(self.manager.shards) == 1:
+            return {user_id: (PRIMARY, False) for user_id in user_ids}
+        now = time.monotonic()
+        entries = {}
+        missing = []
+        for user_id in user_ids:
+            entry = self._directory.get(user_id) if cached else None
+            if entry is not None and entry[2] > now:
+                entries[user_id] = entry[:2]
+            else:
+                missing.append(user_id)
+        if missing:
+            stmt = select(UserShard.user_id, UserShard.shard, UserShard.moving).where(UserShard.user_id.in_(missing))
+            found = {row.user_id: (row.shard, row.moving) for row in await db.execute(stmt)}
+            if len(self._directory) > _DIRECTORY_CACHE_SIZE:
+                self._directory.clear()
+            for user_id in missing:
+                entries[user_id] = found.get(user_id, (None, False))
+                self._directory[user_id] = (*entries[user_id], now + self.ttl)
+        return {user_id: (self.ring.shard_for(user_id) if shard is None else shard, moving)
+                for user_id, (shard, moving) in entries.items()}
+
+    async def locate(self, user_id: int, db: AsyncSession, cached: bool = True) -> tuple[int, bool]:
+        """
+        Find the shard of a user.
+
+        Args:
+            user_id: ID of the user
+            db: Session on the primary database
+            cached: Whether a cached directory entry may be used
+
+        Returns:
+            tuple[int, bool]: Shard ID and whether the user is being moved
+        """
+        return (await self.locate_many([user_id], db, cached))[user_id]
+
+    @contextlib.asynccontextmanager
+    async def session_for(self, user_id: int):
+        """
+        Open a session on the shard holding the user's contacts, for code running outside a request.
+
+        Args:
+            user_id: ID of the user
+        """
+        async with self.manager.session() as db:
+            shard, _ = await self.locate(user_id, db)
+            if shard == PRIMARY:
+                yield db
+                return
+        async with self.manager.session(shard) as session:
+            yield session
+
+
+shard_router = ShardRouter()
+
+
+async def get_user_db(user: User = Depends(auth_service.get_current_user),
+                      db: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """
+    Dependency yielding a session on the shard holding the current user's contacts.
+
+    With a single database this is the request's primary session itself.
+
+    Raises:
+        HTTPException: 503 while the user's contacts are being moved to another shard
+    """
+    shard, moving = await shard_router.locate(user.id, db)
+    if moving:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Contacts are being moved, try again shortly",
+                            headers={"Retry-After": str(max(1, round(shard_router.ttl)))})
+    if shard == PRIMARY:
+        yield db
+        return
+    async with sessionmanager.session(shard) as session:
+        yield session
+
+
+def shard_metadata() -> MetaData:
+    """
+    Schema of a shard database: the per-user tables without their foreign keys to ``users``,
+    which only exists on the primary.
+    """
+    metadata = MetaData()
+    for table in SHARDED_TABLES:
+        copy = table.to_metadata(metadata)
+        for constraint in [c for c in copy.constraints if isinstance(c, ForeignKeyConstraint)]:
+            copy.constraints.discard(constraint)
+        copy.foreign_keys.clear()
+        for column in copy.columns:
+            column.foreign_keys.clear()
+    return metadata
+
+
+async def align_sequences(conn: AsyncConnection, shard: int) -> None:
+    """
+    Make the ID sequences of a Postgres shard allocate IDs ``≡ shard (mod MAX_SHARDS)`` above every
+    ID in use. Does nothing on other databases.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for table in SHARDED_TABLES:
+        if "id" not in table.c:
+            continue
+        sequence = f"{table.name}_id_seq"
+        used = (await conn.execute(text(
+            f"SELECT greatest((SELECT coalesce(max(id), 0) FROM {table.name}), (SELECT last_value FROM {sequence}))"
+        ))).scalar_one()
+        start = used - used % MAX_SHARDS + MAX_SHARDS + shard
+        await conn.execute(text(f"ALTER SEQUENCE {sequence} INCREMENT BY {MAX_SHARDS} RESTART WITH {start}"))
+
+
+async def prepare_shards(manager: DataBaseSessionManager = sessionmanager) -> None:
+    """
+    Create the schema of every shard that lacks it and align the ID sequences of all databases.
+
+    Raises:
+        ValueError: If a shard ID is not below ``MAX_SHARDS``
+    """
+    if max(manager.shards) >= MAX_SHARDS:
+        raise ValueError(f"Shard IDs must be below {MAX_SHARDS}")
+    for shard in manager.shards:
+        async with manager.shard_engine(shard).begin() as conn:
+            if shard != PRIMARY:
+                await conn.run_sync(shard_metadata().create_all)
+            await align_sequences(conn, shard)
@@ -0,0 +1,78 @@
+"""
+Connection warm-up at worker startup.
+
+Without it, the first requests after a deploy pay for opening pool connections (TCP, TLS and
+authentication) and for compiling and preparing their statements. ``warm_up`` runs in the
+lifespan, before the worker accepts requests, and:
+
+- opens ``DB_POOL_MIN`` connections per database and returns them to the pool;
+- runs the hot repository queries (user by email, contact page, contact by ID) once on each of
+  those connections, with parameters matching nothing. This fills SQLAlchemy's compiled cache
+  and, on Postgres, the per-connection cache of prepared statements of the asyncpg driver
+  (``DB_STATEMENT_CACHE_SIZE`` entries).
+
+Behind PgBouncer in transaction pooling mode (``DB_PGBOUNCER``) prepared statements cannot be
+cached, since consecutive statements may reach different server connections; the warm-up then
+only opens the connections.
+"""
+import asyncio
+import contextlib
+import time
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from src.conf.config import config
+from src.database.db import PRIMARY, DataBaseSessionManager
+from src.entity.models import User
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+
+WARMUP_TIMEOUT = 10
+_NOBODY = 0
+
+
+async def _prepare(conn: AsyncConnection, shard: int) -> None:
+    nobody = User(id=_NOBODY)
+    async with AsyncSession(bind=conn, expire_on_commit=False) as db:
+        if shard == PRIMARY:
+            await repository_users.get_user_by_email("warmup@invalid", db)
+        await repository_contacts.get_contacts(10, 0, db, nobody)
+        await repository_contacts.get_contact_by_id(_NOBODY, db, nobody)
+        await db.rollback()
+
+
+async def _warm_shard(manager: DataBaseSessionManager, shard: int, connections: int) -> None:
+    engine = manager.shard_engine(shard)
+    async with contextlib.AsyncExitStack() as stack:
+        # Hold every connection at once, so the pool has to open ``connections`` distinct ones.
+        conns = await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(connections)))
+        if not config.DB_PGBOUNCER:
+            for conn in conns:
+                await _prepare(conn, shard)
+
+
+async def warm_up(manager: DataBaseSessionManager, connections: int | None = None) -> None:
+    """
+    Open pool connections and prepare the hot statements on every database.
+
+    Failures are logged and never prevent startup; the readiness check reports an unreachable
+    database.
+
+    Args:
+        manager: Session manager of the worker, already initialized
+        connections: Connections to open per database; defaults to ``DB_POOL_MIN``, capped at
+            ``DB_POOL_SIZE`` so the warmed connections stay in the pool
+    """
+    connections = min(config.DB_POOL_MIN if connections is None else connections, config.DB_POOL_SIZE)
+    if connections <= 0:
+        return
+    started = time.perf_counter()
+    try:
+        async with asyncio.timeout(WARMUP_TIMEOUT):
+            await asyncio.gather(*(_warm_shard(manager, shard, connections) for shard in manager.shards))
+    except Exception as err:
+        print(f"Database warm-up failed: {err!r}")
+        return
+    print(f"Warmed up {connections} connection(s) on {len(manager.shards)} database(s) "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
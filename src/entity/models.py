@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from datetime import date
-from sqlalchemy import String, Date, Integer, ForeignKey, DateTime, func, Boolean
+from datetime import date, datetime
+from sqlalchemy import String, Date, Integer, ForeignKey, DateTime, func, Boolean, Index
 from sqlalchemy.orm import DeclarativeBase
 from typing import Optional
 
@@ -11,19 +11,57 @@ class Base(DeclarativeBase):
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        Index("ix_contacts_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        Index("ix_contacts_user_id_phone_normalized", "user_id", "phone_normalized"),
+        Index("ix_contacts_user_id_phone_reversed", "user_id", "phone_reversed",
+              postgresql_ops={"phone_reversed": "text_pattern_ops"}),
+        Index("ix_contacts_user_id_birthday", "user_id", "birthday"),
+        Index("ix_contacts_user_id_created_at", "user_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     first_name: Mapped[str] = mapped_column(String(50), nullable=False)
     last_name: Mapped[str] = mapped_column(String(50), nullable=False)
     email: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
     phone: Mapped[str] = mapped_column(String(20), nullable=True)
+    phone_normalized: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    phone_reversed: Mapped[Optional[str]] = mapped_column(String(15), nullable=True)
     birthday: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
     created_at: Mapped[date] = mapped_column('created_at', DateTime, default=func.now(), nullable=True)
     updated_at: Mapped[date] = mapped_column('updated_at', DateTime, default=func.now(), onupdate=func.now(),
                                              nullable=True)
     additional_data: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
-    user: Mapped["User"] = relationship("User", back_populates="contacts", lazy="joined")
+    # Contacts may live on a shard without the users table, so the owner is never joined in.
+    user: Mapped["User"] = relationship("User", back_populates="contacts", lazy="select")
+
+    # Identify rows by (id, user_id) so the UPDATE and DELETE statements emitted on flush filter on
+    # the partition key of a partitioned contacts table (see src.database.partitioning).
+    __mapper_args__ = {"primary_key": [id, user_id]}
+
+
+class ContactTombstone(Base):
+    __tablename__ = "contact_tombstones"
+    __table_args__ = (
+        Index("ix_contact_tombstones_user_id_id", "user_id", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    contact_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), nullable=False)
+
+
+class ContactCount(Base):
+    """
+    Number of contacts of a user, kept in the same database as the contacts and changed in the same
+    transaction as them, so pagination can report a total without counting.
+    """
+    __tablename__ = "contact_counts"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
 
 class User(Base):
@@ -38,5 +76,16 @@ class User(Base):
     created_at: Mapped[date] = mapped_column('created_at', DateTime, default=func.now())
     updated_at: Mapped[date] = mapped_column('updated_at', DateTime, default=func.now(), onupdate=func.now())
 
-    contacts: Mapped[list["Contact"]] = relationship("Contact", back_populates="user", lazy="selectin")
+    contacts: Mapped[list["Contact"]] = relationship("Contact", back_populates="user", lazy="noload")
     confirmed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=True)
+
+
+class UserShard(Base):
+    """
+    Directory entry placing a user on a shard other than the one chosen by the hash ring.
+    """
+    __tablename__ = "user_shards"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False)
+    moving: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
@@ -0,0 +1,58 @@
+"""
+Backfill of normalized phone numbers.
+
+Contacts saved before ``phone_normalized`` existed are not found by ``/contacts/phone/{phone}``
+until this job has run once after the migration::
+
+    python -m src.jobs.backfill_phones [--shard N --after-id N]
+
+Contacts are rewritten in ID order in batches of ``PHONE_BACKFILL_BATCH_SIZE``, each batch in its own
+short transaction, so the table is never locked for long and the API keeps serving writes. The job
+is idempotent; ``--shard`` with ``--after-id`` resumes an interrupted run from the last ID it printed.
+"""
+import argparse
+import asyncio
+
+from src.conf.config import config
+from src.database.db import PRIMARY, sessionmanager
+from src.repository import contacts as repository_contacts
+
+
+async def run_backfill(after_id: int, batch_size: int, shard: int = PRIMARY) -> int:
+    """
+    Normalize the phone numbers of all contacts on a shard with an ID greater than ``after_id``.
+
+    Args:
+        after_id (int): ID to start after.
+        batch_size (int): Number of contacts updated per transaction.
+        shard (int): Shard to process.
+
+    Returns:
+        int: ID of the last processed contact.
+    """
+    while True:
+        async with sessionmanager.session(shard) as db:
+            last_id = await repository_contacts.backfill_normalized_phones(after_id, batch_size, db)
+        if last_id is None:
+            return after_id
+        after_id = last_id
+        print(f"Phone backfill: shard {shard} done up to contact {after_id}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shard", type=int)
+    parser.add_argument("--after-id", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        if args.shard is not None:
+            await run_backfill(args.after_id, config.PHONE_BACKFILL_BATCH_SIZE, args.shard)
+            return
+        for shard in sessionmanager.shards:
+            await run_backfill(0, config.PHONE_BACKFILL_BATCH_SIZE, shard)
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
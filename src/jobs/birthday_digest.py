@@ -0,0 +1,150 @@
+"""
+Nightly birthday digest.
+
+Precomputes every user's upcoming birthdays into Redis, so ``/contacts/upcoming-birthdays`` is a
+cache read, and emails one digest per user who has any. Run it once a day, e.g. from cron::
+
+    python -m src.jobs.birthday_digest
+
+Users are processed in ID order in batches of ``DIGEST_BATCH_SIZE``. The last finished user ID is
+checkpointed in Redis after every batch and users that already got their email are remembered, so a
+crashed run can simply be started again and continues where it stopped. At most
+``DIGEST_CONCURRENCY`` emails are sent at once.
+
+Users whose email failed are recorded in Redis and retried at the end of every run, including
+runs started again after the last batch, until the digest expires.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date
+
+from src.conf.config import config
+from src.database.db import sessionmanager
+from src.database.redis_client import redismanager, create_redis
+from src.database.shards import ShardRouter
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.schemas.contact import ContactResponse
+from src.services import cache
+from src.services.email import send_birthday_digest
+
+DIGEST_TTL = 2 * 24 * 60 * 60
+
+
+def cursor_key(day: date) -> str:
+    return f"digest:{day.isoformat()}:cursor"
+
+
+def sent_key(day: date) -> str:
+    return f"digest:{day.isoformat()}:sent"
+
+
+def failed_key(day: date) -> str:
+    return f"digest:{day.isoformat()}:failed"
+
+
+async def _send_digest(user_id: int, email: str, username: str, birthdays: list[dict], day: date,
+                       limit: asyncio.Semaphore) -> None:
+    redis = redismanager.client
+    if await redis.sismember(sent_key(day), user_id):
+        return
+    try:
+        async with limit:
+            await send_birthday_digest(email, username, birthdays)
+    except Exception as err:
+        print(f"Birthday digest for user {user_id} failed: {err}")
+        await redis.hset(failed_key(day), user_id,
+                         json.dumps({"email": email, "username": username, "birthdays": birthdays}))
+        await redis.expire(failed_key(day), DIGEST_TTL)
+        return
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.sadd(sent_key(day), user_id)
+        pipe.expire(sent_key(day), DIGEST_TTL)
+        pipe.hdel(failed_key(day), user_id)
+        await pipe.execute()
+
+
+async def retry_failed(day: date, limit: asyncio.Semaphore) -> int:
+    """
+    Send the digests of ``day`` again that failed before, with the birthdays of the failed attempt.
+
+    Args:
+        day (date): Day the digest is computed for.
+        limit (asyncio.Semaphore): Bounds the emails sent at once.
+
+    Returns:
+        int: Number of digests still failed.
+    """
+    redis = redismanager.client
+    sends = []
+    for user_id, recipient in (await redis.hgetall(failed_key(day))).items():
+        recipient = json.loads(recipient)
+        sends.append(_send_digest(int(user_id), recipient["email"], recipient["username"], recipient["birthdays"],
+                                  day, limit))
+    await asyncio.gather(*sends)
+    return await redis.hlen(failed_key(day))
+
+
+async def run_digest(day: date, batch_size: int) -> int:
+    """
+    Build the digests for ``day``, resuming from the last checkpoint.
+
+    Args:
+        day (date): Day the digest is computed for.
+        batch_size (int): Number of users loaded per batch.
+
+    Returns:
+        int: Number of users processed by this run.
+    """
+    redis = redismanager.client
+    router = ShardRouter(sessionmanager)
+    limit = asyncio.Semaphore(config.DIGEST_CONCURRENCY)
+    after_id = int(await redis.get(cursor_key(day)) or 0)
+    processed = 0
+    while True:
+        async with sessionmanager.session() as db:
+            users = await repository_users.get_users_batch(after_id, batch_size, db)
+            if not users:
+                break
+            located = await router.locate_many([u.id for u in users], db)
+        by_shard = defaultdict(list)
+        for user_id, (shard, _) in located.items():
+            by_shard[shard].append(user_id)
+        # Taken before reading, so a digest read before a change to the contacts is not cached.
+        generations = await cache.generations([user.id for user in users])
+        upcoming = {}
+        for shard, user_ids in by_shard.items():
+            async with sessionmanager.session(shard) as db:
+                upcoming.update(await repository_contacts.get_upcoming_birthdays_for_users(user_ids, db, day))
+
+        sends = []
+        for user in users:
+            birthdays = [ContactResponse.model_validate(contact).model_dump(mode="json")
+                         for contact in upcoming.get(user.id, [])]
+            await cache.set_json_if_current(cache.birthdays_key(user.id, day), birthdays, DIGEST_TTL, user.id,
+                                            generations[user.id])
+            if birthdays:
+                sends.append(_send_digest(user.id, user.email, user.username, birthdays, day, limit))
+        await asyncio.gather(*sends)
+
+        after_id = users[-1].id
+        await redis.set(cursor_key(day), after_id, ex=DIGEST_TTL)
+        processed += len(users)
+    await retry_failed(day, limit)
+    return processed
+
+
+async def main():
+    redismanager.init(create_redis())
+    try:
+        day = date.today()
+        processed = await run_digest(day, config.DIGEST_BATCH_SIZE)
+        failed = await redismanager.client.hlen(failed_key(day))
+        print(f"Birthday digest: processed {processed} users, {failed} digests failed and will be retried")
+    finally:
+        await redismanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Editing of the IP and User-Agent blocklists.
+
+Entries are stored in Redis. After every change the command builds the compiled lists and stores
+them as a new snapshot, which every server worker loads as soon as it is announced, without a
+restart::
+
+    python -m src.jobs.blocklist add-ip 203.0.113.7 198.51.100.0/24 2001:db8::/32
+    python -m src.jobs.blocklist remove-ip 203.0.113.7
+    python -m src.jobs.blocklist add-agent "python-urllib" "(?i)sqlmap"
+    python -m src.jobs.blocklist remove-agent "python-urllib"
+    python -m src.jobs.blocklist load-ips networks.txt    # replaces the whole IP list, one entry per line
+    python -m src.jobs.blocklist publish    # rebuilds the snapshot from the stored entries
+    python -m src.jobs.blocklist show
+
+Entries are validated before they are stored, so a typo cannot reach the workers.
+"""
+import argparse
+import asyncio
+import ipaddress
+from collections.abc import Iterable
+
+from src.database.redis_client import create_redis, redismanager
+from src.services.blocklist import IPS_KEY, SNAPSHOT_KEY, USER_AGENTS_KEY, Blocklist, publish_snapshot
+
+LOAD_BATCH = 10_000
+
+
+def _validate_networks(entries: Iterable[str]) -> list[str]:
+    networks = []
+    for entry in entries:
+        entry = entry.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        try:
+            networks.append(str(ipaddress.ip_network(entry, strict=False)))
+        except ValueError as err:
+            raise SystemExit(f"Invalid IP address or network {entry!r}: {err}")
+    return networks
+
+
+def _validate_patterns(patterns: Iterable[str]) -> list[str]:
+    for pattern in patterns:
+        if Blocklist(user_agents=[pattern]).user_agent_count != 1:
+            raise SystemExit(f"Invalid User-Agent pattern {pattern!r}")
+    return list(patterns)
+
+
+async def replace_ips(networks: list[str]) -> int:
+    """
+    Replace the whole IP list.
+
+    The new list is written to a temporary key and renamed over the old one, so workers reloading
+    meanwhile see either the old or the new list.
+
+    Returns:
+        int: Number of stored entries
+    """
+    client = redismanager.client
+    staging = f"{IPS_KEY}:staging"
+    await client.delete(staging)
+    for start in range(0, len(networks), LOAD_BATCH):
+        await client.sadd(staging, *networks[start:start + LOAD_BATCH])
+    if networks:
+        await client.rename(staging, IPS_KEY)
+    else:
+        await client.delete(IPS_KEY)
+    return len(networks)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("add-ip", "remove-ip", "add-agent", "remove-agent"):
+        commands.add_parser(name).add_argument("entries", nargs="+")
+    commands.add_parser("load-ips").add_argument("file", type=argparse.FileType())
+    commands.add_parser("publish")
+    commands.add_parser("show")
+    args = parser.parse_args()
+
+    redismanager.init(create_redis())
+    try:
+        client = redismanager.client
+        if args.command == "show":
+            print(f"Snapshot version: {await client.hget(SNAPSHOT_KEY, 'version') or 'none'}")
+            print(f"IPs: {await client.scard(IPS_KEY)}")
+            for pattern in sorted(await client.smembers(USER_AGENTS_KEY)):
+                print(f"User-Agent: {pattern}")
+            return
+        if args.command == "publish":
+            changed = 0
+        elif args.command == "add-ip":
+            changed = await client.sadd(IPS_KEY, *_validate_networks(args.entries))
+        elif args.command == "remove-ip":
+            changed = await client.srem(IPS_KEY, *_validate_networks(args.entries))
+        elif args.command == "add-agent":
+            changed = await client.sadd(USER_AGENTS_KEY, *_validate_patterns(args.entries))
+        elif args.command == "remove-agent":
+            changed = await client.srem(USER_AGENTS_KEY, *args.entries)
+        else:
+            with args.file:
+                changed = await replace_ips(_validate_networks(args.file))
+        version = await publish_snapshot()
+        print(f"{args.command}: {changed} entries changed, published snapshot version {version}")
+    finally:
+        await redismanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Hash partitioning of an existing ``contacts`` table by ``user_id`` (Postgres only).
+
+The ``d41a7f3c2b90`` migration only partitions a database that is migrated past it with
+``-x contact_partitions=N``. A database that is already past that revision is partitioned in place
+with this job, without downgrading and losing the tables of later revisions::
+
+    python -m src.jobs.partition_contacts --partitions 16 [--shard N]
+
+Every shard is converted in a single transaction that locks ``contacts`` while the rows are copied,
+so run it in a maintenance window. Shards that are already partitioned, or are not Postgres, are
+skipped, so the job can be run again after an interruption.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database.db import sessionmanager
+from src.database.partitioning import is_partitioned, partition_statements
+
+
+async def run_partition(engine: AsyncEngine, partitions: int) -> bool:
+    """
+    Replace the plain ``contacts`` table of a database with ``partitions`` hash partitions.
+
+    Args:
+        engine (AsyncEngine): Engine of the database to convert.
+        partitions (int): Number of hash partitions.
+
+    Returns:
+        bool: True if the table was converted, False if it was skipped.
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    async with engine.begin() as conn:
+        if await conn.run_sync(is_partitioned):
+            return False
+        for statement in partition_statements(partitions):
+            await conn.exec_driver_sql(statement)
+    return True
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partitions", type=int, required=True)
+    parser.add_argument("--shard", type=int)
+    args = parser.parse_args()
+    if args.partitions < 2:
+        parser.error("--partitions must be at least 2")
+    try:
+        shards = [args.shard] if args.shard is not None else sessionmanager.shards
+        for shard in shards:
+            converted = await run_partition(sessionmanager.shard_engine(shard), args.partitions)
+            print(f"Partition contacts: shard {shard} {'partitioned' if converted else 'skipped'}")
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""
+Rebalancing of users between shard databases.
+
+Shards are configured in ``DB_SHARDS``. Changing that list changes where the hash ring places
+users, so existing users have to be pinned to their current shard before the change and moved
+afterwards::
+
+    python -m src.jobs.rebalance_shards pin          # with the old DB_SHARDS
+    # deploy the new DB_SHARDS
+    python -m src.jobs.rebalance_shards rebalance    # moves users to where the ring now puts them
+
+A single user can also be placed on a shard explicitly; the directory entry then overrides the ring
+until the next ``rebalance``::
+
+    python -m src.jobs.rebalance_shards move --user 42 --shard 3
+
+Users are moved in batches. A batch is first marked as moving, which makes the API answer 503 for
+those users; the job then waits until every worker has seen the mark (``SHARD_DIRECTORY_TTL``), so
+no write can race with the copy. Each user's contacts and tombstones are copied with their IDs,
+the directory is switched and the source rows are deleted.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import delete, insert, select
+
+from src.database.shards import SHARDED_TABLES, ShardRouter, align_sequences, prepare_shards, shard_router
+from src.entity.models import UserShard
+from src.repository import users as repository_users
+
+
+async def _set_directory(router: ShardRouter, entries: dict[int, int | None], moving: bool = False) -> None:
+    async with router.manager.session() as db:
+        user_ids = list(entries)
+        await db.execute(delete(UserShard).where(UserShard.user_id.in_(user_ids)))
+        db.add_all([UserShard(user_id=user_id, shard=shard, moving=moving)
+                    for user_id, shard in entries.items() if shard is not None])
+        await db.commit()
+    router.forget(*entries)
+
+
+async def _copy_user(router: ShardRouter, user_id: int, source: int, target: int) -> int:
+    async with router.manager.session(source) as src, router.manager.session(target) as dst:
+        copied = 0
+        for table in SHARDED_TABLES:
+            rows = [dict(row._mapping) for row in await src.execute(select(table).where(table.c.user_id == user_id))]
+            await dst.execute(delete(table).where(table.c.user_id == user_id))
+            if rows:
+                await dst.execute(insert(table), rows)
+            copied += len(rows)
+        await dst.commit()
+        async with router.manager.shard_engine(target).begin() as conn:
+            await align_sequences(conn, target)
+        return copied
+
+
+async def _delete_user(router: ShardRouter, user_id: int, shard: int) -> None:
+    async with router.manager.session(shard) as db:
+        for table in SHARDED_TABLES:
+            await db.execute(delete(table).where(table.c.user_id == user_id))
+        await db.commit()
+
+
+async def move_users(router: ShardRouter, targets: dict[int, int], keep_override: bool = False) -> int:
+    """
+    Move users' contacts to other shards.
+
+    Args:
+        router: Shard router of the process
+        targets: Target shard of each user
+        keep_override: Keep a directory entry even when the target is the ring's choice
+
+    Returns:
+        int: Number of users moved
+    """
+    async with router.manager.session() as db:
+        located = await router.locate_many(list(targets), db, cached=False)
+    sources = {user_id: shard for user_id, (shard, _) in located.items()}
+    targets = {user_id: target for user_id, target in targets.items() if sources[user_id] != target}
+    if not targets:
+        return 0
+
+    pending = dict(targets)
+    await _set_directory(router, {user_id: sources[user_id] for user_id in pending}, moving=True)
+    try:
+        await asyncio.sleep(router.ttl)
+        for user_id, target in targets.items():
+            copied = await _copy_user(router, user_id, sources[user_id], target)
+            ring_choice = router.ring.shard_for(user_id) == target
+            await _set_directory(router, {user_id: None if ring_choice and not keep_override else target})
+            del pending[user_id]
+            await _delete_user(router, user_id, sources[user_id])
+            print(f"Moved user {user_id} from shard {sources[user_id]} to shard {target} ({copied} rows)")
+    finally:
+        if pending:
+            await _set_directory(router, {user_id: sources[user_id] for user_id in pending})
+    return len(targets)
+
+
+async def _iter_user_batches(router: ShardRouter, batch_size: int):
+    after_id = 0
+    while True:
+        async with router.manager.session() as db:
+            users = await repository_users.get_users_batch(after_id, batch_size, db)
+        if not users:
+            return
+        yield [user.id for user in users]
+        after_id = users[-1].id
+
+
+async def pin(router: ShardRouter, batch_size: int) -> int:
+    """
+    Record every user's current shard in the directory, so a change of the ring does not move them.
+
+    Returns:
+        int: Number of users pinned
+    """
+    pinned = 0
+    async for user_ids in _iter_user_batches(router, batch_size):
+        async with router.manager.session() as db:
+            located = await router.locate_many(user_ids, db, cached=False)
+        await _set_directory(router, {user_id: shard for user_id, (shard, _) in located.items()})
+        pinned += len(user_ids)
+    return pinned
+
+
+async def rebalance(router: ShardRouter, batch_size: int) -> int:
+    """
+    Move every user to the shard the ring assigns and drop directory entries that became redundant.
+
+    Returns:
+        int: Number of users moved
+    """
+    moved = 0
+    async for user_ids in _iter_user_batches(router, batch_size):
+        moved += await move_users(router, {user_id: router.ring.shard_for(user_id) for user_id in user_ids})
+        async with router.manager.session() as db:
+            located = await router.locate_many(user_ids, db, cached=False)
+        redundant = [user_id for user_id, (shard, _) in located.items() if shard == router.ring.shard_for(user_id)]
+        if redundant:
+            await _set_directory(router, dict.fromkeys(redundant))
+    return moved
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=100)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("pin")
+    commands.add_parser("rebalance")
+    move = commands.add_parser("move")
+    move.add_argument("--user", type=int, required=True)
+    move.add_argument("--shard", type=int, required=True)
+    args = parser.parse_args()
+
+    try:
+        await prepare_shards(shard_router.manager)
+        if args.command == "pin":
+            print(f"Pinned {await pin(shard_router, args.batch_size)} users")
+        elif args.command == "rebalance":
+            print(f"Moved {await rebalance(shard_router, args.batch_size)} users")
+        else:
+            if args.shard not in shard_router.manager.shards:
+                parser.error(f"unknown shard {args.shard}, configured: {shard_router.manager.shards}")
+            await move_users(shard_router, {args.user: args.shard}, keep_override=True)
+    finally:
+        await shard_router.manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
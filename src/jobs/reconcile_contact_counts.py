@@ -0,0 +1,66 @@
+"""
+Reconciliation of the maintained contact counts.
+
+``contact_counts`` holds the number of contacts of every user and is updated in the same transaction
+as each create, delete and merge, so it only drifts if contacts are changed outside the API (manual
+SQL, restored backups). This job recounts and repairs it::
+
+    python -m src.jobs.reconcile_contact_counts [--shard N --after-id N]
+
+Users are processed in ID order in batches of ``CONTACT_COUNT_BATCH_SIZE``, each batch in its own
+short transaction, so the API keeps serving writes. Every repaired count is printed. The job is
+idempotent; ``--shard`` with ``--after-id`` resumes an interrupted run from the last ID it printed.
+"""
+import argparse
+import asyncio
+
+from src.conf.config import config
+from src.database.db import PRIMARY, sessionmanager
+from src.repository import contacts as repository_contacts
+
+
+async def run_reconcile(after_id: int, batch_size: int, shard: int = PRIMARY) -> int:
+    """
+    Repair the contact counts of all users on a shard with an ID greater than ``after_id``.
+
+    Args:
+        after_id (int): User ID to start after.
+        batch_size (int): Number of users checked per transaction.
+        shard (int): Shard to process.
+
+    Returns:
+        int: Number of repaired counts.
+    """
+    repaired = 0
+    while True:
+        async with sessionmanager.session(shard) as db:
+            user_ids = await repository_contacts.get_counted_user_ids(after_id, batch_size, db)
+            if not user_ids:
+                return repaired
+            fixed = await repository_contacts.reconcile_contact_counts(user_ids, db)
+        for user_id, (stored, actual) in fixed.items():
+            print(f"Contact counts: shard {shard} user {user_id}: {stored} -> {actual}")
+        repaired += len(fixed)
+        after_id = user_ids[-1]
+        print(f"Contact counts: shard {shard} done up to user {after_id}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shard", type=int)
+    parser.add_argument("--after-id", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        if args.shard is not None:
+            repaired = await run_reconcile(args.after_id, config.CONTACT_COUNT_BATCH_SIZE, args.shard)
+        else:
+            repaired = 0
+            for shard in sessionmanager.shards:
+                repaired += await run_reconcile(0, config.CONTACT_COUNT_BATCH_SIZE, shard)
+        print(f"Contact counts: repaired {repaired}")
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
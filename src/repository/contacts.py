@@ -1,10 +1,193 @@
-from sqlalchemy import select
+import base64
+import binascii
+import json
+from sqlalchemy import bindparam, cast, extract, select, func, tuple_, update, Date, Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import AsyncIterator
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.entity.models import Contact, User
+from src.conf.config import config
+from src.entity.models import Contact, ContactCount, ContactTombstone, User
 from src.schemas.contact import ContactCreate, ContactUpdate
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from src.services import cache, events
+from src.services.phone import normalize_phone, reversed_digits, suffix_pattern
+
+UPCOMING_DAYS = 7
+
+# Hot queries are built once with bound parameters. A call then only binds values: no construct
+# is rebuilt and its cache key, computed once per statement object, hits SQLAlchemy's compiled cache.
+_OWNED = Contact.user_id == bindparam("user_id")
+CONTACTS_PAGE = select(Contact).where(_OWNED).offset(bindparam("offset")).limit(bindparam("limit"))
+CONTACT_BY_ID = select(Contact).where(_OWNED, Contact.id == bindparam("contact_id"))
+CONTACT_BY_EMAIL = select(Contact).where(_OWNED, Contact.email == bindparam("email"))
+CONTACTS_BY_FIRST_NAME = select(Contact).where(_OWNED, Contact.first_name == bindparam("first_name"))
+CONTACTS_BY_LAST_NAME = select(Contact).where(_OWNED, Contact.last_name == bindparam("last_name"))
+CONTACTS_BY_PHONE = (select(Contact).where(_OWNED, Contact.phone_normalized == bindparam("phone"))
+                     .order_by(Contact.id).limit(bindparam("limit")))
+CONTACTS_BY_PHONE_SUFFIX = (select(Contact).where(_OWNED, Contact.phone_reversed.like(bindparam("pattern")))
+                            .order_by(Contact.id).limit(bindparam("limit")))
+CONTACT_COUNT = select(ContactCount.count).where(ContactCount.user_id == bindparam("user_id"))
+# The counter statements are Core statements on the table; "user_id" is reserved in INSERT and
+# UPDATE statements on contact_counts, hence "owner".
+_COUNTS = ContactCount.__table__
+COUNT_UPDATE = (update(_COUNTS).where(_COUNTS.c.user_id == bindparam("owner"))
+                .values(count=_COUNTS.c.count + bindparam("delta", type_=Integer)))
+
+
+def _count_upsert(insert):
+    # Creates a missing row from the actual count, so counts start right for users whose contacts
+    # predate the row; if another transaction created it meanwhile, adjusts it by ``delta`` instead.
+    owner = bindparam("owner", type_=Integer)
+    actual = select(owner, func.count()).where(Contact.user_id == owner)
+    stmt = insert(_COUNTS).from_select([_COUNTS.c.user_id, _COUNTS.c.count], actual)
+    return stmt.on_conflict_do_update(index_elements=[_COUNTS.c.user_id],
+                                      set_={"count": _COUNTS.c.count + bindparam("delta", type_=Integer)})
+
+
+COUNT_UPSERTS = {"postgresql": _count_upsert(postgresql.insert), "sqlite": _count_upsert(sqlite.insert)}
+
+
+def is_upcoming_birthday(birthday: date | None, today: date) -> bool:
+    """
+    Check whether a birthday falls within the next ``UPCOMING_DAYS`` days.
+
+    February 29 birthdays are celebrated on February 28 in non-leap years.
+
+    Args:
+        birthday (date | None): Contact's date of birth.
+        today (date): Reference day.
+
+    Returns:
+        bool: True if the next anniversary is within the window.
+    """
+    if birthday is None:
+        return False
+    for year in (today.year, today.year + 1):
+        try:
+            anniversary = birthday.replace(year=year)
+        except ValueError:
+            anniversary = date(year, 2, 28)
+        if anniversary >= today:
+            return anniversary <= today + timedelta(days=UPCOMING_DAYS)
+    return False
+
+
+def _set_phone(contact: Contact):
+    contact.phone_normalized = normalize_phone(contact.phone)
+    contact.phone_reversed = reversed_digits(contact.phone_normalized)
+
+
+async def _invalidate_user_cache(user: User):
+    # Runs after the commit: failing the request would invite a retry of a write that succeeded.
+    # Without Redis the cached values expire with their TTL.
+    try:
+        await cache.invalidate_user(user.id, cache.birthdays_key(user.id, date.today()), cache.stats_key(user.id))
+    except Exception as err:
+        print(f"Failed to invalidate the cache of user {user.id}: {err}")
+
+
+async def _change_count(db: AsyncSession, user_id: int, delta: int) -> None:
+    """
+    Adjust the contact count of a user in the current transaction, after flushing pending changes.
+    """
+    await db.flush()
+    params = {"owner": user_id, "delta": delta}
+    if (await db.execute(COUNT_UPDATE, params)).rowcount == 0:
+        await db.execute(COUNT_UPSERTS[db.get_bind().dialect.name], params)
+
+
+async def get_contact_count(db: AsyncSession, user: User) -> int:
+    """
+    Return the number of contacts of the current user from the maintained count.
+
+    A user without a count row yet (e.g. right after moving to a new shard) gets one created from the
+    actual count.
+
+    Args:
+        db (AsyncSession): Database session.
+        user (User): The current authenticated user.
+
+    Returns:
+        int: Number of contacts.
+    """
+    count = (await db.execute(CONTACT_COUNT, {"user_id": user.id})).scalar_one_or_none()
+    if count is None:
+        await _change_count(db, user.id, 0)
+        await db.commit()
+        count = (await db.execute(CONTACT_COUNT, {"user_id": user.id})).scalar_one()
+    return count
+
+
+async def count_contacts(user_ids: list[int], db: AsyncSession) -> dict[int, int]:
+    """
+    Count the contacts of several users with ``COUNT(*)``, for reconciling the maintained counts.
+
+    Args:
+        user_ids (list[int]): IDs of the users.
+        db (AsyncSession): Database session.
+
+    Returns:
+        dict[int, int]: Number of contacts per user ID; users without contacts are omitted.
+    """
+    stmt = (select(Contact.user_id, func.count()).where(Contact.user_id.in_(user_ids))
+            .group_by(Contact.user_id))
+    return dict((await db.execute(stmt)).all())
+
+
+async def get_counted_user_ids(after_id: int, limit: int, db: AsyncSession) -> list[int]:
+    """
+    Return the next user IDs having contacts or a contact count (keyset pagination).
+
+    Args:
+        after_id (int): Return users with an ID greater than this value.
+        limit (int): Maximum number of IDs to return.
+        db (AsyncSession): Database session.
+
+    Returns:
+        list[int]: User IDs in ascending order.
+    """
+    owners = select(Contact.user_id).where(Contact.user_id > after_id).distinct().order_by(Contact.user_id)
+    counted = select(_COUNTS.c.user_id).where(_COUNTS.c.user_id > after_id).order_by(_COUNTS.c.user_id)
+    user_ids = set((await db.execute(owners.limit(limit))).scalars())
+    user_ids.update((await db.execute(counted.limit(limit))).scalars())
+    return sorted(user_ids)[:limit]
+
+
+async def reconcile_contact_counts(user_ids: list[int], db: AsyncSession) -> dict[int, tuple[int | None, int]]:
+    """
+    Repair the maintained contact counts of several users in one transaction.
+
+    The count rows are locked before the contacts are counted, so a concurrent create or delete,
+    which also updates its row, is applied on top of the repaired value instead of being lost.
+    Missing rows are created unless a concurrent write created them first.
+
+    Args:
+        user_ids (list[int]): IDs of the users.
+        db (AsyncSession): Database session.
+
+    Returns:
+        dict[int, tuple[int | None, int]]: Stored (``None`` if missing) and actual count of every
+        user whose count was wrong.
+    """
+    stored = dict((await db.execute(
+        select(_COUNTS.c.user_id, _COUNTS.c.count).where(_COUNTS.c.user_id.in_(user_ids)).with_for_update()
+    )).all())
+    actual = await count_contacts(user_ids, db)
+    fixed = {}
+    for user_id in user_ids:
+        count = actual.get(user_id, 0)
+        if stored.get(user_id) == count or (user_id not in stored and count == 0):
+            continue
+        fixed[user_id] = (stored.get(user_id), count)
+        if user_id in stored:
+            await db.execute(update(_COUNTS).where(_COUNTS.c.user_id == user_id).values(count=count))
+        else:
+            insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+            await db.execute(insert(_COUNTS).values(user_id=user_id, count=count).on_conflict_do_nothing())
+    await db.commit()
+    return fixed
 
 
 async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User):
@@ -20,8 +203,7 @@ async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User):
     Returns:
         List[Contact]: List of user's contacts.
     """
-    stmt = select(Contact).filter_by(user=user).offset(offset).limit(limit)
-    result = await db.execute(stmt)
+    result = await db.execute(CONTACTS_PAGE, {"user_id": user.id, "offset": offset, "limit": limit})
     return result.scalars().all()
 
 
@@ -37,8 +219,7 @@ async def get_contact_by_id(contact_id: int, db: AsyncSession, user: User):
     Returns:
         Contact | None: Contact instance if found, else None.
     """
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
-    result = await db.execute(stmt)
+    result = await db.execute(CONTACT_BY_ID, {"user_id": user.id, "contact_id": contact_id})
     return result.scalar_one_or_none()
 
 
@@ -54,11 +235,72 @@ async def get_contact_by_email(email: str, db: AsyncSession, user: User):
     Returns:
         Contact | None: Contact instance if found, else None.
     """
-    stmt = select(Contact).filter_by(email=email, user=user)
-    result = await db.execute(stmt)
+    result = await db.execute(CONTACT_BY_EMAIL, {"user_id": user.id, "email": email})
     return result.scalar_one_or_none()
 
 
+async def get_contacts_by_phone(phone: str, match: str, db: AsyncSession, user: User, limit: int = 20):
+    """
+    Retrieve contacts by phone number for the current user.
+
+    Both the query and the stored numbers are compared in normalized E.164 form, so
+    ``050 123 4567`` finds a contact saved as ``+380 (50) 123-45-67``.
+
+    Args:
+        phone (str): Phone number in any format, or its last digits for a suffix match.
+        match (str): ``exact`` for the whole number, ``suffix`` for numbers ending with ``phone``.
+        db (AsyncSession): Database session.
+        user (User): The current authenticated user.
+        limit (int): Maximum number of contacts to return.
+
+    Returns:
+        List[Contact]: Matching contacts, empty if ``phone`` cannot be normalized.
+    """
+    if match == "suffix":
+        pattern = suffix_pattern(phone)
+        if pattern is None:
+            return []
+        stmt, params = CONTACTS_BY_PHONE_SUFFIX, {"pattern": pattern}
+    else:
+        normalized = normalize_phone(phone)
+        if normalized is None:
+            return []
+        stmt, params = CONTACTS_BY_PHONE, {"phone": normalized}
+    result = await db.execute(stmt, {**params, "user_id": user.id, "limit": limit})
+    return result.scalars().all()
+
+
+async def backfill_normalized_phones(after_id: int, limit: int, db: AsyncSession) -> int | None:
+    """
+    Fill ``phone_normalized`` for one batch of contacts saved before the column existed.
+
+    Args:
+        after_id (int): Only contacts with a greater ID are considered.
+        limit (int): Batch size.
+        db (AsyncSession): Database session.
+
+    Returns:
+        int | None: ID of the last contact in the batch, or None when there is nothing left.
+    """
+    stmt = (select(Contact.id, Contact.user_id, Contact.phone).where(Contact.id > after_id)
+            .order_by(Contact.id).limit(limit))
+    rows = (await db.execute(stmt)).all()
+    if not rows:
+        return None
+    params = []
+    for contact_id, user_id, phone in rows:
+        normalized = normalize_phone(phone)
+        params.append({"contact_id": contact_id, "owner_id": user_id,
+                       "normalized": normalized, "reversed": reversed_digits(normalized)})
+    contacts = Contact.__table__
+    stmt = (update(contacts)
+            .where(contacts.c.id == bindparam("contact_id"), contacts.c.user_id == bindparam("owner_id"))
+            .values(phone_normalized=bindparam("normalized"), phone_reversed=bindparam("reversed")))
+    await db.execute(stmt, params)
+    await db.commit()
+    return rows[-1].id
+
+
 async def get_contacts_by_first_name(first_name: str, db: AsyncSession, user: User):
     """
     Retrieve contacts by first name for the current user.
@@ -71,8 +313,7 @@ async def get_contacts_by_first_name(first_name: str, db: AsyncSession, user: Us
     Returns:
         List[Contact]: List of matching contacts.
     """
-    stmt = select(Contact).filter_by(first_name=first_name, user=user)
-    result = await db.execute(stmt)
+    result = await db.execute(CONTACTS_BY_FIRST_NAME, {"user_id": user.id, "first_name": first_name})
     return result.scalars().all()
 
 
@@ -88,8 +329,7 @@ async def get_contacts_by_last_name(last_name: str, db: AsyncSession, user: User
     Returns:
         List[Contact]: List of matching contacts.
     """
-    stmt = select(Contact).filter_by(last_name=last_name, user=user)
-    result = await db.execute(stmt)
+    result = await db.execute(CONTACTS_BY_LAST_NAME, {"user_id": user.id, "last_name": last_name})
     return result.scalars().all()
 
 
@@ -108,11 +348,15 @@ async def create_contact(body: ContactCreate, db: AsyncSession, user: User):
     Raises:
         HTTPException: If contact with the same email already exists.
     """
-    contact = Contact(**body.model_dump(exclude_unset=True), user=user)
+    contact = Contact(**body.model_dump(exclude_unset=True), user_id=user.id)
+    _set_phone(contact)
     db.add(contact)
     try:
+        await _change_count(db, user.id, 1)
         await db.commit()
         await db.refresh(contact)
+        await _invalidate_user_cache(user)
+        await events.publish_contact_event(events.CREATED, contact, user.id)
         return contact
     except IntegrityError:
         await db.rollback()
@@ -132,14 +376,16 @@ async def update_contact(contact_id: int, body: ContactUpdate, db: AsyncSession,
     Returns:
         Contact | None: Updated contact if found, else None.
     """
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
-    result = await db.execute(stmt)
+    result = await db.execute(CONTACT_BY_ID, {"user_id": user.id, "contact_id": contact_id})
     contact = result.scalar_one_or_none()
     if contact:
         for key, value in body.model_dump(exclude_unset=True).items():
             setattr(contact, key, value)
+        _set_phone(contact)
         await db.commit()
         await db.refresh(contact)
+        await _invalidate_user_cache(user)
+        await events.publish_contact_event(events.UPDATED, contact, user.id)
     return contact
 
 
@@ -155,15 +401,133 @@ async def delete_contact(contact_id: int, db: AsyncSession, user: User):
     Returns:
         Contact | None: Deleted contact if found, else None.
     """
-    stmt = select(Contact).filter_by(id=contact_id, user=user)
-    result = await db.execute(stmt)
+    result = await db.execute(CONTACT_BY_ID, {"user_id": user.id, "contact_id": contact_id})
     contact = result.scalar_one_or_none()
     if contact:
         await db.delete(contact)
+        db.add(ContactTombstone(contact_id=contact.id, user_id=user.id))
+        await _change_count(db, user.id, -1)
         await db.commit()
+        await _invalidate_user_cache(user)
+        await events.publish_contact_event(events.DELETED, contact, user.id)
     return contact
 
 
+async def get_contact_stats(db: AsyncSession, user: User, today: date | None = None) -> dict:
+    """
+    Compute address book statistics for the current user.
+
+    Every figure is aggregated by the database, so no contact rows are loaded, and each query
+    is answered from an index on ``user_id`` alone. ``with_phone`` counts contacts with a valid
+    phone number.
+
+    Args:
+        db (AsyncSession): Database session.
+        user (User): The current authenticated user.
+        today (date | None): Reference day for the weekly buckets, defaults to today.
+
+    Returns:
+        dict: Totals, field completeness, contacts per birthday month and contacts added in each
+        of the last ``STATS_WEEKS`` weeks (weeks start on Monday).
+    """
+    today = today or date.today()
+    owned = Contact.user_id == user.id
+
+    stmt = select(func.count(), func.count(Contact.phone_normalized)).where(owned)
+    total, with_phone = (await db.execute(stmt)).one()
+
+    month = cast(extract("month", Contact.birthday), Integer)
+    stmt = (select(month, func.count()).where(owned, Contact.birthday.is_not(None))
+            .group_by(month))
+    by_month = dict((await db.execute(stmt)).all())
+    with_birthday = sum(by_month.values())
+
+    first_week = today - timedelta(days=today.weekday() + 7 * (config.STATS_WEEKS - 1))
+    if db.bind.dialect.name == "sqlite":
+        week = func.date(Contact.created_at, "weekday 0", "-6 days")
+    else:
+        week = cast(func.date_trunc("week", Contact.created_at), Date)
+    stmt = (select(week, func.count())
+            .where(owned, Contact.created_at >= datetime.combine(first_week, datetime.min.time()))
+            .group_by(week))
+    by_week = {str(key): count for key, count in (await db.execute(stmt)).all()}
+
+    weeks = [first_week + timedelta(weeks=i) for i in range(config.STATS_WEEKS)]
+    return {
+        "total": total,
+        "with_phone": with_phone,
+        "with_birthday": with_birthday,
+        "phone_completeness": with_phone / total if total else 0.0,
+        "birthday_completeness": with_birthday / total if total else 0.0,
+        "birthdays_by_month": {m: by_month.get(m, 0) for m in range(1, 13)},
+        "added_per_week": [{"week": w, "count": by_week.get(w.isoformat(), 0)} for w in weeks],
+    }
+
+
+async def merge_contacts(primary_id: int, duplicate_ids: list[int], db: AsyncSession, user: User):
+    """
+    Merge duplicate contacts into a primary contact in one transaction.
+
+    Empty fields of the primary contact are filled from the duplicates (in the given order),
+    then the duplicates are deleted and recorded in the tombstone log.
+
+    Args:
+        primary_id (int): ID of the contact to keep.
+        duplicate_ids (list[int]): IDs of the contacts merged into it.
+        db (AsyncSession): Database session.
+        user (User): The current authenticated user.
+
+    Returns:
+        Contact | None: The merged contact, or None if any of the contacts is not found.
+    """
+    duplicate_ids = [contact_id for contact_id in dict.fromkeys(duplicate_ids) if contact_id != primary_id]
+    stmt = select(Contact).where(Contact.user_id == user.id, Contact.id.in_([primary_id, *duplicate_ids]))
+    result = await db.execute(stmt)
+    contacts = {contact.id: contact for contact in result.scalars().all()}
+    if len(contacts) != len(duplicate_ids) + 1:
+        return None
+
+    primary = contacts[primary_id]
+    duplicates = [contacts[contact_id] for contact_id in duplicate_ids]
+    for field in ("phone", "birthday", "additional_data"):
+        if getattr(primary, field) is None:
+            value = next((getattr(d, field) for d in duplicates if getattr(d, field) is not None), None)
+            setattr(primary, field, value)
+    _set_phone(primary)
+    for duplicate in duplicates:
+        await db.delete(duplicate)
+        db.add(ContactTombstone(contact_id=duplicate.id, user_id=user.id))
+    await _change_count(db, user.id, -len(duplicates))
+    await db.commit()
+    await db.refresh(primary)
+
+    await _invalidate_user_cache(user)
+    await events.publish_contact_event(events.UPDATED, primary, user.id)
+    for duplicate in duplicates:
+        await events.publish_contact_event(events.DELETED, duplicate, user.id)
+    return primary
+
+
+async def iter_contact_identities(user_id: int, db: AsyncSession) -> AsyncIterator:
+    """
+    Stream the fields used for duplicate detection for all of a user's contacts.
+
+    Rows are fetched from a server-side cursor in chunks instead of being loaded at once.
+
+    Args:
+        user_id (int): Owner of the contacts.
+        db (AsyncSession): Database session.
+
+    Yields:
+        Row: ``(id, first_name, last_name, email, phone)``
+    """
+    stmt = (select(Contact.id, Contact.first_name, Contact.last_name, Contact.email, Contact.phone)
+            .where(Contact.user_id == user_id).execution_options(yield_per=5000))
+    result = await db.stream(stmt)
+    async for row in result:
+        yield row
+
+
 async def get_upcoming_birthdays(db: AsyncSession, user: User):
     """
     Retrieve contacts with upcoming birthdays within the next 7 days.
@@ -176,19 +540,131 @@ async def get_upcoming_birthdays(db: AsyncSession, user: User):
         List[Contact]: List of contacts with upcoming birthdays.
     """
     today = date.today()
-    next_week = today + timedelta(days=7)
-
-    stmt = select(Contact).where(Contact.user_id == user.id)
+    stmt = select(Contact).where(Contact.user_id == user.id, Contact.birthday.is_not(None))
     result = await db.execute(stmt)
     contacts = result.scalars().all()
+    return [contact for contact in contacts if is_upcoming_birthday(contact.birthday, today)]
+
+
+async def get_upcoming_birthdays_for_users(user_ids: list[int], db: AsyncSession, today: date):
+    """
+    Retrieve upcoming birthdays for a batch of users with a single query.
+
+    Args:
+        user_ids (list[int]): IDs of the users in the batch.
+        db (AsyncSession): Database session.
+        today (date): Reference day.
+
+    Returns:
+        dict[int, list[Contact]]: Upcoming birthdays keyed by user ID; users without any are omitted.
+    """
+    stmt = select(Contact).where(Contact.user_id.in_(user_ids), Contact.birthday.is_not(None))
+    result = await db.execute(stmt)
+    upcoming = {}
+    for contact in result.scalars():
+        if is_upcoming_birthday(contact.birthday, today):
+            upcoming.setdefault(contact.user_id, []).append(contact)
+    return upcoming
+
+
+def encode_sync_token(updated_at: datetime | None, contact_id: int, tombstone_id: int) -> str:
+    """
+    Encode a delta-sync cursor into an opaque token.
+
+    Args:
+        updated_at (datetime | None): ``updated_at`` of the last contact returned.
+        contact_id (int): ID of the last contact returned.
+        tombstone_id (int): ID of the last tombstone returned.
+
+    Returns:
+        str: URL-safe continuation token.
+    """
+    payload = {"u": updated_at.isoformat() if updated_at else None, "c": contact_id, "t": tombstone_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_sync_token(token: str | None) -> tuple[datetime | None, int, int]:
+    """
+    Decode a continuation token produced by ``encode_sync_token``.
+
+    Args:
+        token (str | None): Token from the client; None starts a full sync.
+
+    Returns:
+        tuple: ``(updated_at, contact_id, tombstone_id)`` of the cursor.
+
+    Raises:
+        HTTPException: 400 if the token is malformed.
+    """
+    if not token:
+        return None, 0, 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        updated_at = datetime.fromisoformat(payload["u"]) if payload["u"] else None
+        return updated_at, int(payload["c"]), int(payload["t"])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+def _sync_horizon(db: AsyncSession):
+    """
+    SQL expression for the newest ``updated_at``/``deleted_at`` a sync may return.
+
+    It is computed by the database, so the comparison stays between naive timestamps: a bound
+    ``now()`` comes back from asyncpg timezone-aware and cannot be bound against the naive columns.
+    """
+    if db.bind.dialect.name == "sqlite":
+        # Same text format as the CURRENT_TIMESTAMP the columns default to
+        return func.datetime("now", f"-{config.SYNC_SAFETY_WINDOW} seconds")
+    return func.localtimestamp() - timedelta(seconds=config.SYNC_SAFETY_WINDOW)
 
-    upcoming_birthdays = []
-    for contact in contacts:
-        if contact.birthday:
-            birthday_this_year = contact.birthday.replace(year=today.year)
-            if birthday_this_year < today:
-                birthday_this_year = birthday_this_year.replace(year=today.year + 1)
-            if today <= birthday_this_year <= next_week:
-                upcoming_birthdays.append(contact)
 
-    return upcoming_birthdays
+async def get_changes(since: str | None, limit: int, db: AsyncSession, user: User):
+    """
+    Retrieve contacts created or updated, and IDs of contacts deleted, since a sync token.
+
+    Contacts are read in ``(updated_at, id)`` order using the ``(user_id, updated_at, id)`` index and
+    deletions from the tombstone log, so the cost is proportional to the number of changes.
+    Rows younger than ``SYNC_SAFETY_WINDOW`` seconds are held back until the next sync, so a
+    transaction that commits late with an earlier timestamp is not skipped.
+
+    Args:
+        since (str | None): Token returned by the previous call; None for a full sync.
+        limit (int): Maximum number of changes and of deletions per page.
+        db (AsyncSession): Database session.
+        user (User): The current authenticated user.
+
+    Returns:
+        dict: ``changes``, ``deleted``, ``next_token`` and ``has_more``.
+    """
+    updated_at, contact_id, tombstone_id = decode_sync_token(since)
+    horizon = _sync_horizon(db)
+
+    stmt = select(Contact).where(Contact.user_id == user.id, Contact.updated_at <= horizon)
+    if updated_at is not None:
+        column, value = Contact.updated_at, updated_at
+        if db.bind.dialect.name == "sqlite":
+            # SQLite keeps CURRENT_TIMESTAMP and bound datetimes as differently formatted text
+            column, value = func.julianday(column), func.julianday(value)
+        stmt = stmt.where(tuple_(column, Contact.id) > tuple_(value, contact_id))
+    stmt = stmt.order_by(Contact.updated_at, Contact.id).limit(limit + 1)
+    contacts = (await db.execute(stmt)).scalars().all()
+
+    stmt = (select(ContactTombstone.id, ContactTombstone.contact_id)
+            .where(ContactTombstone.user_id == user.id, ContactTombstone.id > tombstone_id,
+                   ContactTombstone.deleted_at <= horizon)
+            .order_by(ContactTombstone.id).limit(limit + 1))
+    tombstones = (await db.execute(stmt)).all()
+
+    has_more = len(contacts) > limit or len(tombstones) > limit
+    contacts, tombstones = contacts[:limit], tombstones[:limit]
+    if contacts:
+        updated_at, contact_id = contacts[-1].updated_at, contacts[-1].id
+    if tombstones:
+        tombstone_id = tombstones[-1].id
+    return {
+        "changes": contacts,
+        "deleted": [t.contact_id for t in tombstones],
+        "next_token": encode_sync_token(updated_at, contact_id, tombstone_id),
+        "has_more": has_more,
+    }
@@ -1,11 +1,20 @@
 from fastapi import Depends
 
-from sqlalchemy import select
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.db import get_db
 from src.entity.models import User
 from src.schemas.user import UserSchema
-from src.services.cloudinary import upload_avatar
+
+# Built once with a bound parameter; see the note in ``src.repository.contacts``.
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+# PostgreSQL takes the emails as one array parameter, so every batch size shares one prepared
+# statement; SQLite has no arrays and gets an expanding IN list instead.
+USERS_BY_EMAILS = {
+    "postgresql": select(User).where(User.email == any_(bindparam("emails", type_=postgresql.ARRAY(String)))),
+    "sqlite": select(User).where(User.email.in_(bindparam("emails", expanding=True))),
+}
 
 
 async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
@@ -19,16 +28,52 @@ async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
     Returns:
         User | None: The user object if found, otherwise None.
     """
-    stmt = select(User).where(User.email == email)
-    user = await db.execute(stmt)
+    user = await db.execute(USER_BY_EMAIL, {"email": email})
     user = user.scalar_one_or_none()
     return user
 
 
+async def get_users_by_emails(emails: list[str], db: AsyncSession) -> dict[str, User]:
+    """
+    Retrieve several users by email with a single query.
+
+    Args:
+        emails (list[str]): The emails of the users to search for.
+        db (AsyncSession): The database session.
+
+    Returns:
+        dict[str, User]: The users found, by email; emails without a user are missing.
+    """
+    stmt = USERS_BY_EMAILS.get(db.get_bind().dialect.name, USERS_BY_EMAILS["sqlite"])
+    result = await db.execute(stmt, {"emails": list(emails)})
+    return {user.email: user for user in result.scalars()}
+
+
+async def get_users_batch(after_id: int, limit: int, db: AsyncSession):
+    """
+    Retrieve the next batch of users ordered by ID (keyset pagination).
+
+    Only the columns needed by background jobs are loaded.
+
+    Args:
+        after_id (int): Return users with an ID greater than this value.
+        limit (int): Maximum number of users to return.
+        db (AsyncSession): The database session.
+
+    Returns:
+        list[Row]: Rows with ``id``, ``email`` and ``username``.
+    """
+    stmt = select(User.id, User.email, User.username).where(User.id > after_id).order_by(User.id).limit(limit)
+    result = await db.execute(stmt)
+    return result.all()
+
+
 async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
     """
     Create a new user in the database.
 
+    The user starts without an avatar; signup uploads the default one in the background.
+
     Args:
         body (UserSchema): The user data for creation.
         db (AsyncSession): The database session (injected).
@@ -36,13 +81,7 @@ async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
     Returns:
         User: The newly created user.
     """
-    avatar = None
-    try:
-        avatar = await upload_avatar('default_avatar.png', public_id=body.email)
-    except Exception as err:
-        print(err)
-
-    new_user = User(**body.model_dump(), avatar=avatar)
+    new_user = User(**body.model_dump())
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security, BackgroundTasks, Request, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Security, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import FileResponse
@@ -6,23 +6,28 @@ from src.schemas.user import UserSchema, TokenSchema, UserResponse, RequestEmail
 from src.repository import users as repositories_users
 from src.database.db import get_db
 from src.services.auth import auth_service
-from src.services.email import send_email
-from fastapi_limiter.depends import RateLimiter
+from src.services import tasks
+from src.services.queue import job_queue
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
+from src.services.user_loader import user_loader
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=TimedRoute)
 get_refresh_token = HTTPBearer()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
+async def signup(body: UserSchema, background_tasks: BackgroundTasks, request: Request,
+                 db: AsyncSession = Depends(get_db)):
     """
     Register a new user account.
 
-    Sends a confirmation email after creating the user.
+    Enqueues the confirmation email and the upload of the default avatar for the job worker; if
+    Redis is unavailable they run in this process after the response instead.
 
     Args:
         body (UserSchema): User data for registration.
-        bt (BackgroundTasks): Background task handler for sending email.
+        background_tasks (BackgroundTasks): Fallback for jobs that cannot be enqueued.
         request (Request): Current HTTP request.
         db (AsyncSession): SQLAlchemy async session.
 
@@ -37,7 +42,9 @@ async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: As
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
     body.password = auth_service.get_password_hash(body.password)
     new_user = await repositories_users.create_user(body, db)
-    bt.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
+    await job_queue.enqueue_or_run(background_tasks, tasks.SEND_EMAIL, email=new_user.email,
+                                   username=new_user.username, host=str(request.base_url))
+    await job_queue.enqueue_or_run(background_tasks, tasks.UPLOAD_DEFAULT_AVATAR, email=new_user.email)
     return new_user
 
 
@@ -58,7 +65,7 @@ async def login(body: OAuth2PasswordRequestForm = Depends(),
     Raises:
         HTTPException: For invalid email, unconfirmed email, or wrong password.
     """
-    user = await repositories_users.get_user_by_email(body.username, db)
+    user = await user_loader.load(body.username, db)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
@@ -90,7 +97,7 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(get
     """
     token = credentials.credentials
     email = await auth_service.decode_refresh_token(token)
-    user = await repositories_users.get_user_by_email(email, db)
+    user = await user_loader.load(email, db)
     if user.refresh_token != token:
         await repositories_users.update_token(user, None, db)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
@@ -133,7 +140,7 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
 
     Args:
         body (RequestEmail): Object containing the user's email.
-        background_tasks (BackgroundTasks): FastAPI background task handler.
+        background_tasks (BackgroundTasks): Fallback if the email job cannot be enqueued.
         request (Request): Current HTTP request.
         db (AsyncSession): SQLAlchemy async session.
 
@@ -148,5 +155,6 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     if user.confirmed:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Your email is already confirmed")
-    background_tasks.add_task(send_email, user.email, user.username, str(request.base_url))
+    await job_queue.enqueue_or_run(background_tasks, tasks.SEND_EMAIL, email=user.email, username=user.username,
+                                   host=str(request.base_url))
     return {"message": "Check your email for confirmation."}
@@ -1,24 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+from datetime import date
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Literal
 from src.services.auth import auth_service
-from src.schemas.contact import ContactCreate, ContactUpdate, ContactResponse
+from src.schemas.contact import ContactCreate, ContactUpdate, ContactResponse, ContactChanges, ContactMerge, \
+    DuplicateGroup, ContactStats
 from src.repository import contacts as repo
-from src.database.db import get_db
+from src.database.shards import get_user_db
 from src.entity.models import User
-from fastapi_limiter.depends import RateLimiter
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
+from src.services.single_flight import single_flight
+from src.services import cache, events
+from src.services.events import event_hub
+from src.services import dedup, tasks
+from src.services.queue import job_queue
+from src.conf.config import config
 
-router = APIRouter(prefix="/contacts", tags=["contacts"])
+router = APIRouter(prefix="/contacts", tags=["contacts"], route_class=TimedRoute)
 
 
 @router.get("/", response_model=List[ContactResponse], dependencies=[Depends(RateLimiter(times=10, seconds=20))])
-async def read_contacts(limit: int = 10, offset: int = 0, db: AsyncSession = Depends(get_db),
+async def read_contacts(response: Response, limit: int = 10, offset: int = 0, db: AsyncSession = Depends(get_user_db),
                         user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve a list of contacts for the authenticated user.
 
+    The total number of contacts is returned in the ``X-Total-Count`` header, read from the
+    maintained per-user count rather than counted.
+
     Args:
+        response (Response): Response receiving the ``X-Total-Count`` header.
         limit (int): Number of contacts to return.
         offset (int): Number of contacts to skip.
         db (AsyncSession): SQLAlchemy async session.
@@ -27,11 +44,14 @@ async def read_contacts(limit: int = 10, offset: int = 0, db: AsyncSession = Dep
     Returns:
         List[ContactResponse]: List of contact objects.
     """
-    return await repo.get_contacts(limit, offset, db, user)
+    contacts = await single_flight.do("read_contacts", (user.id, limit, offset),
+                                      lambda: repo.get_contacts(limit, offset, db, user))
+    response.headers["X-Total-Count"] = str(await repo.get_contact_count(db, user))
+    return contacts
 
 
 @router.get("/first_name/{first_name}", response_model=List[ContactResponse], dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def get_contacts_by_first_name(first_name: str, db: AsyncSession = Depends(get_db),
+async def get_contacts_by_first_name(first_name: str, db: AsyncSession = Depends(get_user_db),
                                      user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve contacts by first name.
@@ -48,7 +68,7 @@ async def get_contacts_by_first_name(first_name: str, db: AsyncSession = Depends
 
 
 @router.get("/last_name/{last_name}", response_model=List[ContactResponse], dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def get_contacts_by_last_name(last_name: str, db: AsyncSession = Depends(get_db),
+async def get_contacts_by_last_name(last_name: str, db: AsyncSession = Depends(get_user_db),
                                     user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve contacts by last name.
@@ -65,7 +85,7 @@ async def get_contacts_by_last_name(last_name: str, db: AsyncSession = Depends(g
 
 
 @router.get("/contact_id/{contact_id}", response_model=ContactResponse, dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def get_contact_by_id(contact_id: int, db: AsyncSession = Depends(get_db),
+async def get_contact_by_id(contact_id: int, db: AsyncSession = Depends(get_user_db),
                             user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve a contact by its ID.
@@ -88,7 +108,7 @@ async def get_contact_by_id(contact_id: int, db: AsyncSession = Depends(get_db),
 
 
 @router.get("/email/{email}", response_model=ContactResponse, dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def get_contact_by_email(email: str, db: AsyncSession = Depends(get_db),
+async def get_contact_by_email(email: str, db: AsyncSession = Depends(get_user_db),
                                user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve a contact by its email.
@@ -110,8 +130,27 @@ async def get_contact_by_email(email: str, db: AsyncSession = Depends(get_db),
     return contact
 
 
+@router.get("/phone/{phone}", response_model=List[ContactResponse], dependencies=[Depends(RateLimiter(times=100, seconds=1))])
+async def get_contacts_by_phone(phone: str, match: Literal["exact", "suffix"] = "exact",
+                                db: AsyncSession = Depends(get_user_db),
+                                user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve contacts by phone number.
+
+    Args:
+        phone (str): Phone number in any format; for ``match=suffix``, its last digits (at least 4).
+        match (str): ``exact`` for the whole number, ``suffix`` for numbers ending with ``phone``.
+        db (AsyncSession): SQLAlchemy async session.
+        user (User): Current authenticated user.
+
+    Returns:
+        List[ContactResponse]: Matching contacts.
+    """
+    return await repo.get_contacts_by_phone(phone, match, db, user)
+
+
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def create_contact(body: ContactCreate, db: AsyncSession = Depends(get_db),
+async def create_contact(body: ContactCreate, db: AsyncSession = Depends(get_user_db),
                          user: User = Depends(auth_service.get_current_user)):
     """
     Create a new contact.
@@ -128,7 +167,7 @@ async def create_contact(body: ContactCreate, db: AsyncSession = Depends(get_db)
 
 
 @router.put("/{contact_id}", response_model=ContactResponse, dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def update_contact(contact_id: int, body: ContactUpdate, db: AsyncSession = Depends(get_db),
+async def update_contact(contact_id: int, body: ContactUpdate, db: AsyncSession = Depends(get_user_db),
                          user: User = Depends(auth_service.get_current_user)):
     """
     Update an existing contact.
@@ -152,7 +191,7 @@ async def update_contact(contact_id: int, body: ContactUpdate, db: AsyncSession
 
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db),
+async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_user_db),
                          user: User = Depends(auth_service.get_current_user)):
     """
     Delete a contact.
@@ -171,11 +210,13 @@ async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db),
 
 
 @router.get("/upcoming-birthdays", response_model=List[ContactResponse], dependencies=[Depends(RateLimiter(times=3, seconds=20))])
-async def upcoming_birthdays(db: AsyncSession = Depends(get_db),
+async def upcoming_birthdays(db: AsyncSession = Depends(get_user_db),
                              user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve contacts with birthdays in the upcoming 7 days.
 
+    Served from the digest precomputed by the nightly job when available.
+
     Args:
         db (AsyncSession): SQLAlchemy async session.
         user (User): Current authenticated user.
@@ -183,4 +224,170 @@ async def upcoming_birthdays(db: AsyncSession = Depends(get_db),
     Returns:
         List[ContactResponse]: List of contacts with upcoming birthdays.
     """
-    return await repo.get_upcoming_birthdays(db, user)
+    try:
+        cached = await cache.get_json(cache.birthdays_key(user.id, date.today()))
+    except cache.CACHE_ERRORS as err:
+        print(f"Birthday cache unavailable: {err}")
+        cached = None
+    if cached is not None:
+        return cached
+    return await single_flight.do("upcoming_birthdays", (user.id,),
+                                  lambda: repo.get_upcoming_birthdays(db, user))
+
+
+@router.get("/stats", response_model=ContactStats, dependencies=[Depends(RateLimiter(times=10, seconds=20))])
+async def contact_stats(db: AsyncSession = Depends(get_user_db),
+                        user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve address book statistics.
+
+    Cached per user until the next change to the user's contacts; a result computed while a change
+    was made is not cached.
+
+    Args:
+        db (AsyncSession): SQLAlchemy async session.
+        user (User): Current authenticated user.
+
+    Returns:
+        ContactStats: Totals, field completeness, birthdays per month and contacts added per week.
+    """
+    try:
+        cached = await cache.get_json(cache.stats_key(user.id))
+        if cached is not None:
+            return cached
+        # Only callers that saw the same generation may share a computation and store its result.
+        generation = await cache.generation(user.id)
+    except cache.CACHE_ERRORS as err:
+        print(f"Stats cache unavailable: {err}")
+        generation = None
+    stats = await single_flight.do("contact_stats", (user.id, generation), lambda: repo.get_contact_stats(db, user))
+    if generation is not None:
+        try:
+            await cache.set_json_if_current(cache.stats_key(user.id), stats, config.STATS_TTL, user.id, generation)
+        except cache.CACHE_ERRORS as err:
+            print(f"Stats cache unavailable: {err}")
+    return stats
+
+
+@router.get("/changes", response_model=ContactChanges, dependencies=[Depends(RateLimiter(times=10, seconds=20))])
+async def get_contact_changes(since: str | None = None, limit: int = Query(100, ge=1, le=1000),
+                              db: AsyncSession = Depends(get_user_db),
+                              user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve contacts changed since a sync token, plus IDs of deleted contacts.
+
+    Call without ``since`` for the initial sync, then pass the returned ``next_token``.
+    Keep calling while ``has_more`` is true.
+
+    Args:
+        since (str | None): Continuation token from the previous sync.
+        limit (int): Maximum number of changes per page.
+        db (AsyncSession): SQLAlchemy async session.
+        user (User): Current authenticated user.
+
+    Returns:
+        ContactChanges: Changed contacts, deleted contact IDs and the next token.
+
+    Raises:
+        HTTPException: 400 if the token is invalid.
+    """
+    return await repo.get_changes(since, limit, db, user)
+
+
+@router.get("/events", response_class=StreamingResponse, dependencies=[Depends(RateLimiter(times=3, seconds=20))])
+async def contact_events(request: Request, user: User = Depends(auth_service.get_current_user)):
+    """
+    Stream create, update and delete events for the user's contacts as Server-Sent Events.
+
+    A comment line is sent every ``EVENTS_HEARTBEAT`` seconds to keep the connection open.
+    Clients that fall behind receive an ``overflow`` event and are disconnected; they should
+    catch up through ``/contacts/changes`` and reconnect.
+
+    Args:
+        request (Request): Current HTTP request.
+        user (User): Current authenticated user.
+
+    Returns:
+        StreamingResponse: ``text/event-stream`` of contact events.
+    """
+    user_id = user.id
+
+    async def stream():
+        with event_hub.subscribe(user_id) as subscription:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=config.EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event.get('contact'))}\n\n"
+                if event["type"] == events.OVERFLOW:
+                    break
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/duplicates/scan", status_code=status.HTTP_202_ACCEPTED,
+             dependencies=[Depends(RateLimiter(times=1, seconds=60))])
+async def scan_duplicates(bt: BackgroundTasks, user: User = Depends(auth_service.get_current_user)):
+    """
+    Queue a scan for duplicate contacts, run by a job worker.
+
+    Results are available from ``GET /contacts/duplicates`` once the scan has finished.
+
+    Args:
+        bt (BackgroundTasks): Fallback running the scan if the job cannot be enqueued.
+        user (User): Current authenticated user.
+
+    Returns:
+        dict: Message confirming the scan was started.
+    """
+    await job_queue.enqueue_or_run(bt, tasks.SCAN_DUPLICATES, user_id=user.id)
+    return {"message": "Duplicate scan started"}
+
+
+@router.get("/duplicates", response_model=List[DuplicateGroup], dependencies=[Depends(RateLimiter(times=10, seconds=20))])
+async def get_duplicates(user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieve the duplicate groups found by the last scan.
+
+    Args:
+        user (User): Current authenticated user.
+
+    Returns:
+        List[DuplicateGroup]: Groups of contact IDs that are likely the same person.
+
+    Raises:
+        HTTPException: 404 if no scan results are available.
+    """
+    groups = await cache.get_json(dedup.duplicates_key(user.id))
+    if groups is None:
+        raise HTTPException(status_code=404, detail="No duplicate scan results")
+    return groups
+
+
+@router.post("/merge", response_model=ContactResponse, dependencies=[Depends(RateLimiter(times=10, seconds=20))])
+async def merge_contacts(body: ContactMerge, db: AsyncSession = Depends(get_user_db),
+                         user: User = Depends(auth_service.get_current_user)):
+    """
+    Merge duplicate contacts into one.
+
+    Args:
+        body (ContactMerge): Contact to keep and contacts to merge into it.
+        db (AsyncSession): SQLAlchemy async session.
+        user (User): Current authenticated user.
+
+    Returns:
+        ContactResponse: The merged contact.
+
+    Raises:
+        HTTPException: If any of the contacts is not found.
+    """
+    contact = await repo.merge_contacts(body.primary_id, body.duplicate_ids, db, user)
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return contact
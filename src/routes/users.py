@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import base64
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 
 from src.repository import users as repository_users
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,10 +8,14 @@ from src.services.auth import auth_service
 from src.schemas.user import UserResponse
 from src.database.db import get_db
 from src.entity.models import User
-from fastapi_limiter.depends import RateLimiter
-import cloudinary.uploader
+from src.services.rate_limit import RateLimiter
+from src.services.timing import TimedRoute
+from src.conf.config import config
+from src.services import avatars, tasks, uploads
+from src.services.cloudinary import upload_avatar
+from src.services.queue import job_queue
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
 
 
 @router.get("/me", response_model=UserResponse, dependencies=[Depends(RateLimiter(times=1, seconds=20))])
@@ -26,17 +32,35 @@ async def get_current_user(user: User = Depends(auth_service.get_current_user)):
     return user
 
 
-@router.patch("/avatar", response_model=UserResponse)
+AVATAR_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["file"],
+        "properties": {"file": {"type": "string", "format": "binary"}},
+    }}},
+}
+
+
+@router.patch("/avatar", response_model=UserResponse, openapi_extra={"requestBody": AVATAR_REQUEST_BODY})
 async def update_avatar_user(
-        file: UploadFile = File(...),
+        request: Request,
         current_user: User = Depends(auth_service.get_current_user),
         db: AsyncSession = Depends(get_db),
 ):
     """
     Update the avatar image for the current user.
 
+    With ``AVATAR_PIPELINE`` enabled the image is resized and stored locally (see
+    ``src.services.avatars``) and Cloudinary is at most an optional mirror updated by the job worker;
+    otherwise it is uploaded to Cloudinary.
+
+    The image is sent as the ``file`` field of a multipart form. It is received in chunks by
+    ``uploads.receive_file``, which rejects files above ``UPLOAD_MAX_SIZE`` and files that are not
+    images while they are still arriving, and spools large files to disk.
+
     Args:
-        file (UploadFile): The image file to upload as avatar.
+        request (Request): Current request, whose body is streamed.
         current_user (User): Current authenticated user.
         db (AsyncSession): Database session.
 
@@ -45,21 +69,31 @@ async def update_avatar_user(
 
     Raises:
         HTTPException: If there's an error during file upload or database operation.
-                      Status code 500 for internal server errors.
+                      Status code 400 for missing files and images that cannot be processed,
+                      413 for files above ``UPLOAD_MAX_SIZE``,
+                      504 if Cloudinary does not answer within ``CLOUDINARY_TIMEOUT``,
+                      500 for internal server errors.
     """
     try:
-        file_content = await file.read()
-        result = cloudinary.uploader.upload(
-            file_content,
-            public_id=current_user.email,
-            folder="avatars",
-            overwrite=True,
-            resource_type="image"
-        )
-
-        avatar_url = result.get("secure_url")
+        file = await uploads.receive_file(request)
+    except uploads.UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    try:
+        if config.AVATAR_PIPELINE:
+            avatar_url = await avatars.store_avatar(file)
+            if config.AVATAR_MIRROR_CLOUDINARY:
+                image = base64.b64encode(avatars.avatar_path(avatar_url).read_bytes()).decode()
+                await job_queue.enqueue(tasks.MIRROR_AVATAR, email=current_user.email, image=image)
+        else:
+            avatar_url = await upload_avatar(file, public_id=current_user.email)
         user = await repository_users.update_avatar(current_user, avatar_url, db)
         return user
 
+    except avatars.InvalidImage as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except TimeoutError:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Avatar upload timed out")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    finally:
+        file.close()
@@ -24,6 +24,39 @@ class ContactUpdate(ContactBase):
 
 class ContactResponse(ContactBase):
     id: int
+    phone_normalized: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     # user: UserResponse | None
+
+
+class ContactChanges(BaseModel):
+    changes: list[ContactResponse]
+    deleted: list[int]
+    next_token: str
+    has_more: bool
+
+
+class ContactMerge(BaseModel):
+    primary_id: int
+    duplicate_ids: list[int] = Field(..., min_length=1)
+
+
+class DuplicateGroup(BaseModel):
+    ids: list[int]
+    reasons: list[str]
+
+
+class WeeklyCount(BaseModel):
+    week: date
+    count: int
+
+
+class ContactStats(BaseModel):
+    total: int
+    with_phone: int
+    with_birthday: int
+    phone_completeness: float
+    birthday_completeness: float
+    birthdays_by_month: dict[int, int]
+    added_per_week: list[WeeklyCount]
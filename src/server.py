@@ -0,0 +1,60 @@
+"""
+Production server entry point.
+
+Runs the application in several uvicorn worker processes::
+
+    python -m src.server --workers 4
+
+Every worker imports the application through ``main:create_app`` and creates its own database and
+Redis pools in the lifespan, so no connection is inherited from the parent process. uvloop and
+httptools are used automatically when installed. On SIGTERM/SIGINT workers stop accepting
+connections and in-flight requests get ``WEB_GRACEFUL_TIMEOUT`` seconds to finish.
+"""
+import argparse
+import os
+
+import uvicorn
+
+from src.conf.config import config
+
+
+def worker_count(requested: int) -> int:
+    """
+    Resolve the number of worker processes.
+
+    Args:
+        requested: Configured worker count; 0 or less means one worker per CPU core
+
+    Returns:
+        int: Number of workers to start
+    """
+    if requested > 0:
+        return requested
+    return os.cpu_count() or 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Contacts API with multiple workers")
+    parser.add_argument("--host", default=config.WEB_HOST)
+    parser.add_argument("--port", type=int, default=config.WEB_PORT)
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKERS,
+                        help="number of worker processes (default: one per CPU core)")
+    parser.add_argument("--graceful-timeout", type=int, default=config.WEB_GRACEFUL_TIMEOUT)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=worker_count(args.workers),
+        loop="auto",
+        http="auto",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        # The JSON access log of ServerTimingMiddleware replaces uvicorn's when ACCESS_LOG is set.
+        access_log=not config.ACCESS_LOG,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Admission control: a worker only runs as many requests at once as it can serve.
+
+Without it, an overloaded worker accepts every request and each one queues on the database pool
+until it times out, so every client sees the timeout. ``AdmissionMiddleware`` instead limits the
+requests in progress per worker to ``ADMISSION_MAX_CONCURRENCY`` (by default the size of the
+database pool plus its overflow) and queues the others in priority order:
+
+- ``HIGH``: cheap, latency-sensitive routes such as ``/users/me`` and login;
+- ``NORMAL``: everything not listed in ``ROUTE_POLICIES``;
+- ``LOW``: expensive routes such as statistics, duplicate scans and merges. Together they may hold
+  at most ``ADMISSION_LOW_SHARE`` of the slots, so they cannot crowd out the other routes, and some
+  have a concurrency limit of their own.
+
+A queued request waits at most its queue-time budget (``ADMISSION_QUEUE_TIMEOUT``, doubled for
+``HIGH`` and halved for ``LOW``). A request whose estimated wait, from the requests queued ahead of
+it and the recent average request duration, exceeds its budget is rejected at once, as is a request
+arriving at a full queue (``ADMISSION_MAX_QUEUE``) unless it can displace a lower-priority one.
+Rejected requests get ``503`` with ``Retry-After`` straight away, so clients back off instead of
+waiting for a timeout. Requests that still wait longer than ``DB_POOL_TIMEOUT`` for a database
+connection are answered the same way (see ``pool_timeout_handler``).
+
+Health probes, static files and the long-lived event stream bypass admission control.
+"""
+import asyncio
+import bisect
+import itertools
+import json
+import math
+import time
+from dataclasses import dataclass, field
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.conf.config import config
+
+HIGH, NORMAL, LOW = 0, 1, 2
+BUDGET_FACTORS = {HIGH: 2.0, NORMAL: 1.0, LOW: 0.5}
+OVERLOADED = {"detail": "Service overloaded, try again later"}
+_ROUTE_CACHE_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class Policy:
+    """
+    Admission policy of a route.
+
+    Args:
+        priority: ``HIGH``, ``NORMAL`` or ``LOW``
+        limit: Maximum requests to the route in progress at once per worker, if any
+        exempt: Bypass admission control entirely
+    """
+    priority: int = NORMAL
+    limit: int | None = None
+    exempt: bool = False
+
+
+DEFAULT_POLICY = Policy()
+EXEMPT = Policy(exempt=True)
+
+# Policies by route path template; routes not listed get DEFAULT_POLICY.
+ROUTE_POLICIES = {
+    "/livez": EXEMPT,
+    "/readyz": EXEMPT,
+    "/static": EXEMPT,
+    "/api/contacts/events": EXEMPT,
+    "/api/users/me": Policy(HIGH),
+    "/api/auth/login": Policy(HIGH),
+    "/api/auth/refresh_token": Policy(HIGH),
+    "/api/contacts/contact_id/{contact_id}": Policy(HIGH),
+    "/api/contacts/stats": Policy(LOW, limit=4),
+    "/api/contacts/changes": Policy(LOW),
+    "/api/contacts/duplicates": Policy(LOW, limit=4),
+    "/api/contacts/duplicates/scan": Policy(LOW, limit=2),
+    "/api/contacts/merge": Policy(LOW, limit=4),
+    "/api/users/avatar": Policy(LOW, limit=4),
+}
+
+
+class Rejected(Exception):
+    """
+    The request was not admitted and should be answered with ``503``.
+    """
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    route: str = field(compare=False)
+    policy: Policy = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Counts the requests in progress and queues the others by priority.
+
+    Args:
+        limit: Requests in progress at once; defaults to ``ADMISSION_MAX_CONCURRENCY``
+        max_queue: Requests waiting at once; defaults to ``ADMISSION_MAX_QUEUE``
+        queue_timeout: Queue-time budget of ``NORMAL`` requests in seconds; defaults to
+            ``ADMISSION_QUEUE_TIMEOUT``
+    """
+
+    def __init__(self, limit: int | None = None, max_queue: int | None = None, queue_timeout: float | None = None):
+        self._limit = limit
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self.active = 0
+        self.low_active = 0
+        self._route_active: dict[str, int] = {}
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._duration = 0.0
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    @property
+    def limit(self) -> int:
+        if self._limit is not None:
+            return self._limit
+        return config.ADMISSION_MAX_CONCURRENCY or config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+
+    @property
+    def max_queue(self) -> int:
+        return config.ADMISSION_MAX_QUEUE if self._max_queue is None else self._max_queue
+
+    def budget(self, policy: Policy) -> float:
+        """
+        Return how long a request of ``policy`` may wait in the queue, in seconds.
+        """
+        timeout = config.ADMISSION_QUEUE_TIMEOUT if self._queue_timeout is None else self._queue_timeout
+        return timeout * BUDGET_FACTORS[policy.priority]
+
+    def _can_run(self, route: str, policy: Policy) -> bool:
+        limit = self.limit
+        if policy.priority == LOW and self.low_active >= max(1, int(limit * config.ADMISSION_LOW_SHARE)):
+            return False
+        if self.active >= limit:
+            return False
+        return policy.limit is None or self._route_active.get(route, 0) < policy.limit
+
+    def _start(self, route: str, policy: Policy) -> None:
+        self.active += 1
+        self.low_active += policy.priority == LOW
+        self._route_active[route] = self._route_active.get(route, 0) + 1
+        self.stats["admitted"] += 1
+
+    def _reject(self) -> Rejected:
+        self.stats["rejected"] += 1
+        return Rejected()
+
+    async def acquire(self, route: str, policy: Policy) -> None:
+        """
+        Wait until the request may run; every successful call must be followed by ``release``.
+
+        Args:
+            route: Route path template, the key of per-route limits
+            policy: Policy of the route
+
+        Raises:
+            Rejected: If the request is not admitted
+        """
+        if self._can_run(route, policy):
+            self._start(route, policy)
+            return
+
+        budget = self.budget(policy)
+        ahead = sum(1 for waiter in self._waiters if waiter.priority <= policy.priority)
+        if self._duration and (ahead + 1) * self._duration / self.limit > budget:
+            raise self._reject()
+        if len(self._waiters) >= self.max_queue:
+            worst = self._waiters[-1]
+            if worst.priority <= policy.priority:
+                raise self._reject()
+            self._waiters.pop()
+            worst.future.set_exception(self._reject())
+
+        waiter = _Waiter(policy.priority, next(self._seq), route, policy, asyncio.get_running_loop().create_future())
+        bisect.insort(self._waiters, waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), budget)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                return  # admitted just as the budget ran out
+            self._discard(waiter)
+            self.stats["timed_out"] += 1
+            raise self._reject()
+        except asyncio.CancelledError:
+            # The client went away while waiting; give back a slot granted meanwhile.
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self.release(route, policy, None)
+            self._discard(waiter)
+            raise
+
+    def _discard(self, waiter: _Waiter) -> None:
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        if not waiter.future.done():
+            waiter.future.cancel()
+
+    def release(self, route: str, policy: Policy, started: float | None) -> None:
+        """
+        Mark a request as finished and admit waiting requests in priority order.
+
+        Args:
+            route: Route passed to ``acquire``
+            policy: Policy passed to ``acquire``
+            started: ``time.monotonic()`` when the request started, to track the average request
+                duration; ``None`` if it did not run
+        """
+        self.active -= 1
+        self.low_active -= policy.priority == LOW
+        self._route_active[route] -= 1
+        if not self._route_active[route]:
+            del self._route_active[route]
+        if started is not None:
+            duration = time.monotonic() - started
+            self._duration = duration if not self._duration else 0.9 * self._duration + 0.1 * duration
+        for waiter in list(self._waiters):
+            if self.active >= self.limit:
+                break
+            if self._can_run(waiter.route, waiter.policy):
+                self._waiters.remove(waiter)
+                self._start(waiter.route, waiter.policy)
+                waiter.future.set_result(True)
+
+
+admission = AdmissionController()
+
+
+def _retry_after() -> str:
+    return str(max(1, math.ceil(config.ADMISSION_RETRY_AFTER)))
+
+
+async def pool_timeout_handler(request: Request, exc: Exception) -> JSONResponse:
+    """
+    Answer ``503`` with ``Retry-After`` when a request waited longer than ``DB_POOL_TIMEOUT`` for a
+    database connection; registered for ``sqlalchemy.exc.TimeoutError``.
+    """
+    return JSONResponse(OVERLOADED, status_code=503, headers={"Retry-After": _retry_after()})
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the ``AdmissionController`` to every HTTP request.
+
+    Args:
+        app: Next ASGI application
+        router: Router of the application, used to find the route of a request and its policy
+        controller: Controller to use; defaults to the worker's ``admission``
+    """
+
+    def __init__(self, app: ASGIApp, router: Router, controller: AdmissionController = admission):
+        self.app = app
+        self.router = router
+        self.controller = controller
+        self._routes: dict[tuple[str, str], str] = {}
+
+    def _route_path(self, scope: Scope) -> str:
+        key = (scope["method"], scope["path"])
+        path = self._routes.get(key)
+        if path is None:
+            # As in Router: the first full match wins, a partial one (wrong method) is the fallback.
+            path, partial = scope["path"], None
+            for route in self.router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    path = getattr(route, "path", path)
+                    break
+                if match == Match.PARTIAL and partial is None:
+                    partial = route
+            else:
+                if partial is not None:
+                    path = getattr(partial, "path", path)
+            if len(self._routes) >= _ROUTE_CACHE_SIZE:
+                self._routes.clear()
+            self._routes[key] = path
+        return path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self._route_path(scope)
+        policy = ROUTE_POLICIES.get(route, DEFAULT_POLICY)
+        if policy.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(route, policy)
+        except Rejected:
+            body = json.dumps(OVERLOADED).encode()
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode()),
+                                    (b"retry-after", _retry_after().encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route, policy, started)
@@ -1,14 +1,15 @@
 from datetime import datetime, timedelta, timezone # Убедимся, что timezone импортирован
+from functools import cached_property
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from src.database.db import get_db
-from src.repository import users as repository_users
 from src.conf.config import config
+from src.services.timing import timed
+from src.services.user_loader import user_loader
 
 
 class Auth:
@@ -22,11 +23,22 @@ class Auth:
         oauth2_scheme: OAuth2 password bearer scheme
     :noindex:
     """
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    SECRET_KEY = config.SECRET_KEY
-    ALGORITHM = config.ALGORITHM
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+    @cached_property
+    def pwd_context(self):
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+    @property
+    def SECRET_KEY(self):
+        return config.SECRET_KEY
+
+    @property
+    def ALGORITHM(self):
+        return config.ALGORITHM
+
     def verify_password(self, plain_password, hashed_password):
         """
         Verify a plain password against a hashed password.
@@ -114,6 +126,22 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
+    def get_token_subject(self, token: str) -> Optional[str]:
+        """
+        Return the subject of a signed token without touching the database.
+
+        Args:
+            token: JWT access or refresh token
+
+        Returns:
+            str | None: Email from the token, or None if the token is invalid
+        """
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            return None
+        return payload.get("sub")
+
     async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         """
         Get current authenticated user from access token.
@@ -134,18 +162,19 @@ class Auth:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'access_token':
-                email = payload["sub"]
-                if email is None:
+        with timed("auth"):
+            try:
+                payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+                if payload['scope'] == 'access_token':
+                    email = payload["sub"]
+                    if email is None:
+                        raise credentials_exception
+                else:
                     raise credentials_exception
-            else:
+            except JWTError as e:
                 raise credentials_exception
-        except JWTError as e:
-            raise credentials_exception
 
-        user = await repository_users.get_user_by_email(email, db)
+            user = await user_loader.load(email, db)
         if user is None:
             raise credentials_exception
         return user
@@ -0,0 +1,153 @@
+"""
+Local avatar pipeline.
+
+Uploaded images are decoded, cropped to a square and resized to ``SIZES`` in a thread pool, then
+stored under ``src/static/avatars`` in a directory named after the SHA-256 of the upload::
+
+    /static/avatars/3f/3fa1…/64.webp   64.jpg   128.webp   128.jpg   250.webp   250.jpg
+
+Identical uploads map to the same directory and are processed only once. Since a file never changes
+once written, it is served with an immutable ``Cache-Control`` header. Requires Pillow.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi.staticfiles import StaticFiles
+
+from src.conf.config import config
+
+STATIC_DIR = Path("src/static")
+AVATARS = "avatars"
+SIZES = (64, 128, 250)
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+DEFAULT_VARIANT = "250.jpg"
+QUALITY = 85
+# Larger images are rejected before decoding to keep memory bounded (Pillow's own limit is ~89 MP).
+MAX_PIXELS = 40_000_000
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+@lru_cache
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool running image processing, sized by ``AVATAR_WORKERS``.
+    """
+    return ThreadPoolExecutor(max_workers=config.AVATAR_WORKERS, thread_name_prefix="avatar")
+
+
+def make_variants(data: bytes | BinaryIO) -> dict[str, bytes]:
+    """
+    Decode an image and encode its square variants.
+
+    Args:
+        data: Uploaded image, as bytes or a file positioned at its start
+
+    Returns:
+        dict[str, bytes]: Encoded files by name, e.g. ``"128.webp"``
+
+    Raises:
+        InvalidImage: If the data is not a supported image or is too large
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(data) if isinstance(data, bytes) else data)
+        if image.width * image.height > MAX_PIXELS:
+            raise InvalidImage("Image is too large")
+        # Let the JPEG decoder downscale while decoding instead of decoding the full resolution.
+        image.draft("RGB", (max(SIZES), max(SIZES)))
+        image = ImageOps.exif_transpose(image)
+        image = ImageOps.fit(image.convert("RGBA"), (max(SIZES), max(SIZES)), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as err:
+        raise InvalidImage("Unsupported image") from err
+
+    opaque = Image.new("RGB", image.size, "white")
+    opaque.paste(image, mask=image.getchannel("A"))
+    variants = {}
+    for size in SIZES:
+        for ext, fmt in FORMATS.items():
+            source = image if fmt == "WEBP" else opaque
+            resized = source if size == source.width else source.resize((size, size), Image.Resampling.LANCZOS)
+            out = io.BytesIO()
+            resized.save(out, fmt, quality=QUALITY, optimize=True)
+            variants[f"{size}.{ext}"] = out.getvalue()
+    return variants
+
+
+def _store(source: bytes | BinaryIO) -> str:
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    source.seek(0)
+    digest = hashlib.file_digest(source, "sha256").hexdigest()
+    target = STATIC_DIR / AVATARS / digest[:2] / digest
+    if target.exists():
+        return digest
+    source.seek(0)
+    variants = make_variants(source)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=target.parent, prefix=".tmp-"))
+    try:
+        for name, content in variants.items():
+            (staging / name).write_bytes(content)
+        os.rename(staging, target)
+    except OSError:
+        if not target.exists():
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return digest
+
+
+def avatar_url(digest: str, variant: str = DEFAULT_VARIANT) -> str:
+    """
+    Public URL of a stored avatar variant.
+    """
+    return f"/static/{AVATARS}/{digest[:2]}/{digest}/{variant}"
+
+
+def avatar_path(url: str) -> Path:
+    """
+    Local file behind a URL returned by ``avatar_url``.
+    """
+    return STATIC_DIR / url.removeprefix("/static/")
+
+
+async def store_avatar(source: bytes | BinaryIO) -> str:
+    """
+    Process an uploaded avatar and store its variants, unless the same image is already stored.
+
+    Args:
+        source: Uploaded image, as bytes or a seekable file (e.g. from ``uploads.receive_file``)
+
+    Returns:
+        str: URL of the default variant (``250.jpg``); the other variants sit next to it
+
+    Raises:
+        InvalidImage: If the data is not a supported image
+    """
+    digest = await asyncio.get_running_loop().run_in_executor(get_executor(), _store, source)
+    return avatar_url(digest)
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    ``StaticFiles`` serving content-addressed avatars with an immutable ``Cache-Control`` header.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if os.path.relpath(full_path, self.directory).startswith(AVATARS + os.sep):
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
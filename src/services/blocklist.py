@@ -0,0 +1,391 @@
+"""
+Blocking of clients by IP address and User-Agent.
+
+The lists live in Redis, in the sets ``blocklist:ips`` (addresses and CIDR networks, IPv4 or IPv6)
+and ``blocklist:user_agents`` (regular expressions), and are edited with
+``python -m src.jobs.blocklist``. After every change the command builds the compiled lists once,
+stores them as a versioned snapshot in the hash ``blocklist:snapshot`` and announces the version
+on the ``blocklist:updates`` channel. Every worker keeps a ``Blocklist`` in memory and answers each
+request from it without any I/O. On an announcement it loads the snapshot: the prefixes are stored
+as packed integer arrays, so loading does no parsing, and it yields to the event loop every
+``LOAD_CHUNK`` entries, so requests keep being served meanwhile. A burst of announcements is
+coalesced into one load, and a version already loaded is not loaded again. The loaded list
+replaces the old one in a single assignment, so a request always sees one complete version of the
+lists.
+
+IP lookups use one hash set of network prefixes per prefix length: an address is blocked if its
+first ``n`` bits are in the set for length ``n``. A lookup costs one set probe per distinct prefix
+length in use (at most 33 for IPv4 and 129 for IPv6), however many entries there are. The
+User-Agent patterns are combined into a single regular expression, so a request is matched
+against all of them in one pass.
+"""
+import array
+import asyncio
+import base64
+import contextlib
+import ipaddress
+import json
+import re
+import socket
+import sys
+from collections.abc import Iterable, Iterator
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.database.redis_client import redismanager
+
+IPS_KEY = "blocklist:ips"
+USER_AGENTS_KEY = "blocklist:user_agents"
+CHANNEL = "blocklist:updates"
+SNAPSHOT_KEY = "blocklist:snapshot"
+VERSION_KEY = "blocklist:version"
+SCAN_BATCH = 10_000
+LOAD_CHUNK = 65_536
+# Array typecodes of the packed prefixes by width in bytes; wider prefixes are packed as 16 bytes.
+_TYPECODES = {4: "I", 8: "Q"}
+
+# Stores a snapshot unless a newer one was stored meanwhile, then announces it.
+STORE_SNAPSHOT_SCRIPT = """
+if tonumber(ARGV[1]) <= tonumber(redis.call('HGET', KEYS[1], 'version') or '0') then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'header', ARGV[2], 'data', ARGV[3])
+redis.call('PUBLISH', ARGV[4], ARGV[1])
+return 1
+"""
+FORBIDDEN = json.dumps({"detail": "You are banned"}).encode()
+_GLOBAL_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def _pack(width: int, values: list[int]) -> bytes:
+    if width in _TYPECODES:
+        packed = array.array(_TYPECODES[width], values)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        return packed.tobytes()
+    return b"".join(value.to_bytes(width, "little") for value in values)
+
+
+def _unpack(width: int, data: memoryview) -> Iterator[Iterable[int]]:
+    """
+    Unpack prefixes packed by ``_pack``, in chunks of ``LOAD_CHUNK``.
+    """
+    if width in _TYPECODES:
+        packed = array.array(_TYPECODES[width])
+        packed.frombytes(data)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        for start in range(0, len(packed), LOAD_CHUNK):
+            yield packed[start:start + LOAD_CHUNK]
+        return
+    for start in range(0, len(data), LOAD_CHUNK * width):
+        chunk = data[start:start + LOAD_CHUNK * width]
+        yield [int.from_bytes(chunk[i:i + width], "little") for i in range(0, len(chunk), width)]
+
+
+def _parse_address(address: str) -> tuple[int, int] | None:
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+    except OSError:
+        pass
+    try:
+        value = int.from_bytes(socket.inet_pton(socket.AF_INET6, address.split("%", 1)[0]), "big")
+    except OSError:
+        return None
+    if value >> 32 == 0xFFFF:  # IPv4-mapped IPv6 address
+        return 4, value & 0xFFFFFFFF
+    return 6, value
+
+
+def _parse_network(entry: str) -> tuple[int, int, int]:
+    address, _, prefix = entry.strip().partition("/")
+    parsed = _parse_address(address)
+    if parsed is not None and (not prefix or prefix.isdigit()):
+        version, value = parsed
+        max_prefix = 32 if version == 4 else 128
+        length = int(prefix) if prefix else max_prefix
+        if address.count(":") and version == 4:  # IPv4-mapped network, e.g. ::ffff:10.0.0.0/104
+            length = int(prefix) - 96 if prefix else 32
+        if 0 <= length <= max_prefix:
+            return version, length, value
+    # Anything else ipaddress understands, such as netmasks: "10.0.0.0/255.0.0.0"
+    network = ipaddress.ip_network(entry.strip(), strict=False)
+    return network.version, network.prefixlen, int(network.network_address)
+
+
+class PrefixSet:
+    """
+    Set of IP networks answering whether an address falls into any of them.
+
+    Args:
+        networks: Addresses or CIDR networks, e.g. ``"203.0.113.7"``, ``"10.0.0.0/8"``, ``"2001:db8::/32"``;
+            host bits are ignored and invalid entries are skipped
+    """
+
+    def __init__(self, networks: Iterable[str] = ()):
+        tables: dict[int, dict[int, set[int]]] = {4: {}, 6: {}}
+        self.size = 0
+        self.invalid = 0
+        for entry in networks:
+            try:
+                version, prefix, value = _parse_network(entry)
+            except ValueError:
+                self.invalid += 1
+                continue
+            max_prefix = 32 if version == 4 else 128
+            tables[version].setdefault(prefix, set()).add(value >> (max_prefix - prefix))
+            self.size += 1
+        # (shift, prefixes) per prefix length, shortest first
+        self._tables = {
+            version: [((32 if version == 4 else 128) - prefix, frozenset(values))
+                      for prefix, values in sorted(table.items())]
+            for version, table in tables.items()
+        }
+
+    def dump(self) -> tuple[list[list[int]], bytes]:
+        """
+        Serialize the prefix tables for ``load``.
+
+        Returns:
+            tuple: ``[version, shift, width, count]`` per table, and the packed prefixes of all tables
+        """
+        tables, chunks = [], []
+        for version, table in self._tables.items():
+            max_prefix = 32 if version == 4 else 128
+            for shift, prefixes in table:
+                length = max_prefix - shift
+                width = 4 if length <= 32 else 8 if length <= 64 else 16
+                tables.append([version, shift, width, len(prefixes)])
+                chunks.append(_pack(width, sorted(prefixes)))
+        return tables, b"".join(chunks)
+
+    @classmethod
+    async def load(cls, tables: list[list[int]], data: bytes, size: int, invalid: int) -> "PrefixSet":
+        """
+        Rebuild a ``PrefixSet`` serialized by ``dump``, yielding to the event loop between chunks.
+
+        Args:
+            tables: Table descriptions returned by ``dump``
+            data: Packed prefixes returned by ``dump``
+            size: ``size`` of the serialized set
+            invalid: ``invalid`` of the serialized set
+        """
+        networks = cls()
+        networks.size, networks.invalid = size, invalid
+        view, offset = memoryview(data), 0
+        for version, shift, width, count in tables:
+            prefixes: set[int] = set()
+            for chunk in _unpack(width, view[offset:offset + count * width]):
+                prefixes.update(chunk)
+                await asyncio.sleep(0)
+            offset += count * width
+            networks._tables[version].append((shift, prefixes))
+        return networks
+
+    def __contains__(self, address: str) -> bool:
+        parsed = _parse_address(address)
+        if parsed is None:
+            return False
+        version, value = parsed
+        for shift, prefixes in self._tables[version]:
+            if value >> shift in prefixes:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class Blocklist:
+    """
+    Immutable snapshot of the blocked networks and User-Agent patterns.
+
+    Args:
+        networks: IP addresses and CIDR networks
+        user_agents: Regular expressions searched in the User-Agent header; invalid ones are skipped
+    """
+
+    def __init__(self, networks: Iterable[str] = (), user_agents: Iterable[str] = ()):
+        self.networks = PrefixSet(networks)
+        self.user_agents: list[str] = []
+        patterns = []
+        for pattern in user_agents:
+            # A leading "(?i)" applies to the whole expression; scope it to this alternative.
+            flags = _GLOBAL_FLAGS.match(pattern)
+            group = f"(?{flags[1]}:{pattern[flags.end():]})" if flags else f"(?:{pattern})"
+            try:
+                re.compile(group)
+            except re.error as err:
+                print(f"Skipping invalid User-Agent pattern {pattern!r}: {err}")
+                continue
+            patterns.append(group)
+            self.user_agents.append(pattern)
+        self.user_agent_count = len(patterns)
+        self._user_agents = re.compile("|".join(patterns)) if patterns else None
+
+    def dump(self) -> tuple[dict, bytes]:
+        """
+        Serialize the lists for ``load``.
+
+        Returns:
+            tuple: JSON-serializable header and the packed network prefixes
+        """
+        tables, data = self.networks.dump()
+        header = {"tables": tables, "size": self.networks.size, "invalid": self.networks.invalid,
+                  "user_agents": self.user_agents}
+        return header, data
+
+    @classmethod
+    async def load(cls, header: dict, data: bytes) -> "Blocklist":
+        """
+        Rebuild a ``Blocklist`` serialized by ``dump`` without parsing any network.
+        """
+        blocklist = cls(user_agents=header["user_agents"])
+        blocklist.networks = await PrefixSet.load(header["tables"], data, header["size"], header["invalid"])
+        return blocklist
+
+    def blocks(self, address: str | None, user_agent: str | None) -> bool:
+        """
+        Check whether a client is blocked.
+
+        Args:
+            address: Client IP address
+            user_agent: Value of the User-Agent header
+        """
+        if address and self.networks.size and address in self.networks:
+            return True
+        return bool(user_agent and self._user_agents is not None and self._user_agents.search(user_agent))
+
+
+class BlocklistManager:
+    """
+    Holds the current ``Blocklist`` of the worker and loads a new snapshot when Redis announces one.
+
+    Attributes:
+        version: Version of the loaded snapshot; 0 if none was loaded
+    """
+
+    def __init__(self):
+        self.current = Blocklist()
+        self.version = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Start the background task loading the lists and listening for changes.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """
+        Stop listening; the current lists stay in effect.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def reload(self) -> Blocklist:
+        """
+        Load the latest snapshot from Redis and swap it in, unless it is already loaded.
+
+        Without a snapshot, e.g. for lists stored before snapshots existed, the lists are built from
+        the sets here; ``python -m src.jobs.blocklist publish`` stores a snapshot of them.
+
+        Returns:
+            Blocklist: The current lists
+        """
+        client = redismanager.client
+        version = int(await client.hget(SNAPSHOT_KEY, "version") or 0)
+        if version and version == self.version:
+            return self.current
+        if version:
+            version, header, data = await client.hmget(SNAPSHOT_KEY, ["version", "header", "data"])
+            blocklist = await Blocklist.load(json.loads(header), base64.b64decode(data))
+            version = int(version)
+        else:
+            print("No blocklist snapshot in Redis, building the lists from the sets")
+            networks = [entry async for entry in client.sscan_iter(IPS_KEY, count=SCAN_BATCH)]
+            user_agents = [entry async for entry in client.sscan_iter(USER_AGENTS_KEY, count=SCAN_BATCH)]
+            blocklist = Blocklist(networks, user_agents)
+        self.current, self.version = blocklist, version
+        print(f"Blocklist loaded (version {version}): {len(blocklist.networks)} networks, "
+              f"{blocklist.user_agent_count} User-Agent patterns")
+        return blocklist
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = redismanager.client.pubsub(ignore_subscribe_messages=True)
+                async with pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    # Load after subscribing, so no change announced in between is missed.
+                    await self.reload()
+                    async for _ in pubsub.listen():
+                        # A burst of announcements needs a single load of the latest snapshot.
+                        while await pubsub.get_message(timeout=0) is not None:
+                            pass
+                        await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                print(f"Blocklist subscription failed, reconnecting: {err}")
+                await asyncio.sleep(1)
+
+
+blocklist_manager = BlocklistManager()
+
+
+async def publish_snapshot() -> int:
+    """
+    Build the lists from the Redis sets, store them as a new snapshot and tell every worker to load it.
+
+    The version is taken before the sets are read, so the snapshot with the highest version
+    includes every change made before any snapshot was requested; an older snapshot finishing
+    later is not stored.
+
+    Returns:
+        int: Version of the snapshot
+    """
+    client = redismanager.client
+    version = await client.incr(VERSION_KEY)
+    networks = [entry async for entry in client.sscan_iter(IPS_KEY, count=SCAN_BATCH)]
+    user_agents = [entry async for entry in client.sscan_iter(USER_AGENTS_KEY, count=SCAN_BATCH)]
+    header, data = Blocklist(networks, user_agents).dump()
+    store = client.register_script(STORE_SNAPSHOT_SCRIPT)
+    await store(keys=[SNAPSHOT_KEY], args=[version, json.dumps(header), base64.b64encode(data).decode(), CHANNEL])
+    return version
+
+
+class BlocklistMiddleware:
+    """
+    ASGI middleware answering ``403`` to blocked clients before any other processing.
+
+    Written as plain ASGI rather than with ``@app.middleware("http")`` so allowed requests pass
+    through without wrapping the request and response.
+    """
+
+    def __init__(self, app: ASGIApp, manager: BlocklistManager = blocklist_manager):
+        self.app = app
+        self.manager = manager
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            client = scope.get("client")
+            user_agent = None
+            for name, value in scope["headers"]:
+                if name == b"user-agent":
+                    user_agent = value.decode("latin-1")
+                    break
+            if self.manager.current.blocks(client[0] if client else None, user_agent):
+                if scope["type"] == "websocket":
+                    await send({"type": "websocket.close", "code": 1008})
+                    return
+                await send({"type": "http.response.start", "status": 403,
+                            "headers": [(b"content-type", b"application/json"),
+                                        (b"content-length", str(len(FORBIDDEN)).encode())]})
+                await send({"type": "http.response.body", "body": FORBIDDEN})
+                return
+        await self.app(scope, receive, send)
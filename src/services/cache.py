@@ -0,0 +1,163 @@
+import json
+from typing import Any
+
+from redis.exceptions import RedisError
+
+from src.database.redis_client import redismanager
+
+# Errors of an unavailable Redis; callers that can compute the value themselves treat them as a miss.
+CACHE_ERRORS = (RedisError, OSError)
+
+
+def birthdays_key(user_id: int, day) -> str:
+    """
+    Redis key holding a user's precomputed upcoming birthdays for a given day.
+    """
+    return f"birthdays:{user_id}:{day.isoformat()}"
+
+
+def stats_key(user_id: int) -> str:
+    """
+    Redis key holding a user's address book statistics.
+    """
+    return f"stats:{user_id}"
+
+
+def generation_key(user_id: int) -> str:
+    """
+    Redis key counting the changes to a user's contacts, bumped by ``invalidate_user``.
+    """
+    return f"cachegen:{user_id}"
+
+
+# Stores KEYS[1] only if the user's generation KEYS[2] still equals ARGV[1], i.e. no change to
+# the user's contacts was made since the value was computed. Returns 1 if stored.
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', tonumber(ARGV[3]))
+return 1
+"""
+
+_set_if_generation = None
+
+
+async def get_json(key: str) -> Any | None:
+    """
+    Read a JSON value from Redis.
+
+    Args:
+        key: Redis key
+
+    Returns:
+        Any | None: Decoded value, or None on a miss or when Redis is not configured
+    """
+    if not redismanager.initialized:
+        return None
+    raw = await redismanager.client.get(key)
+    return None if raw is None else json.loads(raw)
+
+
+async def set_json(key: str, value: Any, ttl: int) -> None:
+    """
+    Store a JSON-serializable value in Redis.
+
+    Args:
+        key: Redis key
+        value: Value to store; dates are serialized as ISO strings
+        ttl: Expiration in seconds
+    """
+    if not redismanager.initialized:
+        return
+    await redismanager.client.set(key, json.dumps(value, default=str), ex=ttl)
+
+
+async def generation(user_id: int) -> str:
+    """
+    Read the generation of a user's cached values; take it before computing a value to cache.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        str: Opaque generation, ``"0"`` if the user's contacts never changed or Redis is not configured
+    """
+    if not redismanager.initialized:
+        return "0"
+    raw = await redismanager.client.get(generation_key(user_id))
+    return "0" if raw is None else raw
+
+
+async def generations(user_ids: list[int]) -> dict[int, str]:
+    """
+    Read the generations of several users at once; see ``generation``.
+
+    Args:
+        user_ids: IDs of the users
+
+    Returns:
+        dict[int, str]: Generation by user ID
+    """
+    if not redismanager.initialized or not user_ids:
+        return {user_id: "0" for user_id in user_ids}
+    raw = await redismanager.client.mget([generation_key(user_id) for user_id in user_ids])
+    return {user_id: "0" if value is None else value for user_id, value in zip(user_ids, raw)}
+
+
+async def set_json_if_current(key: str, value: Any, ttl: int, user_id: int, generation: str) -> bool:
+    """
+    Store a JSON-serializable value computed from a user's contacts, unless they changed meanwhile.
+
+    A write landing while the value was computed invalidates the cache before the value is stored;
+    storing it anyway would serve the stale value until it expires.
+
+    Args:
+        key: Redis key
+        value: Value to store; dates are serialized as ISO strings
+        ttl: Expiration in seconds
+        user_id: ID of the user the value was computed for
+        generation: Result of ``generation`` taken before computing the value
+
+    Returns:
+        bool: Whether the value was stored
+    """
+    global _set_if_generation
+    if not redismanager.initialized:
+        return False
+    client = redismanager.client
+    if _set_if_generation is None or _set_if_generation.registered_client is not client:
+        _set_if_generation = client.register_script(SET_IF_GENERATION_SCRIPT)
+    stored = await _set_if_generation(keys=[key, generation_key(user_id)],
+                                      args=[generation, json.dumps(value, default=str), ttl])
+    return bool(stored)
+
+
+async def invalidate_user(user_id: int, *keys: str) -> None:
+    """
+    Delete cached values of a user and bump the user's generation, so values computed before the
+    change are not stored afterwards (see ``set_json_if_current``).
+
+    Args:
+        user_id: ID of the user
+        keys: Redis keys to delete
+    """
+    if not redismanager.initialized:
+        return
+    async with redismanager.client.pipeline(transaction=True) as pipe:
+        pipe.incr(generation_key(user_id))
+        if keys:
+            pipe.delete(*keys)
+        await pipe.execute()
+
+
+async def invalidate(*keys: str) -> None:
+    """
+    Delete cached values.
+
+    Args:
+        keys: Redis keys to delete
+    """
+    if not redismanager.initialized or not keys:
+        return
+    await redismanager.client.delete(*keys)
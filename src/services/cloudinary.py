@@ -1,22 +1,59 @@
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+"""
+Cloudinary uploads.
+
+The Cloudinary SDK makes blocking HTTP calls, so uploads run in a small thread pool
+(``CLOUDINARY_WORKERS`` threads) and never on the event loop. Each upload is bounded by
+``CLOUDINARY_TIMEOUT`` seconds, including the time it waits for a free thread.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+
 from decouple import config
 
-cloudinary.config(
-    cloud_name=config("CLOUDINARY_CLOUD_NAME"),
-    api_key=config("CLOUDINARY_API_KEY"),
-    api_secret=config("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+from src.conf.config import config as settings
+
+# Uploaded for every new user; resolved from this file so it does not depend on the working directory.
+DEFAULT_AVATAR = str(Path(__file__).resolve().parent.parent / "static" / "default_avatar.png")
+# The SDK's socket timeout only has to free the worker thread after the caller stopped waiting.
+SOCKET_TIMEOUT_MARGIN = 1.0
+
+
+@lru_cache
+def get_uploader():
+    """
+    Import and configure the Cloudinary SDK on first use.
+
+    Returns:
+        module: The configured ``cloudinary.uploader`` module
+    """
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=config("CLOUDINARY_CLOUD_NAME"),
+        api_key=config("CLOUDINARY_API_KEY"),
+        api_secret=config("CLOUDINARY_API_SECRET"),
+        secure=True
+    )
+    return cloudinary.uploader
+
+
+@lru_cache
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool running the SDK's blocking uploads, sized by ``CLOUDINARY_WORKERS``.
+    """
+    return ThreadPoolExecutor(max_workers=settings.CLOUDINARY_WORKERS, thread_name_prefix="cloudinary")
 
 
-async def upload_avatar(image_path: str, public_id: str = None):
+async def upload_avatar(image_path: str | bytes, public_id: str = None):
     """
     Upload an avatar image to Cloudinary with automatic resizing and optimization.
 
     Args:
-        image_path: Path to the image file to upload (can be local path or URL)
+        image_path: Image to upload (local path, URL or raw file content)
         public_id: Optional unique public identifier for the image.
                   If not provided, Cloudinary will generate one.
 
@@ -24,18 +61,23 @@ async def upload_avatar(image_path: str, public_id: str = None):
         str: Secure URL of the uploaded and transformed avatar image
 
     Raises:
+        TimeoutError: If the upload does not finish within ``CLOUDINARY_TIMEOUT`` seconds
         Exception: If the upload fails or credentials are invalid
 
     Example:
-        >>> url = upload_avatar("user_photo.jpg", "user123@example.com")
+        >>> url = await upload_avatar("user_photo.jpg", "user123@example.com")
         >>> print(url)
         "https://res.cloudinary.com/demo/image/upload/avatars/user123@example.com.jpg"
     """
-    result = cloudinary.uploader.upload(
+    upload = partial(
+        get_uploader().upload,
         image_path,
         folder="avatars",
         public_id=public_id,
         overwrite=True,
-        transformation=[{"width": 250, "height": 250, "crop": "fill"}]
+        transformation=[{"width": 250, "height": 250, "crop": "fill"}],
+        timeout=settings.CLOUDINARY_TIMEOUT + SOCKET_TIMEOUT_MARGIN,
     )
+    loop = asyncio.get_running_loop()
+    result = await asyncio.wait_for(loop.run_in_executor(get_executor(), upload), settings.CLOUDINARY_TIMEOUT)
     return result.get("secure_url")
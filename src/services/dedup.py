@@ -0,0 +1,159 @@
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Iterable
+
+from src.database.shards import shard_router
+from src.repository.contacts import iter_contact_identities
+from src.services import cache
+
+# Blocks larger than this (e.g. a very common name) are too unspecific to compare pairwise.
+MAX_BLOCK_SIZE = 50
+NAME_SIMILARITY = 0.85
+RESULTS_TTL = 24 * 60 * 60
+
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(
+    ["AEIOUYHW", "BFPV", "CGJKQSXZ", "DT", "L", "MN", "R"]) for c in letters}
+
+
+@dataclass(frozen=True)
+class ContactIdentity:
+    id: int
+    first_name: str
+    last_name: str
+    email: str | None
+    phone: str | None
+
+
+def duplicates_key(user_id: int) -> str:
+    return f"dedup:{user_id}"
+
+
+def normalize_email(email: str | None) -> str | None:
+    """
+    Normalize an email for matching: lowercase, drop ``+tag`` and Gmail dots.
+    """
+    if not email or "@" not in email:
+        return None
+    local, _, domain = email.strip().lower().rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in ("gmail.com", "googlemail.com"):
+        local, domain = local.replace(".", ""), "gmail.com"
+    return f"{local}@{domain}"
+
+
+def normalize_phone(phone: str | None) -> str | None:
+    """
+    Reduce a phone number to its last 9 digits, which ignores country and trunk prefixes.
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-9:] if len(digits) >= 7 else None
+
+
+def soundex(name: str) -> str:
+    """
+    Return the American Soundex code of a name (e.g. ``Robert`` -> ``R163``).
+    """
+    letters = [c for c in name.upper() if c.isalpha() and c.isascii()]
+    if not letters:
+        return ""
+    code, previous = letters[0], _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != "0" and digit != previous:
+            code += digit
+        if c not in "HW":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def _full_name(record: ContactIdentity) -> str:
+    return f"{record.first_name} {record.last_name}".strip().lower()
+
+
+class _DisjointSet:
+    def __init__(self):
+        self.parent: dict[int, int] = {}
+        self.reasons: dict[int, set[str]] = {}
+
+    def find(self, x: int) -> int:
+        root = self.parent.setdefault(x, x)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int, reason: str) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+            self.reasons.setdefault(ra, set()).update(self.reasons.pop(rb, set()))
+        self.reasons.setdefault(ra, set()).add(reason)
+
+
+def find_duplicates(records: Iterable[ContactIdentity]) -> list[dict]:
+    """
+    Group a user's contacts that are likely the same person.
+
+    Contacts are bucketed by blocking keys (normalized email, normalized phone and a phonetic key
+    of the name), so only contacts sharing a key are ever compared and the work stays close to
+    linear. Equal email or phone links contacts directly; a shared phonetic key links them when the
+    spelled names are also similar.
+
+    Args:
+        records: Contacts of one user
+
+    Returns:
+        list[dict]: Groups as ``{"ids": [...], "reasons": [...]}``, largest first
+    """
+    blocks: dict[tuple[str, str], list[ContactIdentity]] = {}
+    for record in records:
+        email = normalize_email(record.email)
+        if email:
+            blocks.setdefault(("email", email), []).append(record)
+        phone = normalize_phone(record.phone)
+        if phone:
+            blocks.setdefault(("phone", phone), []).append(record)
+        name_key = soundex(record.first_name) + soundex(record.last_name)
+        if name_key:
+            blocks.setdefault(("name", name_key), []).append(record)
+
+    groups = _DisjointSet()
+    for (reason, _), members in blocks.items():
+        if len(members) < 2:
+            continue
+        if reason != "name":
+            for other in members[1:]:
+                groups.union(members[0].id, other.id, reason)
+        elif len(members) <= MAX_BLOCK_SIZE:
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    if SequenceMatcher(None, _full_name(a), _full_name(b)).ratio() >= NAME_SIMILARITY:
+                        groups.union(a.id, b.id, reason)
+
+    members_by_root: dict[int, list[int]] = {}
+    for contact_id in groups.parent:
+        members_by_root.setdefault(groups.find(contact_id), []).append(contact_id)
+    result = [{"ids": sorted(ids), "reasons": sorted(groups.reasons[root])}
+              for root, ids in members_by_root.items() if len(ids) > 1]
+    return sorted(result, key=lambda group: (-len(group["ids"]), group["ids"][0]))
+
+
+async def scan_duplicates(user_id: int) -> list[dict]:
+    """
+    Find duplicate candidates among a user's contacts and store them for review.
+
+    Runs as a job on a worker process, with its own session on the user's shard.
+
+    Args:
+        user_id: Owner of the contacts
+
+    Returns:
+        list[dict]: Duplicate groups, as stored under ``dedup:<user_id>``
+    """
+    async with shard_router.session_for(user_id) as db:
+        records = [ContactIdentity(*row) async for row in iter_contact_identities(user_id, db)]
+    groups = find_duplicates(records)
+    await cache.set_json(duplicates_key(user_id), groups, RESULTS_TTL)
+    return groups
@@ -1,24 +1,36 @@
+from functools import lru_cache
 from pathlib import Path
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr
 from src.conf.config import config
 
-from src.services.auth import auth_service
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=config.MAIL_USERNAME,
-    MAIL_PASSWORD=config.MAIL_PASSWORD,
-    MAIL_FROM=config.MAIL_FROM,
-    MAIL_PORT=config.MAIL_PORT,
-    MAIL_SERVER=config.MAIL_SERVER,
-    MAIL_FROM_NAME="Contacts API",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
-)
+@lru_cache
+def get_mail():
+    """
+    Build the mail client on first use.
+
+    ``fastapi_mail`` is imported here rather than at module level because it is one of the
+    heaviest imports of the application and most processes never send mail.
+
+    Returns:
+        FastMail: Mail client configured from the application settings
+    """
+    from fastapi_mail import FastMail, ConnectionConfig
+
+    conf = ConnectionConfig(
+        MAIL_USERNAME=config.MAIL_USERNAME,
+        MAIL_PASSWORD=config.MAIL_PASSWORD,
+        MAIL_FROM=config.MAIL_FROM,
+        MAIL_PORT=config.MAIL_PORT,
+        MAIL_SERVER=config.MAIL_SERVER,
+        MAIL_FROM_NAME="Contacts API",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
+    )
+    return FastMail(conf)
 
 
 async def send_email(email: EmailStr, username: str, host: str):
@@ -38,6 +50,10 @@ async def send_email(email: EmailStr, username: str, host: str):
         >>> send_email("user@example.com", "john_doe", "https://example.com")
         # Sends verification email to user@example.com with appropriate token
     """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+    from src.services.auth import auth_service
+
     try:
         token_verification = auth_service.create_email_token({"sub": email})
         message = MessageSchema(
@@ -47,11 +63,39 @@ async def send_email(email: EmailStr, username: str, host: str):
             subtype=MessageType.html
         )
 
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="verify_email.html")
+        await get_mail().send_message(message, template_name="verify_email.html")
     except ConnectionErrors as err:
         print(f"Email connection error: {err}")
         raise ConnectionErrors(f"Failed to connect to email server: {err}")
     except Exception as err:
         print(f"Unexpected error sending email: {err}")
         raise Exception(f"Failed to send email: {err}")
+
+
+async def send_birthday_digest(email: EmailStr, username: str, birthdays: list[dict]):
+    """
+    Send a digest of upcoming contact birthdays.
+
+    Args:
+        email (EmailStr): Recipient's email address
+        username (str): Recipient's username for personalization
+        birthdays (list[dict]): Contacts with upcoming birthdays, as serialized ``ContactResponse`` dicts
+
+    Raises:
+        ConnectionErrors: If there is an issue connecting to the email server
+    """
+    from fastapi_mail import MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
+    try:
+        message = MessageSchema(
+            subject="Upcoming birthdays",
+            recipients=[email],
+            template_body={"username": username, "birthdays": birthdays},
+            subtype=MessageType.html
+        )
+
+        await get_mail().send_message(message, template_name="birthday_digest.html")
+    except ConnectionErrors as err:
+        print(f"Email connection error: {err}")
+        raise ConnectionErrors(f"Failed to connect to email server: {err}")
@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import json
+
+from src.conf.config import config
+from src.database.redis_client import redismanager
+from src.schemas.contact import ContactResponse
+
+CHANNEL = "contacts:events"
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+OVERFLOW = "overflow"
+
+
+async def publish_contact_event(event_type: str, contact, user_id: int) -> None:
+    """
+    Publish a contact change to every worker through Redis pub/sub.
+
+    Publishing is best effort: a Redis failure is logged and never fails the write that caused it.
+
+    Args:
+        event_type: ``created``, ``updated`` or ``deleted``
+        contact: The changed contact
+        user_id: Owner of the contact
+    """
+    if not redismanager.initialized:
+        return
+    if event_type == DELETED:
+        payload = {"id": contact.id}
+    else:
+        payload = ContactResponse.model_validate(contact).model_dump(mode="json")
+    message = json.dumps({"user_id": user_id, "type": event_type, "contact": payload})
+    try:
+        await redismanager.client.publish(CHANNEL, message)
+    except Exception as err:
+        print(f"Failed to publish contact event: {err}")
+
+
+class Subscription:
+    """
+    Bounded buffer of events for one connected client.
+
+    When the client reads slower than events arrive and the buffer fills up, the subscription is
+    closed with an ``overflow`` event instead of growing without bound; the client is expected to
+    reconnect and catch up through ``/contacts/changes``.
+    """
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def push(self, event: dict) -> None:
+        if self.closed:
+            return
+        if self.queue.full():
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": OVERFLOW})
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class ContactEventHub:
+    """
+    Fans contact events out to the clients connected to this worker.
+
+    A worker holds a single Redis subscription regardless of how many clients are connected;
+    events are routed to the subscriptions of the contact's owner.
+    """
+
+    def __init__(self, buffer_size: int | None = None):
+        self._buffer_size = buffer_size
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Start the background task listening to the Redis channel.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """
+        Stop listening and drop all subscriptions.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._subscribers.clear()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = redismanager.client.pubsub(ignore_subscribe_messages=True)
+                async with pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    async for message in pubsub.listen():
+                        self.dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                print(f"Contact event subscription failed, reconnecting: {err}")
+                await asyncio.sleep(1)
+
+    def dispatch(self, raw: str) -> None:
+        """
+        Deliver a published event to the subscriptions of its owner.
+
+        Args:
+            raw: JSON message as published by ``publish_contact_event``
+        """
+        event = json.loads(raw)
+        for subscription in self._subscribers.get(event.pop("user_id"), ()):
+            subscription.push(event)
+
+    @contextlib.contextmanager
+    def subscribe(self, user_id: int):
+        """
+        Register a client for the events of ``user_id`` for the duration of the block.
+
+        Args:
+            user_id: ID of the authenticated user
+
+        Yields:
+            Subscription: Buffer receiving the user's events
+        """
+        subscription = Subscription(self._buffer_size or config.EVENTS_BUFFER_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+
+event_hub = ContactEventHub()
@@ -0,0 +1,149 @@
+"""
+Liveness and readiness of a server worker.
+
+``/livez`` answers as long as the event loop runs and does no I/O at all. ``/readyz`` answers from
+the last report of a ``HealthChecker`` task running in the background of each worker, so a probe
+never touches the database or Redis itself. Every ``HEALTH_CHECK_INTERVAL`` seconds the checker
+verifies:
+
+- ``database``: every shard answers ``SELECT 1`` within ``HEALTH_CHECK_TIMEOUT``;
+- ``pool``: no connection pool has more than ``HEALTH_MAX_POOL_USAGE`` of its connections checked
+  out (a saturated pool is reported without queueing for a connection);
+- ``redis``: Redis answers ``PING`` within ``HEALTH_CHECK_TIMEOUT``;
+- ``event_loop``: the checker's own sleep overran by less than ``HEALTH_MAX_LOOP_LAG`` seconds.
+
+A report older than three intervals counts as failed, since it means the checker is stuck.
+"""
+import asyncio
+import contextlib
+import time
+
+from sqlalchemy import text
+
+from src.conf.config import config
+from src.database.db import DataBaseSessionManager, sessionmanager
+from src.database.redis_client import redismanager
+
+
+def _result(ok: bool, **details) -> dict:
+    return {"ok": ok, **details}
+
+
+class HealthChecker:
+    """
+    Periodically checks the dependencies of the worker and keeps the latest report.
+    """
+
+    def __init__(self, manager: DataBaseSessionManager = sessionmanager, interval: float | None = None):
+        self.manager = manager
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+        self._report: dict | None = None
+        self._checked_at = 0.0
+        self._loop_lag = 0.0
+
+    @property
+    def interval(self) -> float:
+        return config.HEALTH_CHECK_INTERVAL if self._interval is None else self._interval
+
+    def start(self) -> None:
+        """
+        Start the background task running the checks.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop the background task and forget the last report.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._report = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                print(f"Health check failed: {err}")
+            deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._loop_lag = max(0.0, time.monotonic() - deadline)
+
+    async def _check_database(self, shard: int) -> dict:
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(config.HEALTH_CHECK_TIMEOUT):
+                async with self.manager.shard_engine(shard).connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+        except Exception as err:
+            return _result(False, error=repr(err))
+        return _result(True, ms=round((time.perf_counter() - started) * 1000, 1))
+
+    def _pool_usage(self, shard: int) -> float | None:
+        pool = self.manager.shard_engine(shard).pool
+        if not hasattr(pool, "size") or not hasattr(pool, "checkedout"):
+            return None
+        capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+        return pool.checkedout() / capacity if capacity > 0 else None
+
+    async def _check_redis(self) -> dict:
+        if not redismanager.initialized:
+            return _result(False, error="not initialized")
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(config.HEALTH_CHECK_TIMEOUT):
+                await redismanager.client.ping()
+        except Exception as err:
+            return _result(False, error=repr(err))
+        return _result(True, ms=round((time.perf_counter() - started) * 1000, 1))
+
+    async def check(self) -> dict:
+        """
+        Run all checks now and store the report.
+
+        Returns:
+            dict: The report, see ``report``
+        """
+        pools = {}
+        databases = {}
+        for shard in self.manager.shards:
+            usage = self._pool_usage(shard)
+            saturated = usage is not None and usage > config.HEALTH_MAX_POOL_USAGE
+            pools[str(shard)] = _result(not saturated, usage=None if usage is None else round(usage, 2))
+            if saturated:
+                databases[str(shard)] = _result(False, error="pool saturated, not checked")
+            else:
+                databases[str(shard)] = await self._check_database(shard)
+        checks = {
+            "database": _result(all(r["ok"] for r in databases.values()), shards=databases),
+            "pool": _result(all(r["ok"] for r in pools.values()), shards=pools),
+            "redis": await self._check_redis(),
+            "event_loop": _result(self._loop_lag < config.HEALTH_MAX_LOOP_LAG, lag_ms=round(self._loop_lag * 1000, 1)),
+        }
+        self._report = {"ready": all(check["ok"] for check in checks.values()), "checks": checks}
+        self._checked_at = time.monotonic()
+        return self.report()
+
+    def report(self) -> dict:
+        """
+        Return the last report without running any check.
+
+        Returns:
+            dict: ``ready`` (bool), ``age`` of the report in seconds and the result of each check;
+            not ready while no report exists or the last one is stale
+        """
+        if self._report is None:
+            return {"ready": False, "age": None, "checks": {}}
+        age = time.monotonic() - self._checked_at
+        fresh = age <= 3 * self.interval
+        return {**self._report, "ready": self._report["ready"] and fresh, "age": round(age, 1)}
+
+
+health_checker = HealthChecker()
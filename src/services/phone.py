@@ -0,0 +1,65 @@
+import re
+
+from src.conf.config import config
+
+# E.164 allows at most 15 digits; shorter numbers than this are extensions or typos.
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+MIN_SUFFIX_DIGITS = 4
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone(phone: str | None, country_code: str | None = None) -> str | None:
+    """
+    Convert a free-form phone number to E.164 (``+380501234567``).
+
+    Numbers written with ``+`` or the ``00`` international prefix keep their country code.
+    National numbers (``050 123 4567``) get ``country_code``, by default ``PHONE_DEFAULT_COUNTRY_CODE``,
+    with the trunk ``0`` dropped.
+
+    Args:
+        phone: Phone number as entered by the user
+        country_code: Country calling code for national numbers, digits only
+
+    Returns:
+        str | None: The E.164 number, or None if the input is not a plausible phone number
+    """
+    if not phone:
+        return None
+    phone = phone.strip()
+    digits = _NON_DIGITS.sub("", phone)
+    if phone.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    else:
+        country_code = country_code or config.PHONE_DEFAULT_COUNTRY_CODE
+        if not digits.startswith(country_code) or len(digits) < MIN_DIGITS + len(country_code) - 1:
+            digits = country_code + digits.lstrip("0")
+    if not MIN_DIGITS <= len(digits) <= MAX_DIGITS or digits.startswith("0"):
+        return None
+    return f"+{digits}"
+
+
+def reversed_digits(phone_normalized: str | None) -> str | None:
+    """
+    Digits of an E.164 number in reverse order.
+
+    Stored next to the number so that a suffix match ("ends with 1234567") becomes a prefix match
+    on this column, which an ordinary B-tree index can serve.
+    """
+    return phone_normalized[:0:-1] if phone_normalized else None
+
+
+def suffix_pattern(phone: str) -> str | None:
+    """
+    Build the ``LIKE`` prefix pattern on the reversed column for numbers ending with ``phone``.
+
+    Returns:
+        str | None: The pattern, or None if fewer than ``MIN_SUFFIX_DIGITS`` digits are given
+    """
+    digits = _NON_DIGITS.sub("", phone)
+    if len(digits) < MIN_SUFFIX_DIGITS:
+        return None
+    return digits[::-1] + "%"
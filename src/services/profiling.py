@@ -0,0 +1,185 @@
+"""
+On-demand CPU profiling of single requests.
+
+With ``PROFILING_ENABLED`` set, ``ProfilingMiddleware`` profiles a request when it carries the
+header ``X-Profile: <PROFILING_TOKEN>``, or at random for a ``PROFILING_SAMPLE_RATE`` fraction of
+requests. The profile is written to ``PROFILING_DIR`` in the speedscope format (open it at
+https://www.speedscope.app) and its file name is returned in the ``X-Profile`` response header.
+
+The profiler samples the stack of the event loop thread every ``PROFILING_INTERVAL`` seconds from a
+separate thread, so the profiled request runs at nearly full speed. Only samples taken while the
+request's own coroutine is executing are kept: time the request spends awaiting the database or
+Redis, and work of other requests interleaved on the same loop, is left out. A profile therefore
+shows where the request spends CPU, e.g. in the authentication dependency, in ORM hydration or in
+Pydantic serialization. Code the request runs in the thread pool (sync dependencies and
+endpoints) is not sampled.
+
+One request is profiled at a time per worker; requests arriving meanwhile are not profiled.
+"""
+import asyncio
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from types import FrameType
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import config
+
+HEADER = b"x-profile"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class Sampler:
+    """
+    Samples the stacks of one thread, keeping those that pass through a given frame.
+
+    Args:
+        thread_id: Thread to sample, usually the event loop thread
+        anchor: Frame of the coroutine being profiled; stacks not containing it are ignored
+        interval: Seconds between samples
+    """
+
+    def __init__(self, thread_id: int, anchor: FrameType, interval: float):
+        self.thread_id = thread_id
+        self.anchor = anchor
+        self.interval = interval
+        self.frames: list[dict] = []
+        self.samples: list[list[int]] = []
+        self.weights: list[float] = []
+        self._index: dict[tuple, int] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.started = self.stopped = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def _frame_id(self, frame: FrameType) -> int:
+        code = frame.f_code
+        key = (code.co_filename, code.co_firstlineno, code.co_name)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.frames)
+            self.frames.append({"name": getattr(code, "co_qualname", code.co_name),
+                                "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _sample(self, weight: float) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and frame is not self.anchor:
+            stack.append(frame)
+            frame = frame.f_back
+        if frame is None:
+            return
+        stack.append(frame)
+        # speedscope wants the root first; the anchor (the middleware) becomes the root.
+        self.samples.append([self._frame_id(frame) for frame in reversed(stack)])
+        self.weights.append(weight)
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            # Weight each sample by the time actually elapsed, which exceeds the interval under load.
+            self._sample((now - last) * 1000)
+            last = now
+
+    def speedscope(self, name: str) -> dict:
+        """
+        Export the samples as a speedscope file.
+
+        Args:
+            name: Name of the profile, e.g. the request line
+
+        Returns:
+            dict: Profile in the speedscope file format
+        """
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "contacts-api",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(self.weights), 3),
+                "samples": self.samples,
+                "weights": [round(weight, 3) for weight in self.weights],
+            }],
+        }
+
+
+def _file_name(method: str, path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}-{method.lower()}-{slug}.speedscope.json"
+
+
+def _write(path: str, profile: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(profile, file)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests selected by the ``X-Profile`` header or by sampling.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = False
+
+    def _selected(self, scope: Scope) -> bool:
+        if self._busy:
+            return False
+        token = config.PROFILING_TOKEN
+        if token:
+            for name, value in scope["headers"]:
+                if name == HEADER:
+                    return hmac.compare_digest(value, token.encode())
+        return config.PROFILING_SAMPLE_RATE > 0 and random.random() < config.PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        name = _file_name(scope["method"], scope["path"])
+
+        async def send_with_header(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (HEADER, name.encode())]
+            await send(message)
+
+        sampler = Sampler(threading.get_ident(), sys._getframe(), config.PROFILING_INTERVAL)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            sampler.stop()
+            self._busy = False
+            profile = sampler.speedscope(f"{scope['method']} {scope['path']}")
+            path = os.path.join(config.PROFILING_DIR, name)
+            try:
+                await asyncio.to_thread(_write, path, profile)
+                print(f"Profile of {scope['method']} {scope['path']}: {len(sampler.samples)} samples, "
+                      f"{(sampler.stopped - sampler.started) * 1000:.0f} ms wall, written to {path}")
+            except OSError as err:
+                print(f"Failed to write profile {path}: {err}")
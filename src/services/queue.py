@@ -0,0 +1,246 @@
+"""
+Durable job queue on Redis streams.
+
+The web tier only enqueues jobs; they are run by separate worker processes
+(``python -m src.worker``, see ``src.worker``). Jobs survive restarts of both because they live
+in Redis until a worker has finished them:
+
+- ``jobs:stream`` holds ready jobs and is read by the ``workers`` consumer group. A job is
+  acknowledged and deleted only once it succeeded, was rescheduled or was dead-lettered; a job
+  held by a worker that died is claimed by another worker after ``JOB_CLAIM_IDLE`` seconds.
+- ``jobs:delayed`` is a sorted set of failed jobs waiting for their retry, scored by due time.
+- ``jobs:dead`` is a capped list of jobs that failed ``JOB_MAX_ATTEMPTS`` times.
+- ``jobs:metrics`` counts enqueued, succeeded, retried and dead jobs and their run time per job type.
+
+A job can run more than once (e.g. when its worker dies right after finishing it), so jobs must
+be idempotent. Job handlers are registered with ``task``; see ``src.services.tasks``.
+"""
+import json
+import random
+import time
+import traceback
+import uuid
+from collections.abc import Awaitable, Callable
+
+import redis.asyncio as redis
+from fastapi import BackgroundTasks
+from redis.exceptions import RedisError, ResponseError
+
+from src.conf.config import config
+from src.database.redis_client import redismanager
+
+STREAM = "jobs:stream"
+GROUP = "workers"
+DELAYED = "jobs:delayed"
+DEAD = "jobs:dead"
+METRICS = "jobs:metrics"
+DEAD_LETTER_SIZE = 10_000
+
+# Moves due jobs from the delayed set to the stream in one atomic step, so a job is never lost
+# or duplicated between the two. Returns the number of jobs moved.
+PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job)
+    redis.call('XADD', KEYS[2], '*', 'job', job)
+end
+return #due
+"""
+
+HANDLERS: dict[str, Callable[..., Awaitable]] = {}
+
+
+def task(name: str):
+    """
+    Register a coroutine function as the handler of the job type ``name``.
+
+    Handlers are called with the keyword arguments given to ``JobQueue.enqueue``, which must be
+    JSON-serializable. A handler that raises is retried with exponential backoff.
+    """
+    def register(func):
+        HANDLERS[name] = func
+        return func
+    return register
+
+
+def backoff(attempt: int) -> float:
+    """
+    Delay in seconds before retrying a job that failed ``attempt`` times.
+
+    Doubles with every attempt from ``JOB_BACKOFF_BASE`` up to ``JOB_BACKOFF_MAX``, with jitter so
+    jobs that failed together (e.g. while the mail server was down) do not retry together.
+    """
+    delay = min(config.JOB_BACKOFF_MAX, config.JOB_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobQueue:
+    """
+    Producer and consumer side of the job queue.
+
+    Uses the application's Redis client unless another client is given.
+    """
+
+    def __init__(self, client: redis.Redis | None = None):
+        self._client = client
+        self._promote = None
+
+    @property
+    def client(self) -> redis.Redis:
+        return self._client or redismanager.client
+
+    async def enqueue(self, job_type: str, **kwargs) -> str:
+        """
+        Add a job to the queue.
+
+        Args:
+            job_type: Name the handler was registered under
+            **kwargs: JSON-serializable arguments of the handler
+
+        Returns:
+            str: ID of the job
+        """
+        job = {"id": uuid.uuid4().hex, "type": job_type, "args": kwargs, "attempt": 0}
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.xadd(STREAM, {"job": json.dumps(job)})
+            pipe.hincrby(METRICS, f"{job_type}:enqueued", 1)
+            await pipe.execute()
+        return job["id"]
+
+    async def enqueue_or_run(self, background_tasks: BackgroundTasks, job_type: str, **kwargs) -> str | None:
+        """
+        Add a job to the queue, or run it in this process after the response if Redis is unavailable.
+
+        For jobs that must not be lost once the route has committed its changes, such as the
+        confirmation email of a new account: failing the response would not undo the commit. The
+        fallback runs the handler once, without the retries of the queue.
+
+        Args:
+            background_tasks: Background tasks of the current request
+            job_type: Name the handler was registered under
+            **kwargs: JSON-serializable arguments of the handler
+
+        Returns:
+            str | None: ID of the job, or None if it runs in this process
+        """
+        try:
+            return await self.enqueue(job_type, **kwargs)
+        except (RedisError, OSError) as err:
+            print(f"Could not enqueue {job_type}, running it in process: {err}")
+            background_tasks.add_task(HANDLERS[job_type], **kwargs)
+            return None
+
+    async def ensure_group(self) -> None:
+        """
+        Create the stream and its consumer group if they do not exist yet.
+        """
+        try:
+            await self.client.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+        except ResponseError as err:
+            if "BUSYGROUP" not in str(err):
+                raise
+
+    async def promote(self, limit: int = 100) -> int:
+        """
+        Move delayed jobs whose retry is due back to the stream.
+
+        Returns:
+            int: Number of jobs moved
+        """
+        client = self.client
+        if self._promote is None or self._promote.registered_client is not client:
+            self._promote = client.register_script(PROMOTE_SCRIPT)
+        return await self._promote(keys=[DELAYED, STREAM], args=[int(time.time() * 1000), limit])
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> list[tuple[str, dict]]:
+        """
+        Receive new jobs for a consumer, waiting up to ``block_ms`` for one to arrive.
+
+        Returns:
+            list[tuple[str, dict]]: Stream message IDs and jobs
+        """
+        response = await self.client.xreadgroup(GROUP, consumer, {STREAM: ">"}, count=count, block=block_ms)
+        return [(message_id, json.loads(fields["job"])) for _, messages in response or ()
+                for message_id, fields in messages]
+
+    async def claim_stale(self, consumer: str, count: int) -> list[tuple[str, dict]]:
+        """
+        Take over jobs that another consumer received but did not finish within ``JOB_CLAIM_IDLE``.
+
+        Returns:
+            list[tuple[str, dict]]: Stream message IDs and jobs
+        """
+        _, messages, *_ = await self.client.xautoclaim(STREAM, GROUP, consumer, config.JOB_CLAIM_IDLE * 1000,
+                                                       start_id="0-0", count=count)
+        return [(message_id, json.loads(fields["job"])) for message_id, fields in messages if fields]
+
+    async def complete(self, message_id: str, job: dict, elapsed: float) -> None:
+        """
+        Acknowledge a job that succeeded and record its run time.
+        """
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.xack(STREAM, GROUP, message_id)
+            pipe.xdel(STREAM, message_id)
+            pipe.hincrby(METRICS, f"{job['type']}:succeeded", 1)
+            pipe.hincrby(METRICS, f"{job['type']}:run_ms", round(elapsed * 1000))
+            await pipe.execute()
+
+    async def fail(self, message_id: str, job: dict, error: BaseException, retry: bool = True) -> bool:
+        """
+        Reschedule a failed job with backoff, or dead-letter it once it used up its attempts.
+
+        Args:
+            message_id: Stream message ID of the job
+            job: The job that failed
+            error: Exception raised by the handler
+            retry: Whether the job may be retried at all
+
+        Returns:
+            bool: True if the job was rescheduled, False if it was dead-lettered
+        """
+        job = {**job, "attempt": job["attempt"] + 1}
+        retry = retry and job["attempt"] < config.JOB_MAX_ATTEMPTS
+        async with self.client.pipeline(transaction=True) as pipe:
+            if retry:
+                due = int((time.time() + backoff(job["attempt"])) * 1000)
+                pipe.zadd(DELAYED, {json.dumps(job): due})
+                pipe.hincrby(METRICS, f"{job['type']}:retried", 1)
+            else:
+                error_text = "".join(traceback.format_exception_only(error)).strip()
+                pipe.lpush(DEAD, json.dumps({**job, "error": error_text, "failed_at": int(time.time())}))
+                pipe.ltrim(DEAD, 0, DEAD_LETTER_SIZE - 1)
+                pipe.hincrby(METRICS, f"{job['type']}:dead", 1)
+            pipe.xack(STREAM, GROUP, message_id)
+            pipe.xdel(STREAM, message_id)
+            await pipe.execute()
+        return retry
+
+    async def dead_letters(self, limit: int = 100) -> list[dict]:
+        """
+        Return the most recently dead-lettered jobs, with the error that ended them.
+        """
+        return [json.loads(job) for job in await self.client.lrange(DEAD, 0, limit - 1)]
+
+    async def metrics(self) -> dict[str, dict[str, int]]:
+        """
+        Return the counters of every job type, e.g. ``{"send_email": {"enqueued": 3, "succeeded": 2}}``.
+        """
+        metrics = {}
+        for field, value in (await self.client.hgetall(METRICS)).items():
+            job_type, _, counter = field.rpartition(":")
+            metrics.setdefault(job_type, {})[counter] = int(value)
+        return metrics
+
+    async def depth(self) -> dict[str, int]:
+        """
+        Return the number of ready (including running), delayed and dead jobs.
+        """
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.xlen(STREAM)
+            pipe.zcard(DELAYED)
+            pipe.llen(DEAD)
+            ready, delayed, dead = await pipe.execute()
+        return {"ready": ready, "delayed": delayed, "dead": dead}
+
+
+job_queue = JobQueue()
@@ -0,0 +1,162 @@
+import math
+import time
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, Response, status
+
+from src.conf.config import config
+from src.database.redis_client import redismanager
+from src.services.auth import auth_service
+from src.services.timing import timed
+
+# GCRA (generic cell rate algorithm) in a single atomic call.
+# The script grants a batch of ARGV[3] tokens only while at least twice that many are available,
+# so a worker can lease a batch for a client that is clearly under its limit and admit the
+# following requests locally; closer to the limit it grants one token at a time, so tokens are
+# not stranded in one worker's lease while the client's requests land on another.
+# Returns {granted, remaining, retry_after_ms, reset_after_ms}.
+GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local tolerance = emission * capacity
+-- the epsilon absorbs float rounding on millisecond timestamps
+local available = math.floor((now + tolerance - tat) / emission + 1e-6)
+local granted = 1
+if available >= 2 * requested then
+    granted = requested
+end
+if available < 1 then
+    return {0, 0, math.ceil(tat + emission - tolerance - now), math.ceil(tat - now)}
+end
+tat = tat + granted * emission
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil(tat - now))
+local remaining = math.floor((now + tolerance - tat) / emission + 1e-6)
+return {granted, remaining, 0, math.ceil(tat - now)}
+"""
+
+MAX_LEASES = 10_000
+
+
+@dataclass
+class _Lease:
+    tokens: int
+    remaining: int
+    reset_at: float
+    expires_at: float
+
+
+class RateLimiter:
+    """
+    Route dependency enforcing a request quota with one Redis round trip per request.
+
+    Clients are keyed by the subject of their bearer token when present, otherwise by IP.
+    Every admitted response carries ``RateLimit-Limit``, ``RateLimit-Remaining`` and
+    ``RateLimit-Reset`` headers; rejected requests get ``429`` with ``Retry-After``.
+
+    With ``local_batch`` > 1 the limiter leases several tokens from Redis at once and spends
+    them in-process, so clients far below their quota skip Redis for most requests; once fewer
+    than twice ``local_batch`` tokens are left, it takes them one at a time. A worker
+    can overshoot the quota by at most one lease, which is why leases are capped to a quarter
+    of the limit and expire after one period.
+    """
+
+    def __init__(self, times: int = 1, seconds: int = 0, minutes: int = 0, local_batch: int | None = None):
+        self.times = times
+        self.period_ms = (seconds + 60 * minutes) * 1000
+        self.emission_ms = self.period_ms / times
+        if local_batch is None:
+            local_batch = config.RATE_LIMIT_LOCAL_BATCH
+        self.local_batch = max(1, min(local_batch, times // 4))
+        self._leases: dict[str, _Lease] = {}
+        self._script = None
+
+    def identifier(self, request: Request) -> str:
+        """
+        Build the client identity for a request.
+
+        Args:
+            request: Incoming request
+
+        Returns:
+            str: ``user:<email>`` for requests with a valid bearer token, ``ip:<host>`` otherwise
+        """
+        authorization = request.headers.get("authorization")
+        if authorization:
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                subject = auth_service.get_token_subject(token)
+                if subject:
+                    return f"user:{subject}"
+        host = request.client.host if request.client else "unknown"
+        return f"ip:{host}"
+
+    def key(self, request: Request) -> str:
+        route = request.scope.get("route")
+        path = route.path if route is not None else request.url.path
+        return f"ratelimit:{request.method}:{path}:{self.identifier(request)}"
+
+    async def _acquire(self, key: str, cost: int):
+        client = redismanager.client
+        if self._script is None or self._script.registered_client is not client:
+            self._script = client.register_script(GCRA_SCRIPT)
+        granted, remaining, retry_ms, reset_ms = await self._script(
+            keys=[key], args=[self.emission_ms, self.times, cost]
+        )
+        return int(granted), int(remaining), int(retry_ms), int(reset_ms)
+
+    def _headers(self, remaining: int, reset_at: float, now: float) -> dict:
+        return {
+            "RateLimit-Limit": str(self.times),
+            "RateLimit-Remaining": str(max(0, remaining)),
+            "RateLimit-Reset": str(max(0, math.ceil(reset_at - now))),
+        }
+
+    def _prune(self, now: float) -> None:
+        if len(self._leases) > MAX_LEASES:
+            self._leases = {k: v for k, v in self._leases.items() if v.expires_at > now}
+
+    async def check(self, request: Request, response: Response) -> None:
+        """
+        Admit the request or reject it with ``429``.
+
+        Args:
+            request: Incoming request
+            response: Response whose headers receive the current quota
+
+        Raises:
+            HTTPException: 429 if the client exhausted its quota
+        """
+        key = self.key(request)
+        now = time.monotonic()
+
+        lease = self._leases.get(key)
+        if lease is not None and lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            response.headers.update(self._headers(lease.remaining + lease.tokens, lease.reset_at, now))
+            return
+
+        granted, remaining, retry_ms, reset_ms = await self._acquire(key, self.local_batch)
+        reset_at = now + reset_ms / 1000
+        if not granted:
+            self._leases.pop(key, None)
+            headers = self._headers(0, reset_at, now)
+            headers["Retry-After"] = str(max(1, math.ceil(retry_ms / 1000)))
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests",
+                                headers=headers)
+
+        if granted > 1:
+            self._prune(now)
+            self._leases[key] = _Lease(tokens=granted - 1, remaining=remaining, reset_at=reset_at,
+                                       expires_at=now + self.period_ms / 1000)
+        response.headers.update(self._headers(remaining + granted - 1, reset_at, now))
+
+    async def __call__(self, request: Request, response: Response):
+        with timed("ratelimit"):
+            await self.check(request, response)
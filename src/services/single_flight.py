@@ -0,0 +1,63 @@
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls within one worker.
+
+    The first caller for a key runs the call; callers arriving while it is in flight wait for
+    the same result instead of issuing their own query. If the running call is cancelled
+    (e.g. its client disconnected), waiting callers run the call themselves.
+
+    Attributes:
+        coalesced: Number of callers served by another caller's in-flight call, per name
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.coalesced: Counter[str] = Counter()
+
+    async def do(self, name: str, params: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` once for all concurrent callers sharing ``name`` and ``params``.
+
+        Args:
+            name: Name of the coalesced operation, also used as the counter label
+            params: Normalized, hashable call parameters (include the user id)
+            fn: Zero-argument coroutine function performing the call
+
+        Returns:
+            Any: Result of the shared call
+        """
+        key = (name, params)
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced[name] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            return await fn()
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+single_flight = SingleFlight()
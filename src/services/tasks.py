@@ -0,0 +1,50 @@
+"""
+Jobs run by the worker processes.
+
+Routes enqueue them by name through ``src.services.queue.job_queue``::
+
+    await job_queue.enqueue(tasks.SEND_EMAIL, email=user.email, username=user.username, host=host)
+"""
+import base64
+
+from src.database.db import sessionmanager
+from src.repository import users as repository_users
+from src.services.cloudinary import DEFAULT_AVATAR, upload_avatar
+from src.services.dedup import scan_duplicates
+from src.services.email import send_email
+from src.services.queue import task
+
+SEND_EMAIL = "send_email"
+UPLOAD_DEFAULT_AVATAR = "upload_default_avatar"
+MIRROR_AVATAR = "mirror_avatar"
+SCAN_DUPLICATES = "scan_duplicates"
+
+task(SEND_EMAIL)(send_email)
+task(SCAN_DUPLICATES)(scan_duplicates)
+
+
+@task(UPLOAD_DEFAULT_AVATAR)
+async def upload_default_avatar(email: str) -> None:
+    """
+    Upload the default avatar of a new user to Cloudinary and store its URL.
+
+    Args:
+        email (str): Email of the new user, also used as the image's public ID.
+    """
+    avatar = await upload_avatar(DEFAULT_AVATAR, public_id=email)
+    async with sessionmanager.session() as db:
+        user = await repository_users.get_user_by_email(email, db)
+        if user is not None and user.avatar is None:
+            await repository_users.update_avatar(user, avatar, db)
+
+
+@task(MIRROR_AVATAR)
+async def mirror_avatar(email: str, image: str) -> None:
+    """
+    Upload a copy of a locally stored avatar to Cloudinary.
+
+    Args:
+        email (str): Email of the user, used as the image's public ID.
+        image (str): Base64-encoded image file.
+    """
+    await upload_avatar(base64.b64decode(image), public_id=email)
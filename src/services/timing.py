@@ -0,0 +1,210 @@
+"""
+Per-request timing of the phases of a request, reported in the ``Server-Timing`` header.
+
+``ServerTimingMiddleware`` opens a timing context for every request in a context variable; the code
+of the request adds to it, and the middleware sends the totals as a ``Server-Timing`` header
+(shown in the network panel of browser devtools) and, with ``ACCESS_LOG``, in a JSON access log
+line. Metrics:
+
+- ``auth``: ``get_current_user``, i.e. JWT decoding and the user lookup;
+- ``ratelimit``: the ``RateLimiter`` dependency, mostly its Redis call;
+- ``db``: time the database driver spent executing statements, with the number of statements;
+- ``hydrate``: building ORM objects from the rows of ``SELECT`` statements;
+- ``endpoint``: the endpoint function, including the database work it does;
+- ``serialize``: validating the endpoint's result against the response model and rendering it
+  (this includes closing dependencies with ``yield``, such as the database session);
+- ``total``: from the start of the request to the start of the response.
+
+Metrics overlap: ``db`` and ``hydrate`` count towards ``auth`` or ``endpoint``, whichever ran the
+statement. Outside a request, e.g. in background jobs, nothing is recorded.
+"""
+import asyncio
+import contextlib
+import copy
+import functools
+import json
+import time
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import config
+
+_timings: ContextVar[dict[str, list[float]] | None] = ContextVar("server_timing", default=None)
+_ENDPOINT_END = "_endpoint_end"
+
+
+def record(name: str, ms: float) -> None:
+    """
+    Add a duration to a metric of the current request; does nothing outside a request.
+
+    Args:
+        name: Metric name
+        ms: Duration in milliseconds
+    """
+    timings = _timings.get()
+    if timings is not None:
+        metric = timings.setdefault(name, [0.0, 0])
+        metric[0] += ms
+        metric[1] += 1
+
+
+@contextlib.contextmanager
+def timed(name: str):
+    """
+    Time the enclosed block, which may contain ``await``, as metric ``name``.
+    """
+    if _timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def header(timings: dict[str, list[float]]) -> str:
+    """
+    Format metrics as a ``Server-Timing`` header value.
+
+    Args:
+        timings: Duration in milliseconds and number of occurrences per metric
+
+    Returns:
+        str: E.g. ``db;dur=1.4;desc="2 calls", total;dur=5.1``
+    """
+    metrics = []
+    for name, (ms, count) in timings.items():
+        if name.startswith("_"):
+            continue
+        metric = f"{name};dur={ms:.1f}"
+        if count > 1:
+            metric += f';desc="{count} calls"'
+        metrics.append(metric)
+    return ", ".join(metrics)
+
+
+# The start time lives on the execution context of the statement: after_cursor_execute does not
+# run for a statement that raises, and a context is discarded with its statement.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _timings.get() is not None and context is not None:
+        context._server_timing_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_server_timing_start", None)
+    if start is not None:
+        context._server_timing_start = None
+        record("db", (time.perf_counter() - start) * 1000)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hydrate(orm_state: ORMExecuteState):
+    options = orm_state.execution_options
+    if (_timings.get() is None or not orm_state.is_select
+            or options.get("yield_per") or options.get("stream_results")):
+        return None
+    result = orm_state.invoke_statement()
+    # Objects are built lazily as rows are fetched; freezing the result builds them all here.
+    start = time.perf_counter()
+    frozen = result.freeze()
+    record("hydrate", (time.perf_counter() - start) * 1000)
+    return frozen()
+
+
+class TimedRoute(APIRoute):
+    """
+    Route recording the ``endpoint`` and ``serialize`` metrics; pass it as ``route_class`` of a router.
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def endpoint(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    _endpoint_done(start)
+        else:
+            @functools.wraps(call)
+            def endpoint(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return call(*args, **kwargs)
+                finally:
+                    _endpoint_done(start)
+
+        original, self.dependant = self.dependant, copy.copy(self.dependant)
+        self.dependant.call = endpoint
+        try:
+            handler = super().get_route_handler()
+        finally:
+            self.dependant = original
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _timings.get()
+            if timings is not None and _ENDPOINT_END in timings:
+                ended = timings.pop(_ENDPOINT_END)[0]
+                record("serialize", (time.perf_counter() - ended) * 1000)
+            return response
+
+        return timed_handler
+
+
+def _endpoint_done(start: float) -> None:
+    end = time.perf_counter()
+    record("endpoint", (end - start) * 1000)
+    timings = _timings.get()
+    if timings is not None:
+        timings[_ENDPOINT_END] = [end, 1]
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware collecting the timings of each request and reporting them.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, list[float]] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        status = None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timings["total"] = [(time.perf_counter() - start) * 1000, 1]
+                if config.SERVER_TIMING:
+                    message["headers"] = [*message.get("headers", []),
+                                          (b"server-timing", header(timings).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            if config.ACCESS_LOG:
+                print(json.dumps({
+                    "method": scope["method"], "path": scope["path"], "status": status,
+                    "ms": round((time.perf_counter() - start) * 1000, 1),
+                    "timings": {name: round(ms, 1) for name, (ms, _) in timings.items() if not name.startswith("_")},
+                }))
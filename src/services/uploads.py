@@ -0,0 +1,181 @@
+"""
+Streaming, size-bounded file uploads.
+
+An ``UploadFile`` parameter makes Starlette receive and buffer the whole request body before the
+route runs, however large it is. Routes accepting files read the body through ``receive_file``
+instead: the multipart stream is parsed chunk by chunk, the file type is sniffed from its first
+bytes, and the upload is aborted as soon as it exceeds the size limit or turns out not to be an
+accepted type. The file is kept in memory up to ``UPLOAD_SPOOL_THRESHOLD`` bytes and spooled to a
+temporary file on disk beyond that.
+"""
+from tempfile import SpooledTemporaryFile
+
+from fastapi import Request
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from src.conf.config import config
+
+SNIFF_BYTES = 12
+IMAGE_TYPES = frozenset({"image/jpeg", "image/png", "image/gif", "image/webp"})
+# Allowance for boundaries and part headers when checking Content-Length against the file size limit.
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class UploadRejected(ValueError):
+    """
+    The request does not carry an acceptable file.
+    """
+    status_code = 400
+
+
+class UploadTooLarge(UploadRejected):
+    status_code = 413
+
+
+def sniff(head: bytes) -> str | None:
+    """
+    Detect the media type of a file from its first bytes.
+
+    Args:
+        head: At least the first ``SNIFF_BYTES`` bytes of the file (or the whole file if shorter)
+
+    Returns:
+        str | None: Media type of a known image format, None otherwise
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class _FieldReader:
+    """
+    Multipart parser callbacks collecting the data of the first file part named ``field``.
+    """
+
+    def __init__(self, field: str):
+        self.field = field.encode()
+        self.found = False
+        self.chunks: list[bytes] = []
+        self._active = False
+        self._header = b""
+        self._value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header.lower() == b"content-disposition":
+            self._disposition = self._value
+        self._header = self._value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        self._active = not self.found and options.get(b"name") == self.field and b"filename" in options
+        self.found = self.found or self._active
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._active:
+            self.chunks.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        self._active = False
+
+    def drain(self) -> list[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+async def receive_file(request: Request, field: str = "file", max_size: int | None = None,
+                       allowed: frozenset[str] = IMAGE_TYPES) -> SpooledTemporaryFile:
+    """
+    Receive one file from a ``multipart/form-data`` request body without buffering the whole body.
+
+    Args:
+        request: Current request; its body must not have been read yet
+        field: Name of the form field holding the file
+        max_size: Maximum file size in bytes; defaults to ``UPLOAD_MAX_SIZE``
+        allowed: Accepted media types, as detected by ``sniff``
+
+    Returns:
+        SpooledTemporaryFile: The file, positioned at its start; the caller must close it
+
+    Raises:
+        UploadTooLarge: As soon as the declared body or the received file exceeds ``max_size``
+        UploadRejected: If the body is not multipart, lacks the field or the file type is not allowed
+    """
+    max_size = config.UPLOAD_MAX_SIZE if max_size is None else max_size
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadRejected("Expected a multipart/form-data body")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_size + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(f"File exceeds {max_size} bytes")
+
+    reader = _FieldReader(field)
+    parser = MultipartParser(params[b"boundary"], reader.callbacks())
+    file = SpooledTemporaryFile(max_size=config.UPLOAD_SPOOL_THRESHOLD)
+    size = 0
+    head = b""
+    media_type = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for data in reader.drain():
+                size += len(data)
+                if size > max_size:
+                    raise UploadTooLarge(f"File exceeds {max_size} bytes")
+                if media_type is None and len(head) < SNIFF_BYTES:
+                    head += data[:SNIFF_BYTES - len(head)]
+                    if len(head) == SNIFF_BYTES:
+                        media_type = _check_type(head, allowed)
+                if file._rolled:
+                    await run_in_threadpool(file.write, data)
+                else:
+                    file.write(data)
+        parser.finalize()
+        if not reader.found:
+            raise UploadRejected(f"Missing file field '{field}'")
+        if media_type is None:
+            _check_type(head, allowed)
+        file.seek(0)
+        return file
+    except MultipartParseError as err:
+        file.close()
+        raise UploadRejected("Malformed multipart body") from err
+    except BaseException:
+        file.close()
+        raise
+
+
+def _check_type(head: bytes, allowed: frozenset[str]) -> str:
+    media_type = sniff(head)
+    if media_type not in allowed:
+        raise UploadRejected(f"Unsupported file type, expected one of: {', '.join(sorted(allowed))}")
+    return media_type
@@ -0,0 +1,102 @@
+"""
+Batching of concurrent user lookups by email within one worker.
+
+Every authenticated request looks up its user by the email in the access token, and every login
+and token refresh does the same, each with its own query. Under a login storm or a spike of token
+validations a worker runs hundreds of these small queries at once, each a separate round trip and
+connection checkout. ``UserLoader`` collects the lookups made within one event-loop iteration (or
+``USER_LOADER_WINDOW`` seconds) and resolves them with a single ``WHERE email = ANY(...)`` query,
+then hands every caller its user.
+
+The batch query runs in a short session of its own on the caller's engine, so no request's session
+or transaction is shared. Each caller then gets its own copy of the user merged into its session
+with ``merge(load=False)``, without another query, and can modify and commit it as before.
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.conf.config import config
+from src.entity.models import User
+from src.repository import users as repository_users
+
+
+class UserLoader:
+    """
+    Resolves concurrent ``get_user_by_email`` lookups of one worker with batched queries.
+
+    Attributes:
+        stats: Number of ``lookups`` requested and batch ``queries`` run
+    """
+
+    def __init__(self):
+        self._batches: dict[AsyncEngine, dict[str, list[asyncio.Future]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"lookups": 0, "queries": 0}
+
+    async def load(self, email: str, db: AsyncSession) -> User | None:
+        """
+        Retrieve a user by email, sharing the query with other lookups made at the same time.
+
+        Args:
+            email: The email of the user to search for
+            db: Session of the caller; the user is merged into it
+
+        Returns:
+            User | None: The user, attached to ``db``, or None if there is none
+        """
+        if not config.USER_LOADER_ENABLED:
+            return await repository_users.get_user_by_email(email, db)
+
+        loop = asyncio.get_running_loop()
+        bind = db.bind
+        batch = self._batches.get(bind)
+        if batch is None:
+            batch = self._batches[bind] = {}
+            if config.USER_LOADER_WINDOW > 0:
+                loop.call_later(config.USER_LOADER_WINDOW, self._dispatch, bind, batch)
+            else:
+                loop.call_soon(self._dispatch, bind, batch)
+        future = loop.create_future()
+        batch.setdefault(email, []).append(future)
+        self.stats["lookups"] += 1
+        if len(batch) >= config.USER_LOADER_MAX_BATCH:
+            self._dispatch(bind, batch)
+
+        user = await future
+        if user is None:
+            return None
+        return await db.merge(user, load=False)
+
+    def _dispatch(self, bind: AsyncEngine, batch: dict[str, list[asyncio.Future]]) -> None:
+        if self._batches.get(bind) is not batch:
+            return  # already dispatched because it was full
+        del self._batches[bind]
+        task = asyncio.get_running_loop().create_task(self._fetch(bind, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, bind: AsyncEngine, batch: dict[str, list[asyncio.Future]]) -> None:
+        self.stats["queries"] += 1
+        try:
+            async with AsyncSession(bind=bind) as session:
+                users = await repository_users.get_users_by_emails(list(batch), session)
+        except asyncio.CancelledError:
+            for futures in batch.values():
+                for future in futures:
+                    future.cancel()
+            raise
+        except Exception as err:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(err)
+            return
+        for email, futures in batch.items():
+            for future in futures:
+                # A caller that went away while waiting has cancelled its future.
+                if not future.done():
+                    future.set_result(users.get(email))
+
+
+user_loader = UserLoader()
@@ -0,0 +1,124 @@
+"""
+Job worker entry point.
+
+Runs the jobs the web tier enqueues (see ``src.services.queue``)::
+
+    python -m src.worker --concurrency 8
+    python -m src.worker --stats          # print queue depth, per-type metrics and dead letters
+
+Each process runs up to ``--concurrency`` jobs at a time and can be scaled out by starting more
+processes. On SIGTERM/SIGINT the worker stops taking new jobs and finishes the running ones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+
+from src.conf.config import config
+from src.database.db import sessionmanager
+from src.database.redis_client import create_redis, redismanager
+from src.services.queue import HANDLERS, JobQueue, job_queue
+
+POLL_MS = 1000
+CLAIM_INTERVAL = 30
+
+
+class Worker:
+    """
+    Consumes the job queue with a bounded number of concurrently running jobs.
+    """
+
+    def __init__(self, queue: JobQueue = job_queue, concurrency: int | None = None, name: str | None = None):
+        self.queue = queue
+        self.concurrency = concurrency or config.JOB_WORKER_CONCURRENCY
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self._running: set[asyncio.Task] = set()
+        self._claimed_at = 0.0
+
+    async def _process(self, message_id: str, job: dict) -> None:
+        handler = HANDLERS.get(job["type"])
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"Unknown job type {job['type']!r}")
+            await asyncio.wait_for(handler(**job["args"]), config.JOB_TIMEOUT)
+        except Exception as err:
+            retried = await self.queue.fail(message_id, job, err, retry=handler is not None)
+            print(f"Job {job['type']} {job['id']} failed (attempt {job['attempt'] + 1}, "
+                  f"{'will retry' if retried else 'dead-lettered'}): {err!r}")
+        else:
+            await self.queue.complete(message_id, job, time.perf_counter() - started)
+
+    async def _next_jobs(self, count: int) -> list[tuple[str, dict]]:
+        await self.queue.promote()
+        if time.monotonic() - self._claimed_at > CLAIM_INTERVAL:
+            self._claimed_at = time.monotonic()
+            stale = await self.queue.claim_stale(self.name, count)
+            if stale:
+                return stale
+        return await self.queue.read(self.name, count, POLL_MS)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Process jobs until ``stop`` is set, then wait for the running jobs to finish.
+        """
+        await self.queue.ensure_group()
+        while not stop.is_set():
+            free = self.concurrency - len(self._running)
+            if free == 0:
+                await asyncio.wait(self._running, timeout=POLL_MS / 1000, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            started = time.monotonic()
+            try:
+                jobs = await self._next_jobs(free)
+            except Exception as err:
+                print(f"Job queue unavailable, retrying: {err}")
+                await asyncio.sleep(POLL_MS / 1000)
+                continue
+            if not jobs:
+                # Clients that do not block on XREADGROUP (e.g. fakeredis) would otherwise spin.
+                await asyncio.sleep(max(0.0, POLL_MS / 1000 - (time.monotonic() - started)))
+            for message_id, job in jobs:
+                running = asyncio.create_task(self._process(message_id, job))
+                self._running.add(running)
+                running.add_done_callback(self._running.discard)
+        if self._running:
+            await asyncio.wait(self._running)
+
+
+async def print_stats(queue: JobQueue) -> None:
+    print(json.dumps({"depth": await queue.depth(), "metrics": await queue.metrics(),
+                      "dead_letters": await queue.dead_letters(10)}, indent=2))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=config.JOB_WORKER_CONCURRENCY,
+                        help="number of jobs run at the same time by this process")
+    parser.add_argument("--stats", action="store_true", help="print queue statistics and exit")
+    args = parser.parse_args()
+
+    import src.services.tasks  # noqa: F401  registers the job handlers
+
+    redismanager.init(create_redis())
+    try:
+        if args.stats:
+            await print_stats(job_queue)
+            return
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        sessionmanager.init()
+        print(f"Worker started with concurrency {args.concurrency}")
+        await Worker(job_queue, args.concurrency).run(stop)
+    finally:
+        await redismanager.close()
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
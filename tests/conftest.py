@@ -10,7 +10,7 @@ from main import app
 from src.entity.models import Base, User
 from src.database.db import get_db
 from src.services.auth import auth_service
-from fastapi_limiter.depends import RateLimiter
+from src.services.rate_limit import RateLimiter
 from src.conf import messages
 
 
@@ -1,4 +1,4 @@
-from unittest.mock import Mock, AsyncMock
+from unittest.mock import AsyncMock
 from src.entity.models import User
 from src.services.auth import auth_service
 from conftest import disable_ratelimit
@@ -7,6 +7,8 @@ from conftest import test_user
 import pytest
 from tests.conftest import TestingSessionLocal
 from sqlalchemy import select
+from redis.exceptions import ConnectionError
+from src.services.queue import HANDLERS
 
 user_data = {"username": "agent007", "email": "agent007@gmail.com", "password": "12345678"}
 refresh_user_data = {"username": "refresh_user", "email": "refresh@example.com", "password": "refreshpassword"}
@@ -17,8 +19,8 @@ disable_ratelimit()
 
 
 def test_signup(client, monkeypatch):
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+    mock_enqueue = AsyncMock()
+    monkeypatch.setattr("src.routes.auth.job_queue.enqueue", mock_enqueue)
     response = client.post("api/auth/signup", json=user_data)
     assert response.status_code == 201, response.text
     data = response.json()
@@ -26,17 +28,34 @@ def test_signup(client, monkeypatch):
     assert data["email"] == user_data["email"]
     assert "password" not in data
     assert "avatar" in data
+    jobs = {call.args[0]: call.kwargs for call in mock_enqueue.await_args_list}
+    assert jobs["send_email"]["email"] == user_data["email"]
+    assert jobs["upload_default_avatar"] == {"email": user_data["email"]}
+
+
+def test_signup_without_redis_runs_jobs_in_process(client, monkeypatch):
+    monkeypatch.setattr("src.routes.auth.job_queue.enqueue", AsyncMock(side_effect=ConnectionError("redis down")))
+    send_email, upload_avatar = AsyncMock(), AsyncMock()
+    monkeypatch.setitem(HANDLERS, "send_email", send_email)
+    monkeypatch.setitem(HANDLERS, "upload_default_avatar", upload_avatar)
+
+    response = client.post("api/auth/signup", json={"username": "no_redis", "email": "no_redis@example.com",
+                                                    "password": "12345678"})
+
+    assert response.status_code == 201, response.text
+    assert send_email.await_args.kwargs["email"] == "no_redis@example.com"
+    upload_avatar.assert_awaited_once_with(email="no_redis@example.com")
 
 
 @pytest.mark.asyncio
 async def test_repeat_signup(client, db_session: AsyncSession, monkeypatch):
-    mock_send_email = Mock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+    mock_enqueue = AsyncMock()
+    monkeypatch.setattr("src.routes.auth.job_queue.enqueue", mock_enqueue)
 
     response = client.post("api/auth/signup", json=test_user)
     assert response.status_code == 409, response.text
     assert response.json()["detail"] == "Account already exists"
-    assert not mock_send_email.called
+    assert not mock_enqueue.called
 
 
 @pytest.mark.asyncio
@@ -148,9 +167,9 @@ async def test_confirmed_email_essential(client, db_session: AsyncSession, monke
 
 @pytest.mark.asyncio
 async def test_request_email_essential(client, db_session: AsyncSession, monkeypatch):
-    mock_send_email = Mock()
+    mock_enqueue = AsyncMock()
 
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+    monkeypatch.setattr("src.routes.auth.job_queue.enqueue", mock_enqueue)
 
     password_hash = auth_service.get_password_hash(request_user_data["password"])
 
@@ -169,4 +188,5 @@ async def test_request_email_essential(client, db_session: AsyncSession, monkeyp
     assert response.status_code == 200, response.text
     assert response.json()["message"] == "Check your email for confirmation."
 
-    assert mock_send_email.called
+    mock_enqueue.assert_awaited_once_with("send_email", email=user.email, username=user.username,
+                                          host="http://testserver/")
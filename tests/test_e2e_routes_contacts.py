@@ -0,0 +1,210 @@
+import json
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+
+from conftest import disable_ratelimit, engine
+from src.conf.config import get_config
+from src.database.redis_client import redismanager
+from src.services import tasks
+from src.services.queue import STREAM
+
+disable_ratelimit()
+
+
+@pytest.fixture()
+def no_sync_window(monkeypatch):
+    monkeypatch.setattr(get_config(), "SYNC_SAFETY_WINDOW", 0)
+
+
+def create(client, headers, email):
+    response = client.post("/api/contacts/?r=1", headers=headers,
+                           json={"first_name": "Sync", "last_name": "Test", "email": email})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_changes_since_token(client, get_token, no_sync_window):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    first = create(client, headers, "sync1@example.com")
+    second = create(client, headers, "sync2@example.com")
+
+    response = client.get("/api/contacts/changes?r=1", headers=headers)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert {first["id"], second["id"]} <= {c["id"] for c in data["changes"]}
+    assert data["has_more"] is False
+    token = data["next_token"]
+
+    response = client.get(f"/api/contacts/changes?r=1&since={token}", headers=headers)
+    assert response.json()["changes"] == []
+
+    assert client.delete(f"/api/contacts/{first['id']}?r=1", headers=headers).status_code == 204
+    third = create(client, headers, "sync3@example.com")
+
+    data = client.get(f"/api/contacts/changes?r=1&since={token}", headers=headers).json()
+    assert [c["id"] for c in data["changes"]] == [third["id"]]
+    assert data["deleted"] == [first["id"]]
+
+
+def test_changes_paginates(client, get_token, no_sync_window):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    data = client.get("/api/contacts/changes?r=1&limit=1", headers=headers).json()
+    assert len(data["changes"]) == 1
+    assert data["has_more"] is True
+
+
+def test_changes_rejects_invalid_token(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.get("/api/contacts/changes?r=1&since=garbage", headers=headers)
+    assert response.status_code == 400, response.text
+
+
+def test_merge_contacts(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    primary = create(client, headers, "merge1@example.com")
+    duplicate = client.post("/api/contacts/?r=1", headers=headers,
+                            json={"first_name": "Sync", "last_name": "Test", "email": "merge2@example.com",
+                                  "phone": "+380501234567"}).json()
+
+    response = client.post("/api/contacts/merge?r=1", headers=headers,
+                           json={"primary_id": primary["id"], "duplicate_ids": [duplicate["id"]]})
+    assert response.status_code == 200, response.text
+    assert response.json()["phone"] == "+380501234567"
+    assert client.get(f"/api/contacts/contact_id/{duplicate['id']}?r=1", headers=headers).status_code == 404
+
+    response = client.post("/api/contacts/merge?r=1", headers=headers,
+                           json={"primary_id": primary["id"], "duplicate_ids": [duplicate["id"]]})
+    assert response.status_code == 404, response.text
+
+
+def test_get_contacts_by_phone(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    contact = client.post("/api/contacts/?r=1", headers=headers,
+                          json={"first_name": "Caller", "last_name": "Id", "email": "caller@example.com",
+                                "phone": "+380 (67) 765-43-21"}).json()
+    assert contact["phone_normalized"] == "+380677654321"
+
+    response = client.get("/api/contacts/phone/0677654321?r=1", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [c["id"] for c in response.json()] == [contact["id"]]
+
+    response = client.get("/api/contacts/phone/654321?r=1&match=suffix", headers=headers)
+    assert [c["id"] for c in response.json()] == [contact["id"]]
+
+    assert client.get("/api/contacts/phone/0677654320?r=1", headers=headers).json() == []
+    assert client.get("/api/contacts/phone/21?r=1&match=suffix", headers=headers).json() == []
+    assert client.get("/api/contacts/phone/21?r=1&match=prefix", headers=headers).status_code == 422
+
+
+def test_contact_stats_cached_and_invalidated(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+    try:
+        before = client.get("/api/contacts/stats?r=1", headers=headers)
+        assert before.status_code == 200, before.text
+        before = before.json()
+        assert len(before["added_per_week"]) == get_config().STATS_WEEKS
+        assert client.get("/api/contacts/stats?r=1", headers=headers).json() == before
+
+        client.post("/api/contacts/?r=1", headers=headers,
+                    json={"first_name": "Stats", "last_name": "Test", "email": "stats@example.com",
+                          "phone": "0501112233", "birthday": "1990-03-15"})
+        after = client.get("/api/contacts/stats?r=1", headers=headers).json()
+    finally:
+        redismanager._client = None
+
+    assert after["total"] == before["total"] + 1
+    assert after["with_phone"] == before["with_phone"] + 1
+    assert after["with_birthday"] == before["with_birthday"] + 1
+    assert after["birthdays_by_month"]["3"] == before["birthdays_by_month"]["3"] + 1
+    assert after["added_per_week"][-1]["count"] == before["added_per_week"][-1]["count"] + 1
+    assert 0 < after["phone_completeness"] <= 1
+
+
+class DownRedis(fakeredis.FakeAsyncRedis):
+    async def execute_command(self, *args, **options):
+        raise ConnectionError("Redis is down")
+
+
+def test_cached_routes_fall_back_to_database_when_redis_is_down(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    redismanager.init(DownRedis(decode_responses=True))
+    try:
+        stats = client.get("/api/contacts/stats?r=1", headers=headers)
+        birthdays = client.get("/api/contacts/upcoming-birthdays?r=1", headers=headers)
+    finally:
+        redismanager._client = None
+
+    assert stats.status_code == 200, stats.text
+    assert stats.json()["total"] >= 0
+    assert birthdays.status_code == 200, birthdays.text
+
+
+def test_duplicate_scan_is_queued_for_a_worker(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    server = fakeredis.FakeServer()
+    redismanager.init(fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    try:
+        response = client.post("/api/contacts/duplicates/scan?r=1", headers=headers)
+    finally:
+        redismanager._client = None
+    entries = fakeredis.FakeRedis(server=server, decode_responses=True).xrange(STREAM)
+
+    assert response.status_code == 202, response.text
+    assert [json.loads(fields["job"])["type"] for _, fields in entries] == [tasks.SCAN_DUPLICATES]
+
+
+def test_contact_statements_filter_by_user_id(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        first = create(client, headers, "pruning1@example.com")
+        second = create(client, headers, "pruning2@example.com")
+        client.put(f"/api/contacts/{first['id']}?r=1", headers=headers,
+                   json={"first_name": "Pruned", "last_name": "Test", "email": "pruning1@example.com"})
+        client.post("/api/contacts/merge?r=1", headers=headers,
+                    json={"primary_id": first["id"], "duplicate_ids": [second["id"]]})
+        client.delete(f"/api/contacts/{first['id']}?r=1", headers=headers)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    touching = [s for s in statements if s.startswith(("SELECT contacts", "UPDATE contacts", "DELETE FROM contacts"))]
+    assert {s.split()[0] for s in touching} == {"SELECT", "UPDATE", "DELETE"}
+    for statement in touching:
+        assert "user_id" in statement.split(" WHERE ", 1)[1], statement
+
+
+def test_server_timing_header(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    create(client, headers, "timing@example.com")
+
+    response = client.get("/api/contacts/?r=1", headers=headers)
+    assert response.status_code == 200, response.text
+    metrics = {metric.split(";")[0]: metric for metric in response.headers["server-timing"].split(", ")}
+    assert {"auth", "db", "hydrate", "endpoint", "serialize", "total"} <= set(metrics)
+    assert "calls" in metrics["db"]
+
+    response = client.get("/api/contacts/?r=1", headers={"Authorization": "Bearer invalid"})
+    assert response.status_code == 401
+    assert "total;dur=" in response.headers["server-timing"]
+
+
+def test_total_count_header(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    total = int(client.get("/api/contacts/?r=1&limit=1", headers=headers).headers["x-total-count"])
+
+    contact = create(client, headers, "counted@example.com")
+    response = client.get("/api/contacts/?r=1&limit=1", headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 1
+    assert response.headers["x-total-count"] == str(total + 1)
+
+    assert client.delete(f"/api/contacts/{contact['id']}?r=1", headers=headers).status_code == 204
+    assert client.get("/api/contacts/?r=1", headers=headers).headers["x-total-count"] == str(total)
@@ -0,0 +1,22 @@
+from unittest.mock import patch
+
+from src.services.health import health_checker
+
+
+def test_livez(client):
+    response = client.get("/livez")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_reports_cached_result(client):
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+    report = {"ready": True, "age": 0.5, "checks": {"redis": {"ok": True, "ms": 0.3}}}
+    with patch.object(health_checker, "report", return_value=report) as cached:
+        response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json() == report
+    cached.assert_called_once_with()
@@ -0,0 +1,46 @@
+import io
+import shutil
+from pathlib import Path
+
+from PIL import Image
+
+from conftest import disable_ratelimit
+from src.conf.config import get_config
+
+disable_ratelimit()
+
+
+def test_update_avatar_with_local_pipeline(client, get_token, monkeypatch):
+    monkeypatch.setattr(get_config(), "AVATAR_PIPELINE", True)
+    headers = {"Authorization": f"Bearer {get_token}"}
+    upload = io.BytesIO()
+    Image.new("RGB", (320, 200), (10, 200, 30)).save(upload, "JPEG")
+
+    response = client.patch("/api/users/avatar", headers=headers,
+                            files={"file": ("me.jpg", upload.getvalue(), "image/jpeg")})
+    assert response.status_code == 200, response.text
+    url = response.json()["avatar"]
+    try:
+        assert url.startswith("/static/avatars/") and url.endswith("/250.jpg")
+        image = client.get(url)
+        assert image.status_code == 200
+        assert image.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert client.get(url.replace("250.jpg", "64.webp")).status_code == 200
+    finally:
+        shutil.rmtree(Path("src") / Path(url).parent.relative_to("/"), ignore_errors=True)
+
+    response = client.patch("/api/users/avatar", headers=headers,
+                            files={"file": ("me.jpg", b"not an image", "image/jpeg")})
+    assert response.status_code == 400, response.text
+
+
+def test_update_avatar_rejects_large_uploads(client, get_token, monkeypatch):
+    monkeypatch.setattr(get_config(), "UPLOAD_MAX_SIZE", 1000)
+    headers = {"Authorization": f"Bearer {get_token}"}
+    content = b"\x89PNG\r\n\x1a\n" + b"\x00" * 50_000
+
+    response = client.patch("/api/users/avatar", headers=headers, files={"file": ("me.png", content, "image/png")})
+    assert response.status_code == 413, response.text
+
+    response = client.patch("/api/users/avatar", headers=headers, data={"note": "no file"})
+    assert response.status_code == 400, response.text
@@ -0,0 +1,87 @@
+from collections import Counter
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from src.database.db import DataBaseSessionManager
+from src.database.shards import HashRing, ShardRouter, prepare_shards
+from src.entity.models import Base, Contact, User, UserShard
+from src.jobs import rebalance_shards
+
+USERS = 30
+
+
+def test_ring_is_stable_and_moves_few_users():
+    before = HashRing([0, 1, 2])
+    after = HashRing([0, 1, 2, 3])
+    placement = {user_id: before.shard_for(user_id) for user_id in range(10000)}
+
+    reordered = HashRing([2, 1, 0])
+    assert placement == {user_id: reordered.shard_for(user_id) for user_id in range(10000)}
+    assert min(Counter(placement.values()).values()) > 2500
+    moved = [user_id for user_id in placement if after.shard_for(user_id) != placement[user_id]]
+    assert all(after.shard_for(user_id) == 3 for user_id in moved)
+    assert 1500 < len(moved) < 3500
+
+
+@pytest_asyncio.fixture()
+async def databases(tmp_path):
+    urls = {shard: f"sqlite+aiosqlite:///{tmp_path}/shard{shard}.db" for shard in range(3)}
+    single = DataBaseSessionManager(urls[0], shard_urls={})
+    async with single.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with single.session() as db:
+        db.add_all([User(id=user_id, username=f"u{user_id}", email=f"u{user_id}@example.com", password="x")
+                    for user_id in range(1, USERS + 1)])
+        db.add_all([Contact(first_name="C", last_name=str(user_id), email=f"c{user_id}@example.com", user_id=user_id)
+                    for user_id in range(1, USERS + 1)])
+        await db.commit()
+    sharded = DataBaseSessionManager(urls[0], shard_urls={1: urls[1], 2: urls[2]})
+    yield single, sharded
+    await single.close()
+    await sharded.close()
+
+
+async def contacts_on(manager, shard):
+    async with manager.session(shard) as db:
+        return set((await db.execute(select(Contact.user_id))).scalars())
+
+
+@pytest.mark.asyncio
+async def test_pin_then_rebalance_moves_users_to_new_shards(databases):
+    single, sharded = databases
+    assert await rebalance_shards.pin(ShardRouter(single, ttl=0), batch_size=7) == USERS
+    await prepare_shards(sharded)
+    router = ShardRouter(sharded, ttl=0)
+
+    async with sharded.session() as db:
+        located = await router.locate_many(list(range(1, USERS + 1)), db)
+    assert {shard for shard, _ in located.values()} == {0}
+
+    moved = await rebalance_shards.rebalance(router, batch_size=7)
+
+    expected = {shard: {u for u in range(1, USERS + 1) if router.ring.shard_for(u) == shard} for shard in range(3)}
+    assert moved == USERS - len(expected[0])
+    assert all(expected.values())
+    for shard in range(3):
+        assert await contacts_on(sharded, shard) == expected[shard]
+    async with sharded.session() as db:
+        assert (await db.execute(select(func.count()).select_from(UserShard))).scalar_one() == 0
+
+
+@pytest.mark.asyncio
+async def test_move_keeps_directory_override(databases):
+    _, sharded = databases
+    await prepare_shards(sharded)
+    router = ShardRouter(sharded, ttl=0)
+    user_id = next(u for u in range(1, USERS + 1) if router.ring.shard_for(u) == 0)
+
+    await rebalance_shards.move_users(router, {user_id: 2}, keep_override=True)
+
+    async with sharded.session() as db:
+        assert await router.locate(user_id, db) == (2, False)
+    async with router.session_for(user_id) as db:
+        contacts = (await db.execute(select(Contact).where(Contact.user_id == user_id))).scalars().all()
+    assert [c.email for c in contacts] == [f"c{user_id}@example.com"]
+    assert user_id not in await contacts_on(sharded, 0)
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from src.conf.config import get_config
+from src.database.db import DataBaseSessionManager, connect_args
+from src.database.warmup import warm_up
+from src.entity.models import Base
+
+
+@pytest_asyncio.fixture()
+async def manager(tmp_path):
+    manager = DataBaseSessionManager(f"sqlite+aiosqlite:///{tmp_path}/warmup.db", shard_urls={})
+    async with manager.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await manager.engine.dispose()
+    yield manager
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_connections_and_compiles_statements(manager):
+    await warm_up(manager, connections=3)
+
+    pool = manager.engine.pool
+    assert pool.checkedin() == 3
+    assert pool.checkedout() == 0
+    assert len(manager.engine.sync_engine._compiled_cache) >= 3
+
+
+@pytest.mark.asyncio
+async def test_warm_up_never_fails_startup(tmp_path):
+    manager = DataBaseSessionManager(f"sqlite+aiosqlite:///{tmp_path}/missing/db.sqlite", shard_urls={})
+    try:
+        await warm_up(manager, connections=2)
+    finally:
+        await manager.close()
+
+
+def test_connect_args_for_pgbouncer():
+    url = "postgresql+asyncpg://u:p@localhost/db"
+    with patch.object(get_config(), "DB_STATEMENT_CACHE_SIZE", 500):
+        assert connect_args(url) == {"statement_cache_size": 500, "prepared_statement_cache_size": 500}
+    with patch.object(get_config(), "DB_PGBOUNCER", True):
+        args = connect_args(url)
+    assert args["statement_cache_size"] == args["prepared_statement_cache_size"] == 0
+    assert args["prepared_statement_name_func"]() != args["prepared_statement_name_func"]()
+    assert connect_args("sqlite+aiosqlite:///x.db") == {}
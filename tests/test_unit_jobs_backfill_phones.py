@@ -0,0 +1,40 @@
+import contextlib
+
+import pytest
+from sqlalchemy import select
+
+from src.entity.models import Contact, User
+from src.jobs import backfill_phones
+from tests.conftest import TestingSessionLocal, test_user
+
+
+class TestSessionManager:
+    shards = [0]
+
+    @contextlib.asynccontextmanager
+    async def session(self, shard=0):
+        async with TestingSessionLocal() as session:
+            yield session
+
+
+@pytest.mark.asyncio
+async def test_backfill_normalizes_existing_phones(monkeypatch):
+    async with TestingSessionLocal() as session:
+        user = (await session.execute(select(User).where(User.email == test_user["email"]))).scalar_one()
+        session.add_all([
+            Contact(first_name="Old", last_name="Phone", email="old1@example.com", phone="050 111 2233",
+                    user_id=user.id),
+            Contact(first_name="Old", last_name="Phone", email="old2@example.com", phone="n/a", user_id=user.id),
+        ])
+        await session.commit()
+
+    monkeypatch.setattr(backfill_phones, "sessionmanager", TestSessionManager())
+    last_id = await backfill_phones.run_backfill(0, batch_size=1)
+
+    async with TestingSessionLocal() as session:
+        rows = (await session.execute(
+            select(Contact.email, Contact.phone_normalized, Contact.phone_reversed)
+            .where(Contact.email.in_(["old1@example.com", "old2@example.com"])).order_by(Contact.email)
+        )).all()
+        assert last_id == (await session.execute(select(Contact.id).order_by(Contact.id.desc()))).scalars().first()
+    assert rows == [("old1@example.com", "+380501112233", "332211105083"), ("old2@example.com", None, None)]
@@ -0,0 +1,107 @@
+import contextlib
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import pytest
+from sqlalchemy import select
+
+from src.database.redis_client import redismanager
+from src.entity.models import Contact, User
+from src.jobs import birthday_digest
+from src.services import cache
+from tests.conftest import TestingSessionLocal, test_user
+
+
+class TestSessionManager:
+    shards = [0]
+
+    @contextlib.asynccontextmanager
+    async def session(self, shard=0):
+        async with TestingSessionLocal() as session:
+            yield session
+
+
+@pytest.fixture()
+def redis_client():
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    redismanager.init(client)
+    yield client
+    redismanager._client = None
+
+
+@pytest.mark.asyncio
+async def test_digest_caches_birthdays_and_resumes(redis_client, monkeypatch):
+    today = date.today()
+    async with TestingSessionLocal() as session:
+        user = (await session.execute(select(User).where(User.email == test_user["email"]))).scalar_one()
+        session.add_all([
+            Contact(first_name="Soon", last_name="Birthday", email="soon@example.com",
+                    birthday=(today + timedelta(days=2)).replace(year=1990), user_id=user.id),
+            Contact(first_name="Far", last_name="Birthday", email="far@example.com",
+                    birthday=(today + timedelta(days=30)).replace(year=1990), user_id=user.id),
+        ])
+        await session.commit()
+        user_id = user.id
+
+    monkeypatch.setattr(birthday_digest, "sessionmanager", TestSessionManager())
+    with patch("src.jobs.birthday_digest.send_birthday_digest", new_callable=AsyncMock) as mock_send:
+        processed = await birthday_digest.run_digest(today, batch_size=1)
+        assert processed >= 1
+        mock_send.assert_awaited_once()
+
+        cached = await cache.get_json(cache.birthdays_key(user_id, today))
+        assert [c["email"] for c in cached] == ["soon@example.com"]
+
+        # A restarted run resumes after the checkpoint and does not resend.
+        assert await birthday_digest.run_digest(today, batch_size=1) == 0
+        await redis_client.delete(birthday_digest.cursor_key(today))
+        await birthday_digest.run_digest(today, batch_size=1)
+        mock_send.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_digest_is_retried(redis_client, monkeypatch):
+    today = date.today()
+    async with TestingSessionLocal() as session:
+        user = (await session.execute(select(User).where(User.email == test_user["email"]))).scalar_one()
+        session.add(Contact(first_name="Retry", last_name="Birthday", email="retry@example.com",
+                            birthday=(today + timedelta(days=1)).replace(year=1991), user_id=user.id))
+        await session.commit()
+        user_id = user.id
+
+    monkeypatch.setattr(birthday_digest, "sessionmanager", TestSessionManager())
+    with patch("src.jobs.birthday_digest.send_birthday_digest",
+               new_callable=AsyncMock, side_effect=ConnectionError("smtp down")):
+        await birthday_digest.run_digest(today, batch_size=10)
+    assert await redis_client.hexists(birthday_digest.failed_key(today), user_id)
+    assert not await redis_client.sismember(birthday_digest.sent_key(today), user_id)
+
+    # The cursor is past the user, but the next run retries the failed digest.
+    with patch("src.jobs.birthday_digest.send_birthday_digest", new_callable=AsyncMock) as mock_send:
+        assert await birthday_digest.run_digest(today, batch_size=10) == 0
+    assert mock_send.await_args.args[0] == test_user["email"]
+    assert not await redis_client.exists(birthday_digest.failed_key(today))
+    assert await redis_client.sismember(birthday_digest.sent_key(today), user_id)
+
+
+@pytest.mark.asyncio
+async def test_digest_read_before_a_change_is_not_cached(redis_client, monkeypatch):
+    today = date.today()
+    async with TestingSessionLocal() as session:
+        user = (await session.execute(select(User).where(User.email == test_user["email"]))).scalar_one()
+        user_id = user.id
+    read = birthday_digest.repository_contacts.get_upcoming_birthdays_for_users
+
+    async def read_then_write(user_ids, db, day):
+        upcoming = await read(user_ids, db, day)
+        # a contact is created while the job holds the old list
+        await cache.invalidate_user(user_id, cache.birthdays_key(user_id, day))
+        return upcoming
+
+    monkeypatch.setattr(birthday_digest, "sessionmanager", TestSessionManager())
+    monkeypatch.setattr(birthday_digest.repository_contacts, "get_upcoming_birthdays_for_users", read_then_write)
+    with patch("src.jobs.birthday_digest.send_birthday_digest", new_callable=AsyncMock):
+        await birthday_digest.run_digest(today, batch_size=10)
+
+    assert await cache.get_json(cache.birthdays_key(user_id, today)) is None
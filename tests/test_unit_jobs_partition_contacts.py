@@ -0,0 +1,15 @@
+import pytest
+from sqlalchemy import inspect
+
+from src.jobs import partition_contacts
+from tests.conftest import engine
+
+
+@pytest.mark.asyncio
+async def test_partition_skips_databases_other_than_postgres():
+    assert not await partition_contacts.run_partition(engine, 4)
+
+    async with engine.connect() as conn:
+        tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
+    assert "contacts" in tables
+    assert not any(table.startswith("contacts_p") for table in tables)
@@ -0,0 +1,45 @@
+import contextlib
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from src.entity.models import Contact, ContactCount, User
+from src.jobs import reconcile_contact_counts
+from tests.conftest import TestingSessionLocal, test_user
+
+
+class TestSessionManager:
+    shards = [0]
+
+    @contextlib.asynccontextmanager
+    async def session(self, shard=0):
+        async with TestingSessionLocal() as session:
+            yield session
+
+
+async def stored_counts() -> dict[int, int]:
+    async with TestingSessionLocal() as session:
+        return dict((await session.execute(select(ContactCount.user_id, ContactCount.count))).all())
+
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drifted_and_missing_counts(monkeypatch):
+    async with TestingSessionLocal() as session:
+        owner = (await session.execute(select(User).where(User.email == test_user["email"]))).scalar_one()
+        other = User(username="other", email="counts-other@example.com", password="x")
+        gone = User(username="gone", email="counts-gone@example.com", password="x")
+        session.add_all([other, gone])
+        await session.flush()
+        session.add_all([Contact(first_name="C", last_name=str(i), email=f"count{i}@example.com",
+                                 user_id=owner.id if i < 3 else other.id) for i in range(5)])
+        await session.execute(delete(ContactCount))
+        session.add_all([ContactCount(user_id=owner.id, count=7), ContactCount(user_id=gone.id, count=2)])
+        await session.commit()
+        actual = dict((await session.execute(select(Contact.user_id, func.count()).group_by(Contact.user_id))).all())
+
+    monkeypatch.setattr(reconcile_contact_counts, "sessionmanager", TestSessionManager())
+    repaired = await reconcile_contact_counts.run_reconcile(0, batch_size=1)
+
+    assert repaired == 3
+    assert await stored_counts() == {**actual, gone.id: 0}
+    assert await reconcile_contact_counts.run_reconcile(0, batch_size=10) == 0
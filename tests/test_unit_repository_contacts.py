@@ -1,12 +1,14 @@
 import unittest
-from unittest.mock import AsyncMock, MagicMock
-from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import date, datetime, timedelta
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.entity.models import Contact, User
 from src.schemas.contact import ContactCreate, ContactUpdate
 from src.repository.contacts import get_contact_by_id, get_contact_by_email, get_contacts, get_contacts_by_last_name, \
-    get_contacts_by_first_name, get_upcoming_birthdays, update_contact, delete_contact, create_contact
+    get_contacts_by_first_name, get_upcoming_birthdays, update_contact, delete_contact, create_contact, \
+    encode_sync_token, get_changes
 
 
 class TestAsyncContactsRepository(unittest.IsolatedAsyncioTestCase):
@@ -83,6 +85,13 @@ class TestAsyncContactsRepository(unittest.IsolatedAsyncioTestCase):
         result = await create_contact(body, self.session, self.User)
         self.assertEqual(result.first_name, body.first_name)
 
+    async def test_write_succeeds_when_cache_invalidation_fails(self):
+        body = ContactCreate(first_name="Jane", last_name="Smith", email="jane@example.com")
+        with patch("src.repository.contacts.cache.invalidate_user", AsyncMock(side_effect=ConnectionError("down"))):
+            result = await create_contact(body, self.session, self.User)
+        self.assertEqual(result.first_name, body.first_name)
+        self.session.commit.assert_awaited()
+
     async def test_update_contact(self):
         contact = Contact(id=1, first_name="Old", user=self.User)
         update_data = ContactUpdate(first_name="New", last_name="Smith", email="old@example.com")
@@ -122,3 +131,24 @@ class TestAsyncContactsRepository(unittest.IsolatedAsyncioTestCase):
 
         result = await get_upcoming_birthdays(self.session, self.User)
         self.assertIn(contact, result)
+
+    async def test_get_changes_on_postgres_binds_no_datetime(self):
+        self.session.bind = MagicMock()
+        self.session.bind.dialect.name = "postgresql"
+        mocked_result = MagicMock()
+        mocked_result.scalars.return_value.all.return_value = []
+        mocked_result.all.return_value = []
+        self.session.execute.return_value = mocked_result
+
+        token = encode_sync_token(datetime(2024, 1, 1, 12, 0), 5, 7)
+        result = await get_changes(token, 10, self.session, self.User)
+
+        self.assertEqual(result["changes"], [])
+        dialect = postgresql.asyncpg.dialect()
+        for call in self.session.execute.call_args_list:
+            compiled = call.args[0].compile(dialect=dialect)
+            self.assertIn("LOCALTIMESTAMP", str(compiled))
+            # asyncpg rejects timezone-aware values bound against the naive timestamp columns
+            for value in compiled.params.values():
+                self.assertFalse(isinstance(value, datetime) and value.tzinfo is not None)
+        self.assertEqual(self.session.execute.await_count, 2)
@@ -1,10 +1,11 @@
 import unittest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.entity.models import User
 from src.schemas.user import UserSchema
-from src.repository.users import get_user_by_email, create_user, update_token, confirmed_email, update_avatar
+from src.repository.users import (USERS_BY_EMAILS, get_user_by_email, get_users_by_emails, create_user, update_token,
+                                  confirmed_email, update_avatar)
 
 
 class TestAsyncUserRepository(unittest.IsolatedAsyncioTestCase):
@@ -21,10 +22,7 @@ class TestAsyncUserRepository(unittest.IsolatedAsyncioTestCase):
         result = await get_user_by_email('test@example.com', self.session)
         self.assertEqual(result, self.user)
 
-    @patch("src.repository.users.upload_avatar", new_callable=AsyncMock)
-    async def test_create_user(self, mock_upload_avatar):
-        mock_upload_avatar.return_value = "http://mocked.avatar.url"
-
+    async def test_create_user(self):
         user_data = UserSchema(
             username='newuser',
             email='newuser@example.com',
@@ -41,7 +39,7 @@ class TestAsyncUserRepository(unittest.IsolatedAsyncioTestCase):
         self.session.commit.assert_called_once()
         self.session.refresh.assert_called_once()
         self.assertEqual(result.username, user_data.username)
-        self.assertEqual(result.avatar, "http://mocked.avatar.url")
+        self.assertIsNone(result.avatar)
 
     async def test_update_token(self):
         token = "new_refresh_token"
@@ -71,3 +69,17 @@ class TestAsyncUserRepository(unittest.IsolatedAsyncioTestCase):
         self.session.commit.assert_called_once()
         self.session.refresh.assert_called_once_with(self.user)
         self.assertEqual(result, self.user)
+
+    async def test_get_users_by_emails(self):
+        other = User(id=2, username='other', email='other@example.com', password='hashed')
+        mocked_result = MagicMock()
+        mocked_result.scalars.return_value = [self.user, other]
+        self.session.execute.return_value = mocked_result
+        self.session.get_bind = MagicMock()
+        self.session.get_bind.return_value.dialect.name = "postgresql"
+
+        result = await get_users_by_emails(['test@example.com', 'other@example.com', 'missing@example.com'],
+                                           self.session)
+
+        self.assertEqual(result, {'test@example.com': self.user, 'other@example.com': other})
+        self.assertIs(self.session.execute.call_args.args[0], USERS_BY_EMAILS["postgresql"])
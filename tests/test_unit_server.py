@@ -0,0 +1,15 @@
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from src import server
+from src.conf.config import get_config
+
+
+@pytest.mark.parametrize("json_access_log", [False, True])
+def test_exactly_one_access_log_is_on(json_access_log):
+    with patch.object(get_config(), "ACCESS_LOG", json_access_log), \
+            patch.object(sys, "argv", ["src.server"]), patch("uvicorn.run") as run:
+        server.main()
+    assert run.call_args.kwargs["access_log"] is not json_access_log
@@ -0,0 +1,175 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.conf.config import config
+from src.services.admission import (DEFAULT_POLICY, HIGH, LOW, NORMAL, ROUTE_POLICIES, AdmissionController,
+                                    AdmissionMiddleware, Policy, Rejected, pool_timeout_handler)
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+
+    async def queued(self, controller: AdmissionController, route: str, policy: Policy) -> asyncio.Task:
+        task = asyncio.create_task(controller.acquire(route, policy))
+        await asyncio.sleep(0)
+        self.assertFalse(task.done())
+        return task
+
+    async def test_queues_beyond_limit(self):
+        controller = AdmissionController(limit=2, max_queue=10, queue_timeout=1)
+        await controller.acquire("/a", Policy())
+        await controller.acquire("/a", Policy())
+        waiting = await self.queued(controller, "/a", Policy())
+
+        controller.release("/a", Policy(), None)
+        await asyncio.wait_for(waiting, 1)
+        self.assertEqual(controller.active, 2)
+
+    async def test_higher_priority_goes_first(self):
+        controller = AdmissionController(limit=1, max_queue=10, queue_timeout=1)
+        await controller.acquire("/a", Policy())
+        low = await self.queued(controller, "/low", Policy(NORMAL))
+        high = await self.queued(controller, "/high", Policy(HIGH))
+
+        controller.release("/a", Policy(), None)
+        await asyncio.wait_for(high, 1)
+        self.assertFalse(low.done())
+        controller.release("/high", Policy(HIGH), None)
+        await asyncio.wait_for(low, 1)
+
+    async def test_low_priority_share_and_route_limit(self):
+        controller = AdmissionController(limit=4, max_queue=10, queue_timeout=1)
+        stats = Policy(LOW)
+        with patch.object(config, "ADMISSION_LOW_SHARE", 0.5):
+            await controller.acquire("/stats", stats)
+            await controller.acquire("/stats", stats)
+            low = await self.queued(controller, "/stats", stats)
+            await controller.acquire("/a", Policy(NORMAL))
+
+            limited = Policy(NORMAL, limit=1)
+            await controller.acquire("/export", limited)
+            self.assertEqual(controller.active, 4)
+
+            controller.release("/a", Policy(NORMAL), None)
+            await asyncio.sleep(0)
+            self.assertFalse(low.done())
+            controller.release("/stats", stats, None)
+            await asyncio.wait_for(low, 1)
+            self.assertEqual(controller.low_active, 2)
+
+            export = await self.queued(controller, "/export", limited)
+            self.assertEqual(controller.active, 3)
+            controller.release("/export", limited, None)
+            await asyncio.wait_for(export, 1)
+
+    async def test_queue_budget_and_full_queue(self):
+        controller = AdmissionController(limit=1, max_queue=1, queue_timeout=0.05)
+        await controller.acquire("/a", Policy())
+
+        with self.assertRaises(Rejected):
+            await controller.acquire("/a", Policy())
+        self.assertEqual(controller.stats["timed_out"], 1)
+
+        normal = await self.queued(controller, "/a", Policy(NORMAL))
+        high = await self.queued(controller, "/me", Policy(HIGH))
+        with self.assertRaises(Rejected):
+            await normal
+        with self.assertRaises(Rejected):
+            await controller.acquire("/a", Policy(NORMAL))
+        controller.release("/a", Policy(), None)
+        await asyncio.wait_for(high, 1)
+        self.assertEqual(controller.active, 1)
+
+
+class TestAdmissionMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.release = asyncio.Event()
+
+        async def slow():
+            await self.release.wait()
+            return {"ok": True}
+
+        async def pool_exhausted():
+            raise PoolTimeoutError("QueuePool limit reached")
+
+        app = FastAPI()
+        app.add_api_route("/slow", slow)
+        app.add_api_route("/livez", lambda: {"status": "ok"})
+        app.add_api_route("/pool", pool_exhausted)
+        app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+        app.add_middleware(AdmissionMiddleware, router=app.router,
+                           controller=AdmissionController(limit=1, max_queue=10, queue_timeout=0.05))
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_overload_gets_fast_503(self):
+        first = asyncio.create_task(self.client.get("/slow"))
+        await asyncio.sleep(0.01)
+
+        response = await self.client.get("/slow")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "1")
+        self.assertEqual((await self.client.get("/livez")).status_code, 200)
+
+        self.release.set()
+        self.assertEqual((await first).status_code, 200)
+
+    async def test_pool_timeout_gets_503(self):
+        response = await self.client.get("/pool")
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("retry-after", response.headers)
+
+
+class RecordingController(AdmissionController):
+
+    def __init__(self):
+        super().__init__(limit=10, max_queue=10, queue_timeout=1)
+        self.acquired = []
+
+    async def acquire(self, route: str, policy: Policy) -> None:
+        self.acquired.append((route, policy))
+        await super().acquire(route, policy)
+
+
+class TestAdmissionRoutes(unittest.IsolatedAsyncioTestCase):
+    """
+    Policies resolved against the routes of the real application.
+    """
+
+    async def asyncSetUp(self):
+        from main import app
+
+        async def ok(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        self.controller = RecordingController()
+        middleware = AdmissionMiddleware(ok, router=app.router, controller=self.controller)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_routes_after_a_partial_match_get_their_policy(self):
+        # PUT/DELETE /api/contacts/{contact_id} is declared first and matches these paths partially.
+        await self.client.get("/api/contacts/stats")
+        await self.client.post("/api/contacts/merge")
+        self.assertEqual(self.controller.acquired, [("/api/contacts/stats", ROUTE_POLICIES["/api/contacts/stats"]),
+                                                    ("/api/contacts/merge", ROUTE_POLICIES["/api/contacts/merge"])])
+        self.assertEqual(self.controller.acquired[0][1].priority, LOW)
+
+    async def test_event_stream_is_exempt(self):
+        await self.client.get("/api/contacts/events")
+        self.assertEqual(self.controller.acquired, [])
+        self.assertEqual(self.controller.active, 0)
+
+    async def test_wrong_method_falls_back_to_partial_match(self):
+        await self.client.patch("/api/contacts/5")
+        self.assertEqual(self.controller.acquired, [("/api/contacts/{contact_id}", DEFAULT_POLICY)])
@@ -0,0 +1,47 @@
+import asyncio
+import io
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from PIL import Image
+
+from src.services import avatars
+
+
+def png(size=(400, 300), color=(255, 0, 0, 128)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGBA", size, color).save(out, "PNG")
+    return out.getvalue()
+
+
+class TestAvatars(unittest.TestCase):
+
+    def test_make_variants(self):
+        variants = avatars.make_variants(png())
+        self.assertEqual(sorted(variants), sorted(f"{s}.{e}" for s in avatars.SIZES for e in avatars.FORMATS))
+        for name, content in variants.items():
+            image = Image.open(io.BytesIO(content))
+            size = int(name.split(".")[0])
+            self.assertEqual(image.size, (size, size))
+            self.assertEqual(image.format, avatars.FORMATS[name.split(".")[1]])
+
+    def test_rejects_invalid_images(self):
+        with self.assertRaises(avatars.InvalidImage):
+            avatars.make_variants(b"not an image")
+        with patch.object(avatars, "MAX_PIXELS", 1000), self.assertRaises(avatars.InvalidImage):
+            avatars.make_variants(png())
+
+    def test_store_is_content_addressed(self):
+        with TemporaryDirectory() as tmp, patch.object(avatars, "STATIC_DIR", Path(tmp)), \
+                patch.object(avatars, "make_variants", wraps=avatars.make_variants) as make_variants:
+            first = asyncio.run(avatars.store_avatar(png()))
+            second = asyncio.run(avatars.store_avatar(png()))
+            other = asyncio.run(avatars.store_avatar(png(color=(0, 0, 255, 255))))
+
+            self.assertEqual(first, second)
+            self.assertNotEqual(first, other)
+            self.assertEqual(make_variants.call_count, 2)
+            stored = Path(tmp) / first.removeprefix("/static/")
+            self.assertEqual(len(list(stored.parent.iterdir())), len(avatars.SIZES) * len(avatars.FORMATS))
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+import httpx
+from fastapi import FastAPI
+
+from src.database.redis_client import redismanager
+from src.services.blocklist import (IPS_KEY, SNAPSHOT_KEY, USER_AGENTS_KEY, VERSION_KEY, Blocklist, BlocklistManager,
+                                    BlocklistMiddleware, PrefixSet, publish_snapshot)
+
+
+class TestPrefixSet(unittest.TestCase):
+
+    def test_addresses_and_networks(self):
+        networks = PrefixSet(["203.0.113.7", "10.0.0.0/8", "192.168.1.77/24", "2001:db8::/32", "not an ip"])
+        self.assertEqual(len(networks), 4)
+        self.assertEqual(networks.invalid, 1)
+        self.assertIn("203.0.113.7", networks)
+        self.assertNotIn("203.0.113.8", networks)
+        self.assertIn("10.255.0.1", networks)
+        self.assertNotIn("11.0.0.1", networks)
+        self.assertIn("192.168.1.1", networks)
+        self.assertIn("2001:db8:ffff::1", networks)
+        self.assertNotIn("2001:db9::1", networks)
+
+    def test_ipv4_mapped_addresses(self):
+        self.assertIn("::ffff:10.1.2.3", PrefixSet(["10.0.0.0/8"]))
+        self.assertIn("10.1.2.3", PrefixSet(["::ffff:10.0.0.0/104"]))
+
+    def test_invalid_address_is_not_blocked(self):
+        networks = PrefixSet(["0.0.0.0/0"])
+        self.assertIn("1.2.3.4", networks)
+        self.assertNotIn("testclient", networks)
+        self.assertNotIn("::1", networks)
+
+
+class TestBlocklist(unittest.TestCase):
+
+    def test_user_agents_are_combined(self):
+        blocklist = Blocklist(user_agents=[r"Python-urllib", r"(?i)sqlmap", r"bad[", r"^curl/7\."])
+        self.assertEqual(blocklist.user_agent_count, 3)
+        self.assertTrue(blocklist.blocks(None, "Python-urllib/3.11"))
+        self.assertTrue(blocklist.blocks(None, "SQLMap/1.7"))
+        self.assertTrue(blocklist.blocks(None, "curl/7.88"))
+        self.assertFalse(blocklist.blocks(None, "Mozilla/5.0 curl/7.88"))
+        self.assertFalse(blocklist.blocks("1.2.3.4", None))
+
+    def test_empty(self):
+        self.assertFalse(Blocklist().blocks("1.2.3.4", "anything"))
+
+
+class TestSnapshot(unittest.IsolatedAsyncioTestCase):
+
+    async def test_dump_and_load(self):
+        networks = ["203.0.113.7", "10.0.0.0/8", "2001:db8::/32", "2001:db8:1:2::/64", "2001:db8::1", "bad"]
+        blocklist = Blocklist(networks, ["(?i)sqlmap", "bad["])
+        header, data = blocklist.dump()
+        header = json.loads(json.dumps(header))
+        with patch("src.services.blocklist.LOAD_CHUNK", 1):
+            loaded = await Blocklist.load(header, data)
+
+        self.assertEqual((len(loaded.networks), loaded.networks.invalid), (5, 1))
+        self.assertEqual(loaded.user_agents, ["(?i)sqlmap"])
+        for address in ("203.0.113.7", "10.9.8.7", "2001:db8:ffff::1", "2001:db8:1:2::5", "::ffff:10.0.0.1",
+                        "203.0.113.8", "11.0.0.1", "2001:db9::1"):
+            self.assertEqual(loaded.networks.__contains__(address), address in blocklist.networks, address)
+        self.assertTrue(loaded.blocks(None, "SQLMap/1.7"))
+
+    async def test_older_snapshot_is_not_stored(self):
+        redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+        try:
+            client = redismanager.client
+            await client.sadd(IPS_KEY, "198.51.100.0/24")
+            await client.set(VERSION_KEY, 5)
+            self.assertEqual(await publish_snapshot(), 6)
+            manager = BlocklistManager()
+            await manager.reload()
+            self.assertEqual(manager.version, 6)
+            self.assertIn("198.51.100.1", manager.current.networks)
+            loaded = manager.current
+            await manager.reload()
+            self.assertIs(manager.current, loaded)
+
+            await client.hset(SNAPSHOT_KEY, "version", 9)
+            await client.set(VERSION_KEY, 7)
+            await publish_snapshot()
+            self.assertEqual(await client.hget(SNAPSHOT_KEY, "version"), "9")
+        finally:
+            await redismanager.close()
+
+
+class TestBlocklistMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+        self.manager = BlocklistManager()
+        app = FastAPI()
+        app.add_api_route("/", lambda: {"ok": True})
+        app.add_middleware(BlocklistMiddleware, manager=self.manager)
+        self.app = app
+
+    async def asyncTearDown(self):
+        await self.manager.stop()
+        await redismanager.close()
+
+    async def get(self, ip: str, user_agent: str = "Mozilla/5.0") -> httpx.Response:
+        transport = httpx.ASGITransport(app=self.app, client=(ip, 1234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/", headers={"User-Agent": user_agent})
+
+    async def test_blocked_clients_get_403(self):
+        self.manager.current = Blocklist(["198.51.100.0/24"], ["BadBot"])
+        self.assertEqual((await self.get("198.51.100.9")).status_code, 403)
+        response = await self.get("203.0.113.1", "BadBot/1.0")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {"detail": "You are banned"})
+        self.assertEqual((await self.get("203.0.113.1")).status_code, 200)
+
+    async def test_lists_are_swapped_on_update(self):
+        self.manager.start()
+        await asyncio.sleep(0.05)
+        self.assertEqual((await self.get("198.51.100.9")).status_code, 200)
+
+        await redismanager.client.sadd(IPS_KEY, "198.51.100.0/24")
+        await redismanager.client.sadd(USER_AGENTS_KEY, "BadBot")
+        self.assertEqual(await publish_snapshot(), 1)
+        for _ in range(50):
+            if len(self.manager.current.networks):
+                break
+            await asyncio.sleep(0.02)
+
+        self.assertEqual((await self.get("198.51.100.9")).status_code, 403)
+        self.assertEqual((await self.get("203.0.113.1", "BadBot/2")).status_code, 403)
+        self.assertEqual((await self.get("203.0.113.1")).status_code, 200)
+        self.assertEqual(self.manager.version, 1)
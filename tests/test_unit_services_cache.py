@@ -0,0 +1,32 @@
+import unittest
+
+import fakeredis
+
+from src.database.redis_client import redismanager
+from src.services import cache
+
+
+class TestUserCacheGeneration(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    async def asyncTearDown(self):
+        redismanager._client = None
+
+    async def test_value_is_stored_when_nothing_changed(self):
+        generation = await cache.generation(1)
+        self.assertTrue(await cache.set_json_if_current(cache.stats_key(1), {"total": 3}, 60, 1, generation))
+        self.assertEqual(await cache.get_json(cache.stats_key(1)), {"total": 3})
+
+    async def test_value_computed_before_a_change_is_not_stored(self):
+        generation = await cache.generation(1)
+        # a write lands while the value is computed
+        await cache.invalidate_user(1, cache.stats_key(1))
+
+        self.assertFalse(await cache.set_json_if_current(cache.stats_key(1), {"total": 3}, 60, 1, generation))
+        self.assertIsNone(await cache.get_json(cache.stats_key(1)))
+
+        generation = await cache.generation(1)
+        self.assertTrue(await cache.set_json_if_current(cache.stats_key(1), {"total": 4}, 60, 1, generation))
+        self.assertEqual(await cache.get_json(cache.stats_key(1)), {"total": 4})
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import cloudinary
+
+from src.conf.config import get_config
+from src.services import cloudinary as cloudinary_service
+
+
+class StubUploadHandler(BaseHTTPRequestHandler):
+    """
+    Answers Cloudinary upload requests like the real API, after ``delay`` seconds.
+    """
+    delay = 0.0
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.requests.append((self.path, body))
+        time.sleep(self.delay)
+        payload = json.dumps({"secure_url": "https://stub.local/avatars/user.png"}).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCloudinaryUpload(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubUploadHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cloudinary_service.get_uploader()
+        cloudinary.config(upload_prefix=f"http://127.0.0.1:{cls.server.server_port}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cloudinary.config(upload_prefix=None)
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubUploadHandler.delay = 0.0
+        StubUploadHandler.requests = []
+
+    async def test_upload_returns_secure_url(self):
+        url = await cloudinary_service.upload_avatar(b"\x89PNG image", public_id="user@example.com")
+
+        self.assertEqual(url, "https://stub.local/avatars/user.png")
+        path, body = StubUploadHandler.requests[0]
+        self.assertTrue(path.endswith("/image/upload"))
+        self.assertIn(b"user@example.com", body)
+
+    async def test_default_avatar_is_uploaded_from_the_shipped_file(self):
+        self.assertTrue(Path(cloudinary_service.DEFAULT_AVATAR).is_file())
+        await cloudinary_service.upload_avatar(cloudinary_service.DEFAULT_AVATAR, public_id="user@example.com")
+        _, body = StubUploadHandler.requests[0]
+        self.assertIn(Path(cloudinary_service.DEFAULT_AVATAR).read_bytes(), body)
+
+    async def test_upload_does_not_block_event_loop(self):
+        StubUploadHandler.delay = 0.3
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await cloudinary_service.upload_avatar(b"\x89PNG image")
+        task.cancel()
+        self.assertGreater(ticks, 10)
+
+    async def test_upload_times_out(self):
+        StubUploadHandler.delay = 1.0
+        with patch.object(get_config(), "CLOUDINARY_TIMEOUT", 0.2):
+            started = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                await cloudinary_service.upload_avatar(b"\x89PNG image")
+        self.assertLess(time.monotonic() - started, 0.8)
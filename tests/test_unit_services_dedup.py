@@ -0,0 +1,39 @@
+import unittest
+
+from src.services.dedup import ContactIdentity, find_duplicates, normalize_email, normalize_phone, soundex
+
+
+class TestDedup(unittest.TestCase):
+
+    def test_normalizers(self):
+        self.assertEqual(normalize_email(" John.Doe+work@GMail.com "), "johndoe@gmail.com")
+        self.assertEqual(normalize_email("a.b@example.com"), "a.b@example.com")
+        self.assertEqual(normalize_phone("+38 (050) 123-45-67"), normalize_phone("050 123 4567"))
+        self.assertIsNone(normalize_phone("123"))
+        self.assertEqual(soundex("Robert"), "R163")
+        self.assertEqual(soundex("Rupert"), "R163")
+        self.assertEqual(soundex("Ashcraft"), "A261")
+
+    def test_find_duplicates(self):
+        records = [
+            ContactIdentity(1, "John", "Smith", "john.smith@gmail.com", None),
+            ContactIdentity(2, "Jon", "Smith", "johnsmith+old@gmail.com", None),
+            ContactIdentity(3, "Anna", "Kowalska", "anna@example.com", "+48 600 100 200"),
+            ContactIdentity(4, "Ania", "K.", "ania@work.example", "600100200"),
+            ContactIdentity(5, "Katherine", "Brown", "kate@example.com", None),
+            ContactIdentity(6, "Catherine", "Browne", "cb@example.com", None),
+            ContactIdentity(7, "Peter", "Parker", "peter@example.com", None),
+        ]
+
+        groups = find_duplicates(records)
+
+        self.assertIn({"ids": [1, 2], "reasons": ["email", "name"]}, groups)
+        self.assertIn({"ids": [3, 4], "reasons": ["phone"]}, groups)
+        self.assertNotIn(7, [i for group in groups for i in group["ids"]])
+
+    def test_large_input_stays_linear(self):
+        records = [ContactIdentity(i, f"First{i}", f"Last{i}", f"user{i}@example.com", f"+1555{i:07d}")
+                   for i in range(20000)]
+        records.append(ContactIdentity(20000, "Dup", "Dup", "user1@example.com", None))
+        groups = find_duplicates(records)
+        self.assertEqual(groups, [{"ids": [1, 20000], "reasons": ["email"]}])
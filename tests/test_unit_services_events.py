@@ -0,0 +1,49 @@
+import asyncio
+import json
+import unittest
+from datetime import datetime
+
+import fakeredis
+
+from src.database.redis_client import redismanager
+from src.entity.models import Contact
+from src.services import events
+from src.services.events import ContactEventHub
+
+
+class TestContactEventHub(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+        self.hub = ContactEventHub(buffer_size=2)
+
+    async def asyncTearDown(self):
+        await self.hub.stop()
+        await redismanager.close()
+
+    async def test_events_are_routed_to_owner(self):
+        self.hub.start()
+        await asyncio.sleep(0.05)
+        contact = Contact(id=7, first_name="Ann", last_name="Lee", email="ann@example.com",
+                          created_at=datetime.now(), updated_at=datetime.now())
+
+        with self.hub.subscribe(1) as mine, self.hub.subscribe(2) as other:
+            await events.publish_contact_event(events.CREATED, contact, user_id=1)
+            event = await asyncio.wait_for(mine.get(), timeout=1)
+            self.assertEqual(event["type"], events.CREATED)
+            self.assertEqual(event["contact"]["id"], 7)
+            self.assertTrue(other.queue.empty())
+
+    async def test_slow_consumer_overflows(self):
+        with self.hub.subscribe(1) as subscription:
+            for contact_id in range(3):
+                self.hub.dispatch(json.dumps({"user_id": 1, "type": events.DELETED, "contact": {"id": contact_id}}))
+            self.assertTrue(subscription.closed)
+            self.assertEqual((await subscription.get())["type"], events.OVERFLOW)
+            self.assertTrue(subscription.queue.empty())
+
+    async def test_unsubscribe_on_exit(self):
+        with self.hub.subscribe(1):
+            pass
+        self.hub.dispatch(json.dumps({"user_id": 1, "type": events.DELETED, "contact": {"id": 1}}))
+        self.assertEqual(self.hub._subscribers, {})
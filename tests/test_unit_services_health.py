@@ -0,0 +1,79 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from src.database.db import DataBaseSessionManager
+from src.database.redis_client import redismanager
+from src.services.health import HealthChecker
+
+
+@pytest_asyncio.fixture()
+async def manager(tmp_path):
+    manager = DataBaseSessionManager(f"sqlite+aiosqlite:///{tmp_path}/health.db", shard_urls={})
+    yield manager
+    await manager.close()
+
+
+@pytest.fixture()
+def redis():
+    redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+    yield redismanager.client
+    redismanager._client = None
+
+
+@pytest.mark.asyncio
+async def test_report_is_ready_when_all_checks_pass(manager, redis):
+    checker = HealthChecker(manager, interval=60)
+    assert checker.report()["ready"] is False
+
+    report = await checker.check()
+    assert report["ready"] is True, report
+    assert set(report["checks"]) == {"database", "pool", "redis", "event_loop"}
+    assert checker.report()["checks"] == report["checks"]
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_is_not_queued_on(manager, redis):
+    checker = HealthChecker(manager, interval=60)
+    with patch.object(checker, "_pool_usage", return_value=1.0), \
+            patch.object(checker, "_check_database") as check_database:
+        report = await checker.check()
+    assert report["ready"] is False
+    assert report["checks"]["pool"]["ok"] is False
+    check_database.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_missing_redis_and_stale_reports_are_not_ready(manager):
+    checker = HealthChecker(manager, interval=60)
+    report = await checker.check()
+    assert report["ready"] is False
+    assert report["checks"]["redis"]["ok"] is False
+
+    redismanager.init(fakeredis.FakeAsyncRedis(decode_responses=True))
+    try:
+        assert (await checker.check())["ready"] is True
+        checker._checked_at = time.monotonic() - 200
+        assert checker.report()["ready"] is False
+    finally:
+        redismanager._client = None
+
+
+@pytest.mark.asyncio
+async def test_background_checker_detects_event_loop_lag(manager, redis):
+    checker = HealthChecker(manager, interval=0.2)
+    checker.start()
+    try:
+        await asyncio.sleep(0.1)
+        assert checker.report()["ready"] is True
+        time.sleep(1.0)  # block the loop
+        await asyncio.sleep(0.05)
+        report = checker.report()
+        assert report["checks"]["event_loop"]["ok"] is False
+        assert report["ready"] is False
+    finally:
+        await checker.stop()
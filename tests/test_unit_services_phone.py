@@ -0,0 +1,21 @@
+import unittest
+
+from src.services.phone import normalize_phone, reversed_digits, suffix_pattern
+
+
+class TestPhone(unittest.TestCase):
+
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone("+380 (50) 123-45-67"), "+380501234567")
+        self.assertEqual(normalize_phone("050 123 4567"), "+380501234567")
+        self.assertEqual(normalize_phone("380501234567"), "+380501234567")
+        self.assertEqual(normalize_phone("00 48 600 100 200"), "+48600100200")
+        self.assertEqual(normalize_phone("(555) 123-4567", country_code="1"), "+15551234567")
+        self.assertIsNone(normalize_phone("12-34"))
+        self.assertIsNone(normalize_phone("+1234567890123456"))
+        self.assertIsNone(normalize_phone(None))
+
+    def test_suffix(self):
+        self.assertEqual(reversed_digits("+380501234567"), "765432105083")
+        self.assertEqual(suffix_pattern("45-67"), "7654%")
+        self.assertIsNone(suffix_pattern("567"))
@@ -0,0 +1,77 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from src.conf.config import config
+from src.services.profiling import ProfilingMiddleware
+
+
+def busy_work(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+    return count
+
+
+async def slow_endpoint():
+    return {"count": busy_work(0.05)}
+
+
+class TestProfilingMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.patches = [patch.object(config, "PROFILING_TOKEN", "secret"),
+                        patch.object(config, "PROFILING_SAMPLE_RATE", 0.0),
+                        patch.object(config, "PROFILING_DIR", self.dir.name)]
+        for p in self.patches:
+            p.start()
+        app = FastAPI()
+        app.add_api_route("/slow", slow_endpoint)
+        app.add_middleware(ProfilingMiddleware)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        for p in self.patches:
+            p.stop()
+        self.dir.cleanup()
+
+    def profiles(self) -> list[Path]:
+        return list(Path(self.dir.name).glob("*.speedscope.json"))
+
+    async def test_profile_requested_by_header(self):
+        response = await self.client.get("/slow", headers={"X-Profile": "secret"})
+
+        self.assertEqual(response.status_code, 200)
+        [path] = self.profiles()
+        self.assertEqual(response.headers["x-profile"], path.name)
+        profile = json.loads(path.read_text())
+        [sampled] = profile["profiles"]
+        self.assertEqual(sampled["type"], "sampled")
+        self.assertGreater(len(sampled["samples"]), 5)
+        self.assertEqual(len(sampled["samples"]), len(sampled["weights"]))
+        names = {frame["name"] for frame in profile["shared"]["frames"]}
+        self.assertIn("busy_work", names)
+        root = profile["shared"]["frames"][sampled["samples"][0][0]]
+        self.assertEqual(root["name"], "ProfilingMiddleware.__call__")
+
+    async def test_not_profiled_without_valid_token(self):
+        for headers in ({}, {"X-Profile": "wrong"}):
+            response = await self.client.get("/slow", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("x-profile", response.headers)
+        self.assertEqual(self.profiles(), [])
+
+    async def test_sample_rate(self):
+        with patch.object(config, "PROFILING_SAMPLE_RATE", 1.0):
+            response = await self.client.get("/slow")
+        self.assertIn("x-profile", response.headers)
+        self.assertEqual(len(self.profiles()), 1)
@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+
+from src.conf.config import get_config
+from src.services import queue
+from src.worker import Worker
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.queue = queue.JobQueue(fakeredis.FakeAsyncRedis(decode_responses=True))
+        self.calls = []
+        self.failures = 0
+        self.handlers = patch.dict(queue.HANDLERS, {"echo": self.echo, "flaky": self.flaky}, clear=True)
+        self.handlers.start()
+        self.addCleanup(self.handlers.stop)
+
+    async def echo(self, value):
+        self.calls.append(value)
+
+    async def flaky(self, value):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mail server down")
+        self.calls.append(value)
+
+    async def run_worker(self, concurrency=2, until=lambda: True, timeout=5.0):
+        stop = asyncio.Event()
+        worker = Worker(self.queue, concurrency, name="test")
+        task = asyncio.create_task(worker.run(stop))
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not until() and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await task
+
+    async def test_worker_runs_enqueued_jobs(self):
+        await self.queue.ensure_group()
+        for i in range(5):
+            await self.queue.enqueue("echo", value=i)
+
+        with patch("src.worker.POLL_MS", 10):
+            await self.run_worker(until=lambda: len(self.calls) == 5)
+
+        self.assertEqual(sorted(self.calls), list(range(5)))
+        self.assertEqual(await self.queue.depth(), {"ready": 0, "delayed": 0, "dead": 0})
+        metrics = (await self.queue.metrics())["echo"]
+        self.assertEqual(metrics["enqueued"], 5)
+        self.assertEqual(metrics["succeeded"], 5)
+
+    async def test_failed_jobs_are_retried_with_backoff(self):
+        self.failures = 2
+        await self.queue.ensure_group()
+        await self.queue.enqueue("flaky", value="sent")
+
+        with patch("src.worker.POLL_MS", 10), patch.object(get_config(), "JOB_BACKOFF_BASE", 0.05):
+            await self.run_worker(until=lambda: self.calls)
+
+        self.assertEqual(self.calls, ["sent"])
+        metrics = (await self.queue.metrics())["flaky"]
+        self.assertEqual(metrics["retried"], 2)
+        self.assertEqual(metrics["succeeded"], 1)
+
+    async def test_exhausted_and_unknown_jobs_are_dead_lettered(self):
+        self.failures = 10
+        await self.queue.ensure_group()
+        await self.queue.enqueue("flaky", value="never")
+        await self.queue.enqueue("missing")
+
+        with patch("src.worker.POLL_MS", 10), patch.object(get_config(), "JOB_BACKOFF_BASE", 0.01), \
+                patch.object(get_config(), "JOB_MAX_ATTEMPTS", 3):
+            await self.run_worker(until=lambda: self.failures == 7)
+            while (await self.queue.depth())["dead"] < 2:
+                await self.run_worker(timeout=0.1)
+
+        dead = {job["type"]: job for job in await self.queue.dead_letters()}
+        self.assertEqual(dead["flaky"]["attempt"], 3)
+        self.assertIn("mail server down", dead["flaky"]["error"])
+        self.assertEqual(dead["missing"]["attempt"], 1)
+        self.assertEqual((await self.queue.depth())["ready"], 0)
+
+    async def test_jobs_of_dead_workers_are_claimed(self):
+        await self.queue.ensure_group()
+        await self.queue.enqueue("echo", value="orphan")
+        self.assertEqual(len(await self.queue.read("crashed", 10, 10)), 1)
+
+        with patch("src.worker.POLL_MS", 10), patch.object(get_config(), "JOB_CLAIM_IDLE", 0):
+            await self.run_worker(until=lambda: self.calls)
+
+        self.assertEqual(self.calls, ["orphan"])
+
+    async def test_concurrency_is_bounded(self):
+        running = peak = 0
+        done = []
+
+        async def slow(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            done.append(value)
+
+        queue.HANDLERS["slow"] = slow
+        await self.queue.ensure_group()
+        for i in range(10):
+            await self.queue.enqueue("slow", value=i)
+
+        with patch("src.worker.POLL_MS", 10):
+            await self.run_worker(concurrency=3, until=lambda: len(done) == 10)
+
+        self.assertEqual(len(done), 10)
+        self.assertEqual(peak, 3)
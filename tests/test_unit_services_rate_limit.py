@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import MagicMock
+
+import fakeredis
+from fastapi import HTTPException, Response
+
+from src.database.redis_client import redismanager
+from src.services.auth import auth_service
+from src.services.rate_limit import RateLimiter
+
+
+def make_request(host="10.0.0.1", authorization=None):
+    request = MagicMock()
+    request.method = "GET"
+    request.scope = {"route": MagicMock(path="/api/contacts/")}
+    request.client.host = host
+    request.headers = {"authorization": authorization} if authorization else {}
+    return request
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        redismanager.init(self.redis)
+
+    async def asyncTearDown(self):
+        await redismanager.close()
+
+    async def test_allows_up_to_limit_then_rejects(self):
+        limiter = RateLimiter(times=3, seconds=20)
+        request = make_request()
+        for expected_remaining in ("2", "1", "0"):
+            response = Response()
+            await limiter.check(request, response)
+            self.assertEqual(response.headers["RateLimit-Limit"], "3")
+            self.assertEqual(response.headers["RateLimit-Remaining"], expected_remaining)
+
+        with self.assertRaises(HTTPException) as ctx:
+            await limiter.check(request, Response())
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertIn("Retry-After", ctx.exception.headers)
+
+    async def test_clients_are_keyed_separately(self):
+        limiter = RateLimiter(times=1, seconds=20)
+        await limiter.check(make_request(host="10.0.0.1"), Response())
+        await limiter.check(make_request(host="10.0.0.2"), Response())
+
+    async def test_authenticated_requests_are_keyed_by_user(self):
+        token = await auth_service.create_access_token(data={"sub": "user@example.com"})
+        limiter = RateLimiter(times=1, seconds=20)
+        await limiter.check(make_request(host="10.0.0.1", authorization=f"Bearer {token}"), Response())
+        with self.assertRaises(HTTPException):
+            await limiter.check(make_request(host="10.0.0.2", authorization=f"Bearer {token}"), Response())
+        await limiter.check(make_request(host="10.0.0.1"), Response())
+
+    async def test_local_batch_skips_redis(self):
+        limiter = RateLimiter(times=100, seconds=60, local_batch=10)
+        request = make_request()
+        for _ in range(10):
+            await limiter.check(request, Response())
+        tat = float(await self.redis.get(limiter.key(request)))
+        self.assertGreater(tat, 0)
+        self.assertEqual(limiter._leases[limiter.key(request)].tokens, 0)
+
+        response = Response()
+        await limiter.check(request, response)
+        self.assertEqual(response.headers["RateLimit-Remaining"], "89")
+
+    async def test_no_lease_close_to_limit(self):
+        limiter = RateLimiter(times=40, seconds=60, local_batch=10)
+        request = make_request()
+        for _ in range(3):
+            await limiter.check(request, Response())
+            limiter._leases.clear()  # as if the next requests went to other workers
+        # 10 tokens left: below twice the batch, so only single tokens are granted
+        granted, remaining, _, _ = await limiter._acquire(limiter.key(request), limiter.local_batch)
+        self.assertEqual((granted, remaining), (1, 9))
+
+        for _ in range(9):
+            await limiter.check(request, Response())
+        self.assertNotIn(limiter.key(request), limiter._leases)
+        with self.assertRaises(HTTPException):
+            await limiter.check(request, Response())
@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+from src.services.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+
+    async def test_concurrent_calls_share_one_execution(self):
+        calls = 0
+
+        async def query():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return ["contact"]
+
+        results = await asyncio.gather(*(self.flight.do("read_contacts", (1, 10, 0), query) for _ in range(5)))
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(results, [["contact"]] * 5)
+        self.assertEqual(self.flight.coalesced["read_contacts"], 4)
+
+    async def test_different_params_are_not_coalesced(self):
+        query = AsyncMock(return_value=[])
+        await asyncio.gather(self.flight.do("read_contacts", (1, 10, 0), query),
+                             self.flight.do("read_contacts", (2, 10, 0), query))
+        self.assertEqual(query.await_count, 2)
+        self.assertEqual(self.flight.coalesced["read_contacts"], 0)
+
+    async def test_errors_are_shared_and_not_cached(self):
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("db down")
+
+        results = await asyncio.gather(*(self.flight.do("stats", (1,), failing) for _ in range(3)),
+                                       return_exceptions=True)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+        result = await self.flight.do("stats", (1,), AsyncMock(return_value="ok"))
+        self.assertEqual(result, "ok")
+
+    async def test_waiters_run_call_when_leader_is_cancelled(self):
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        leader = asyncio.create_task(self.flight.do("read_contacts", (1,), slow))
+        await started.wait()
+        waiter = asyncio.create_task(self.flight.do("read_contacts", (1,), AsyncMock(return_value="fresh")))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        self.assertEqual(await waiter, "fresh")
@@ -0,0 +1,65 @@
+import unittest
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.entity.models import Base, User
+from src.services import timing
+
+
+class TestServerTiming(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(self.engine) as db:
+            db.add_all([User(username=f"u{i}", email=f"u{i}@example.com", password="x") for i in range(3)])
+            await db.commit()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def test_records_db_and_hydration_inside_a_request(self):
+        timings = {}
+        token = timing._timings.set(timings)
+        try:
+            async with AsyncSession(self.engine) as db:
+                with timing.timed("endpoint"):
+                    users = (await db.execute(select(User).order_by(User.id))).scalars().all()
+                    user = await db.get(User, users[0].id)
+        finally:
+            timing._timings.reset(token)
+
+        self.assertEqual([u.username for u in users], ["u0", "u1", "u2"])
+        self.assertIs(user, users[0])
+        self.assertEqual(timings["db"][1], 1)
+        self.assertEqual(timings["hydrate"][1], 1)
+        self.assertIn("endpoint", timings)
+
+    async def test_failed_statement_leaves_no_start_behind(self):
+        timings = {}
+        token = timing._timings.set(timings)
+        try:
+            async with self.engine.connect() as conn:
+                with self.assertRaises(DBAPIError):
+                    await conn.execute(text("SELECT * FROM missing_table"))
+                await conn.rollback()
+                await conn.execute(select(User.id))
+                info = (await conn.get_raw_connection()).info
+        finally:
+            timing._timings.reset(token)
+
+        self.assertEqual(timings["db"][1], 1)
+        self.assertNotIn("server_timing", info)
+
+    async def test_nothing_recorded_outside_a_request(self):
+        async with AsyncSession(self.engine) as db:
+            await db.execute(select(User))
+        timing.record("db", 1.0)
+        self.assertIsNone(timing._timings.get())
+
+    def test_header(self):
+        value = timing.header({"db": [1.234, 2], "total": [5.06, 1], "_endpoint_end": [10.0, 1]})
+        self.assertEqual(value, 'db;dur=1.2;desc="2 calls", total;dur=5.1')
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import Request
+
+from src.conf.config import get_config
+from src.services import uploads
+
+BOUNDARY = "testboundary"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+def multipart(content: bytes, field: str = "file", filename: str = "me.png") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="note"\r\n\r\nhello\r\n'
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(body: bytes, chunk_size: int = 64, content_length: bool = True):
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    sent = []
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+
+    async def receive():
+        chunk = chunks[len(sent)]
+        sent.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": len(sent) < len(chunks)}
+
+    scope = {"type": "http", "method": "PATCH", "path": "/", "headers": headers, "query_string": b""}
+    return Request(scope, receive), sent, len(chunks)
+
+
+class TestSniff(unittest.TestCase):
+
+    def test_known_formats(self):
+        self.assertEqual(uploads.sniff(b"\xff\xd8\xff\xe0" + b"\x00" * 8), "image/jpeg")
+        self.assertEqual(uploads.sniff(PNG[:12]), "image/png")
+        self.assertEqual(uploads.sniff(b"GIF89a" + b"\x00" * 6), "image/gif")
+        self.assertEqual(uploads.sniff(b"RIFF\x00\x00\x00\x00WEBP"), "image/webp")
+        self.assertIsNone(uploads.sniff(b"<html><body>"))
+
+
+class TestReceiveFile(unittest.IsolatedAsyncioTestCase):
+
+    async def test_receives_file_field(self):
+        request, _, _ = make_request(multipart(PNG))
+        file = await uploads.receive_file(request)
+        with file:
+            self.assertEqual(file.read(), PNG)
+
+    async def test_spools_to_disk_above_threshold(self):
+        content = PNG + b"\x01" * 5000
+        request, _, _ = make_request(multipart(content), chunk_size=1024)
+        with patch.object(get_config(), "UPLOAD_SPOOL_THRESHOLD", 1000):
+            file = await uploads.receive_file(request)
+        with file:
+            self.assertTrue(file._rolled)
+            self.assertEqual(file.read(), content)
+
+    async def test_rejects_declared_length_without_reading(self):
+        request, sent, _ = make_request(multipart(PNG + b"\x00" * 100_000))
+        with self.assertRaises(uploads.UploadTooLarge):
+            await uploads.receive_file(request, max_size=1000)
+        self.assertEqual(sent, [])
+
+    async def test_rejects_oversized_stream_early(self):
+        request, sent, total = make_request(multipart(PNG + b"\x00" * 10_000), content_length=False)
+        with self.assertRaises(uploads.UploadTooLarge):
+            await uploads.receive_file(request, max_size=1000)
+        self.assertLess(len(sent), total / 2)
+
+    async def test_rejects_wrong_type_after_first_bytes(self):
+        request, sent, total = make_request(multipart(b"<html>" + b"x" * 10_000))
+        with self.assertRaises(uploads.UploadRejected):
+            await uploads.receive_file(request)
+        self.assertLess(len(sent), 5)
+
+    async def test_rejects_missing_field(self):
+        request, _, _ = make_request(multipart(PNG, field="other"))
+        with self.assertRaises(uploads.UploadRejected):
+            await uploads.receive_file(request)
@@ -0,0 +1,79 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.conf.config import config
+from src.entity.models import Base, User
+from src.services.user_loader import UserLoader
+
+
+@pytest_asyncio.fixture()
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/users.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User.__table__), [{"username": f"u{i}", "email": f"u{i}@example.com",
+                                                      "password": "x"} for i in range(5)])
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture()
+def statements(engine):
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+async def lookup(loader: UserLoader, engine, email: str):
+    async with AsyncSession(engine) as db:
+        user = await loader.load(email, db)
+        assert user is None or user in db
+        return user and user.username
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_query(engine, statements):
+    loader = UserLoader()
+    emails = ["u1@example.com", "u2@example.com", "u1@example.com", "missing@example.com"]
+
+    names = await asyncio.gather(*(lookup(loader, engine, email) for email in emails))
+
+    assert names == ["u1", "u2", "u1", None]
+    assert loader.stats == {"lookups": 4, "queries": 1}
+    assert len(statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_dispatched_at_once(engine):
+    loader = UserLoader()
+    with patch.object(config, "USER_LOADER_MAX_BATCH", 2):
+        names = await asyncio.gather(*(lookup(loader, engine, f"u{i}@example.com") for i in range(5)))
+
+    assert names == [f"u{i}" for i in range(5)]
+    assert loader.stats["queries"] == 3
+
+
+@pytest.mark.asyncio
+async def test_merged_user_can_be_updated(engine):
+    loader = UserLoader()
+    async with AsyncSession(engine) as db:
+        user = await loader.load("u3@example.com", db)
+        user.refresh_token = "token"
+        await db.commit()
+
+    async with AsyncSession(engine) as db:
+        user = await loader.load("u3@example.com", db)
+        assert user.refresh_token == "token"
+
+
+@pytest.mark.asyncio
+async def test_disabled_loader_queries_directly(engine):
+    loader = UserLoader()
+    with patch.object(config, "USER_LOADER_ENABLED", False):
+        assert await lookup(loader, engine, "u4@example.com") == "u4"
+    assert loader.stats["queries"] == 0